@@ -1,51 +1,92 @@
 from __future__ import annotations
 
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import logging
 import os
 import asyncio
+import sys
+from typing import Any, Awaitable, Callable
+
 from dotenv import load_dotenv
 
 from livekit import rtc
 from livekit.agents import (
+    AgentServer,
     AgentSession,
     Agent,
+    ConversationItemAddedEvent,
     llm,
-    RoomInputOptions,
+    room_io,
     JobContext,
+    JobExecutorType,
+    JobProcess,
+    RunContext,
+    StopResponse,
     WorkerOptions,
     cli,
+    function_tool,
 )
-# Import the plugins that are mentioned in your docs
-from livekit.plugins import openai, silero
 
+from answer_cache import AnswerCache
+from audio_frontend import AudioFrontendConfig, LoopLagMonitor, load_vad
+from context_window import ContextWindow, is_summary
+from greeting import GREETING_TEXT, load_greeting, synthesize_greeting
+from indicators import IndicatorStore
+from knowledge import KnowledgeIndex
+from municipal_data import DataWatcher, MunicipalData
+from pipeline import ModelConfig
+from realtime_pool import PooledRealtimeModel, RealtimeSessionPool
+from session_metrics import SessionMetrics
+from session_recovery import RecoveryConfig, SessionSupervisor, load_recovery_audio
+from tiering import TierDecision, TieringPolicy, sample_worker_load
+from tool_cache import ToolCache
+from transcript_stream import TranscriptStream
+from transcripts import TranscriptRecorder, TranscriptSink
+from turn_detection import TurnConfig
+from worker_load import WorkerLoad
+
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 # Load environment variables from .env.local
 load_dotenv(dotenv_path=".env.local")
 
-# Configure logging
 logger = logging.getLogger("cajica-assistant")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
-
-# Verify required environment variables
-required_env_vars = ['OPENAI_API_KEY', 'LIVEKIT_API_KEY', 'LIVEKIT_API_SECRET']
-missing_vars = []
-for var in required_env_vars:
-    if not os.getenv(var):
-        missing_vars.append(var)
-        
-if missing_vars:
-    logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
-    logger.error("Please check your .env.local file in the backend directory")
-    raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
-    
-logger.info(f"Environment variables loaded successfully. LiveKit URL: {os.getenv('LIVEKIT_URL')}")
-
-class CajicaAssistant(Agent):
-    def __init__(self) -> None:
-        super().__init__(instructions=""" 
+
+def configure_logging() -> None:
+    # Solo en el proceso principal: los procesos de trabajo reenvían sus registros al worker
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+
+def check_environment() -> None:
+    # Verify required environment variables
+    required_env_vars = ['OPENAI_API_KEY', 'LIVEKIT_API_KEY', 'LIVEKIT_API_SECRET']
+    missing_vars = []
+    for var in required_env_vars:
+        if not os.getenv(var):
+            missing_vars.append(var)
+
+    if missing_vars:
+        logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.error("Please check your .env.local file in the backend directory")
+        raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+    logger.info(f"Environment variables loaded successfully. LiveKit URL: {os.getenv('LIVEKIT_URL')}")
+
+def register_plugins() -> None:
+    """Importa los plugins de LiveKit, que deben registrarse en el hilo principal.
+
+    Se llama antes de ``cli.run_app`` para que el worker los precargue en el forkserver
+    y los procesos de trabajo arranquen con ellos ya importados.
+    """
+    from livekit.plugins import openai, silero  # noqa: F401
+
+CAJICA_INSTRUCTIONS = """ 
 # 🏛️ Asistente Virtual de la Alcaldía de Cajicá
 
 Soy el **asistente virtual de la Alcaldía de Cajicá**. Mi propósito es explicarte, guiarte y acompañarte en la consulta de la información oficial de la gestión municipal, especialmente en lo relacionado con el **Plan de Desarrollo Municipal "Cajicá Ideal 2024–2027"**, su ejecución, los avances sectoriales y los indicadores de seguimiento.
@@ -114,194 +155,6 @@ El Plan fue adoptado mediante **Acuerdo 01 de 2024** (29 de mayo) y se estructur
 
 ---
 
-## 👩‍💼 Alcaldesa: Fabiola Jácome Rincón (2024–2027)
-
-- **Ingeniera Civil** (Univ. Católica) y Especialista en Gobierno y Gerencia Pública
-- **Experiencia:** INDEPORTES, Acción Comunal, CAR, FONDECUN
-- **Trayectoria:** Alcaldesa de Cajicá (2008–2011), Concejal (2001–2003)
-- **Reconocimientos:** 
-  - Premio mejor alcaldesa del país (2010)
-  - Orden al mérito ambiental Von Humboldt
-  - Premio Nacional de Alta Gerencia
-
----
-
-## 🏘️ Información General del Municipio
-
-- **Población (2025):** 104,598 habitantes (54,553 mujeres, 50,045 hombres)
-- **Distribución:** 90% urbana, 10% rural
-- **Superficie:** Municipio mayoritariamente urbano de Cundinamarca
-- **Clima:** 13°C temperatura promedio, 77.90% humedad relativa
-- **División territorial:**
-  - 4 veredas: Calahorra, Canelón, Chuntame, Río Grande
-  - 15 barrios principales 
-  - 22 sectores
-
-### Servicios Públicos (Coberturas)
-- **Acueducto:** 99.85% (36,668 suscriptores)
-- **Alcantarillado:** 95%
-- **Aseo:** 99% (36,285 suscriptores)
-- **Energía eléctrica:** 100%
-- **Gas natural:** 99.83% (29,674 usuarios)
-
----
-
-## 📈 Indicadores Destacados del Plan de Desarrollo
-
-### 🌱 **Ambiente y Sostenibilidad**
-- Áreas en proceso de restauración: Meta 1% cuatrienio
-- Tratamiento adecuado residuos sólidos: Meta 100%
-- Cobertura de alcantarillado: Meta 100%
-
-### 🎓 **Educación**
-- Cobertura bruta transición: Meta 60%
-- Cobertura bruta educación primaria: Meta 82.06%
-- Cobertura bruta educación media: Meta 50.73%
-- **6 instituciones educativas oficiales** con 13 sedes
-- **38 instituciones educativas privadas**
-
-### 🏥 **Salud**
-- Cobertura régimen subsidiado: Meta 73%
-- Población pobre no atendida: Meta 1%
-- Cobertura vacunación triple viral: Meta 90%
-- **Hospital principal:** Hospital Jorge Cavelier
-
-### 🎨 **Cultura**
-- **8 Escuelas de Formación Artística y Cultural** (EFACC)
-- **Instituto Municipal de Cultura y Turismo**
-- **Plan Decenal de Cultura 2022–2032**
-- **17 eventos culturales anuales**
-
-### 🏃‍♂️ **Deporte**
-- **INSDEPORTES Cajicá:** ente rector del deporte
-- **42 programas** en la Escuela Polideportiva
-- **32 escenarios deportivos**
-- **29 parques infantiles, 24 parques biosaludables**
-
-### 💼 **Desarrollo Económico**
-- **Índice de pobreza multidimensional:** 10.3%
-- **NBI (Necesidades Básicas Insatisfechas):** 7.1%
-- **Desempleo joven:** 9.8% (2023)
-- **Programas:** "Viernes de Empleo", emprendimiento juvenil
-
-### 🌐 **Tecnología**
-- **52 zonas Wi-Fi comunitarias**
-- Gobierno digital con trámites en línea
-- **Programa "Cajicá Innova"**
-
----
-
-## 🎯 Detalle de los 18 Sectores del Plan de Desarrollo
-
-### **Dimensión 1: Cajicá Ambiental Ideal y Sostenible**
-
-**1. Ambiente y Desarrollo Sostenible**
-- Avance actual: 68%
-- Indicadores clave: Áreas de restauración, manejo de residuos sólidos
-- Programas destacados: Gestión ambiental integral, conservación de ecosistemas
-
-**2. Vivienda Ciudad y Territorio**
-- Avance actual: 45%
-- Indicadores clave: Déficit habitacional, ordenamiento territorial
-- Programas destacados: Vivienda de interés social, mejoramiento urbano
-
-**3. Minas y Energía**
-- Avance actual: 52%
-- Indicadores clave: Energías renovables, eficiencia energética
-- Programas destacados: Transición energética municipal
-
-### **Dimensión 2: Cajicá Desarrollo Social Ideal**
-
-**4. Inclusión Social y Reconciliación**
-- Avance actual: 43%
-- Indicadores clave: Población vulnerable atendida, programas de inclusión
-- Programas destacados: Atención a población en condición de discapacidad, adulto mayor
-
-**5. Educación**
-- Avance actual: 58%
-- Indicadores clave: Cobertura educativa, calidad educativa
-- Programas destacados: Fortalecimiento infraestructura educativa, formación docente
-
-**6. Deporte y Recreación**
-- Avance actual: 65%
-- Indicadores clave: Escenarios deportivos, programas recreativos
-- Programas destacados: Escuela Polideportiva, eventos deportivos municipales
-
-**7. Salud y Protección Social**
-- Avance actual: 48%
-- Indicadores clave: Cobertura en salud, mortalidad infantil
-- Programas destacados: Fortalecimiento Hospital Jorge Cavelier, programas preventivos
-
-**8. Cultura**
-- Avance actual: 72%
-- Indicadores clave: Participación cultural, eventos culturales
-- Programas destacados: EFACC, Plan Decenal de Cultura, patrimonio cultural
-
-### **Dimensión 3: Cajicá Ideal Productiva e Innovadora**
-
-**9. Agricultura y Desarrollo Rural**
-- Avance actual: 38%
-- Indicadores clave: Productividad rural, apoyo a campesinos
-- Programas destacados: Fortalecimiento productivo rural, asistencia técnica
-
-**10. Comercio, Industria y Turismo**
-- Avance actual: 55%
-- Indicadores clave: Desarrollo empresarial, turismo sostenible
-- Programas destacados: Apoyo a MIPYMES, promoción turística
-
-**11. Trabajo**
-- Avance actual: 41%
-- Indicadores clave: Desempleo juvenil, formalización laboral
-- Programas destacados: "Viernes de Empleo", emprendimiento juvenil
-
-**12. Ciencia Tecnología e Innovación**
-- Avance actual: 47%
-- Indicadores clave: Proyectos de innovación, conectividad digital
-- Programas destacados: "Cajicá Innova", gobierno digital
-
-### **Dimensión 4: Cajicá Territorio Ideal de Movilidad**
-
-**13. Transporte**
-- Avance actual: 35%
-- Indicadores clave: Vías pavimentadas, transporte público
-- Programas destacados: Mejoramiento vial, movilidad sostenible
-
-### **Dimensión 5: Cajicá Ideal en Cultura Ciudadana, Gobernanza y Cercanía**
-
-**14. Gobierno Territorial**
-- Avance actual: 62%
-- Indicadores clave: Eficiencia administrativa, participación ciudadana
-- Programas destacados: Modernización institucional, gobierno abierto
-
-**15. Información Estadística**
-- Avance actual: 58%
-- Indicadores clave: Sistemas de información, transparencia
-- Programas destacados: Observatorio municipal, datos abiertos
-
-**16. Tecnologías de la Información y las Comunicaciones**
-- Avance actual: 67%
-- Indicadores clave: Conectividad, alfabetización digital
-- Programas destacados: Wi-Fi gratuito, trámites digitales
-
-**17. Justicia y del Derecho**
-- Avance actual: 44%
-- Indicadores clave: Acceso a la justicia, convivencia ciudadana
-- Programas destacados: Centros de conciliación, mediación comunitaria
-
-**18. Organismos de Control**
-- Avance actual: 53%
-- Indicadores clave: Transparencia, rendición de cuentas
-- Programas destacados: Fortalecimiento control interno, participación ciudadana
-
----
-
-## 💰 Presupuesto del Plan
-
-- **Presupuesto cuatrienio:** Más de 1.2 billones de pesos proyectados
-- **Sectores con mayor inversión:** Educación, salud, infraestructura vial y social
-
----
-
 ## 🔄 Protocolo de Respuesta
 
 **SALUDO INICIAL OBLIGATORIO:**  
@@ -309,543 +162,449 @@ El Plan fue adoptado mediante **Acuerdo 01 de 2024** (29 de mayo) y se estructur
 
 **PROTOCOLO DE RESPUESTAS:**
 1. Escuchar claramente la consulta ciudadana
-2. **Para consultas sobre indicadores y metas:**
+2. **Consultar las herramientas de información oficial** antes de dar cualquier cifra, programa, norma o dato de contacto
+3. **Para consultas sobre indicadores y metas:**
    - Proporcionar datos específicos del Plan de Desarrollo
    - Explicar que las cifras corresponden a metas del cuatrienio 2024-2027
    - Mencionar las 5 dimensiones estratégicas del Plan
-3. **Solo proporcionar cifras CON CITA EXACTA** de fuente oficial
-4. **Si no tengo certeza:** indicar claramente "No dispongo de esa cifra específica"
-5. Conectar con dependencias municipales cuando corresponda
-6. Promover la participación ciudadana y el seguimiento a la gestión
-
-## 📍 Información Básica Ampliada del Municipio
-
-**Población de Cajicá:**
-- **2024:** alrededor de 94,000 habitantes
-- **2025:** 104,598 habitantes proyectados (DANE)
-  - Mujeres: 54,553 (52.2%)
-  - Hombres: 50,045 (47.8%)
-- **Distribución:** 90% urbana, 10% rural
-
-**División Político-Administrativa:**
-- **4 veredas:** Calahorra, Canelón, Chuntame, Río Grande
-- **15 barrios:** Capellanía, Centro, El Misterio, El Rocío, La Estación, La Florida, La Palma, Gran Colombia, Granjitas, El Prado, Puerta del Sol, Rincón Santo, Santa Inés, Santa Cruz, Las Villas
-- **22 sectores:** 7 Vueltas, Aguanica, Buena Suerte, Calle 7, Canelón El Bebedero, El Cortijo, El Molino, Fagua, La Bajada, La Camila, La Cumbre, La Laguna, La M, La Mejorana, Las Manas, Puente Peralta, Puente Torres, Puente Vargas, Puente Vargas Variante, Quebrada del Campo, Tairona, Zona Industrial
-
-**Clima:** 13°C temperatura promedio, humedad relativa 77.90%, precipitación 692 mm/año
-
-## 📊 Marco Legal y Antecedentes Normativos
-
-El Plan se fundamenta en:
-1. Constitución Política de Colombia (Arts. 311, 313, 315, 339, 340, 366)
-2. Ley 152 de 1994 – Ley Orgánica del Plan de Desarrollo
-3. Ley 136 de 1994, modificada por Ley 1551 de 2012 – Organización municipal
-4. Ley 388 de 1997 – Ordenamiento territorial
-5. Ley 715 de 2001 – Competencias en salud y educación
-6. Ley 1098 de 2006 – Código de Infancia y Adolescencia
-7. Ley 1448 de 2011 – Atención y reparación a víctimas
-8. Ley 1551 de 2012 – Modernización de los municipios
-9. Ley 1757 de 2015 – Participación democrática
-10. Ley 2294 de 2023 – Plan Nacional de Desarrollo 2022–2026
-
-## 🎯 Enfoque Poblacional y Territorial
-
-- **Primera infancia, infancia y adolescencia:** Ley 1804 de 2016 (Cero a Siempre), Ley 2328 de 2023
-- **Juventud:** Ley 1622 de 2013, modificada por Ley 1885 de 2018
-- **Mujer y género:** Ley 1257 de 2008, Ley 2136 de 2021
-- **Víctimas del conflicto armado:** Ley 1448 de 2011
-- **Personas con discapacidad:** Ley 1618 de 2013
-- **Adultos mayores:** Ley 1251 de 2008, modificada por Ley 1850 de 2017
+4. **Solo proporcionar cifras CON CITA EXACTA** de fuente oficial
+5. **Si no tengo certeza o la búsqueda no devuelve el dato:** indicar claramente "No dispongo de esa cifra específica"
+6. Conectar con dependencias municipales cuando corresponda
+7. Promover la participación ciudadana y el seguimiento a la gestión
 
----
+## 🔎 Consulta de información oficial
 
-## 🏢 Servicios Públicos y Cobertura
-
-**Acueducto:**
-- Cobertura: 99.85% (36,668 suscriptores)
-- Casco Urbano: 25,118 (69%), Zona Rural: 11,550 (31%)
-- Abastecimiento: Empresa de Acueducto y Alcantarillado de Bogotá
-- Sistema: Sistema Agregado Norte (Tibitoc, embalses Sisga y Tominé)
-
-**Alcantarillado:**
-- Cobertura: 95%
-- Extensión: ~130,000 metros de alcantarillado combinado
-- PTAR Calahorra: trata ~80% del municipio
-- PTAR Rincón Santo: vereda Río Grande
-
-**Aseo:**
-- Cobertura: 99% (36,285 suscriptores)
-- Plan PGIRS 2016-2027 (actualizado Decreto 153 de 2021)
-
-**Energía:**
-- Cobertura eléctrica: 100%
-- Gas natural: 99.83% (29,674 usuarios)
-  - Residencial: 28,934, Comercial: 726, Industrial: 14
-
-**Alumbrado Público:**
-- Consorcio Iluminaciones de la Sabana (desde 2019)
-- 5,846 luminarias
-- Modernización hacia tecnología LED
-
-## 🏠 Vivienda y Ordenamiento
-
-**Déficit Habitacional (DANE 2018):**
-- Total: 7,724 hogares (29% del total)
-- Déficit Cuantitativo: 2.79%
-- Déficit Cualitativo: 26.45%
-
-**Espacio Público:**
-- Actual: 2.36 metros por persona
-- Meta: 9 metros por persona
-- Norma PBOT: 15 metros cuadrados por habitante
-
-**Ordenamiento Territorial:**
-- Plan Básico de Ordenamiento Territorial: Acuerdo 016 del 27 de diciembre de 2014
-- 2 Curadurías Urbanas
-- Cesiones en dinero: $14,463,821,881 desde 2003
-- Banco Inmobiliario: 233 bienes inmuebles (2023)
-
-## 🎓 Educación en Detalle
-
-**Instituciones Educativas:**
-- **6 instituciones oficiales** con 13 sedes
-- **38 instituciones privadas**
-- **33 convenios universitarios** para acceso a educación superior
-
-**Principales I.E. Oficiales:**
-- Institución Educativa Departamental Pompilio Martínez
-- Institución Educativa Departamental Pablo Herrera
-- Institución Educativa Departamental San Gabriel
-- Institución Educativa Departamental Capellanía
-- Institución Educativa Departamental Rincón Santo
-- Institución Educativa Departamental Antonio Nariño
-
-## 👶 Primera Infancia y Cuidado
-
-**Centros de Atención:**
-- Hogar Infantil Canelón ICBF
-- CDI Manas, Platero y Yo, Milenium (ICBF)
-- Jardín Social Cafam – Foniñez
-- **16 Centros de Atención** en total
-
-**Programa de Recuperación Nutricional:**
-- 11 unidades operadas por Fundación Santa Engracia
-- Tasa mortalidad infantil: 14,88 por cada mil nacimientos (2022)
-
-**Ludotecas:**
-1. María Helena Pulido (Centro)
-2. Lucrecia Tavera (Canelón)
-3. Diana Barón (Capellanía)
-
-## 👥 Programas Sociales
-
-**Juventud (22.93% población):**
-- Política Pública Municipal 2019-2035 (Acuerdo 002 de 2019)
-- Plataforma de Juventud (Resolución 005 de 2023)
-- Consejo de Juventud (Decreto 031 de 2021)
-- Casa de la Juventud (Decreto 023 de 2019)
-- Programa Nacional Renta Joven
-
-**Adultos Mayores (43.75% población 27-59 años):**
-- **1,530 personas** en Programa de Adulto Mayor 2024
-- Servicios: alimentación, orientación psicosocial, atención primaria, capacitación productiva, deporte, cultura, recreación
-- Club Edad de Oro + 10 puntos satélites
-
-**Mujer y Género:**
-- Línea Violeta: 3184317034
-- Mesa LGBTIQ+ (Decreto 090 de 2017)
-- Tasa violencia intrafamiliar: 181.5 por 100,000 habitantes
-
-**Transferencias Monetarias:**
-- Renta Ciudadana (Resolución 079 de 2024)
-- Devolución IVA (Resolución 080 de 2024)
-- Línea 1: $500,000 por ciclo
-- Línea 2: promedio $320,000
-- Línea 3: bono anual $500,000 a $1,000,000
-
-**Discapacidad:**
-- 1,733 personas (1.70% población)
-- Política Pública 2014-2023 (Acuerdo 022 de 2013) - en actualización
-
-## 🏥 Salud Ampliada
-
-**Hospital Jorge Cavelier:** principal centro de atención
-
-**Cobertura en Aseguramiento:**
-- Régimen contributivo: ~54%
-- Régimen subsidiado: ~44%
-- Población pobre no asegurada: ~2%
-
-**Indicadores de Salud:**
-- Coberturas de vacunación: >95% mayoría de biológicos
-- Mortalidad: principales causas cardiovasculares y cáncer
-- Programas: fortalecimiento hospitalario, salud mental, acceso rural
-
-## 🎨 Cultura Detallada
-
-**Instituto Municipal de Cultura y Turismo:** ente rector
-
-**8 Escuelas de Formación Artística y Cultural (EFACC):**
-- Miles de estudiantes en música, danza, teatro, artes visuales
-- Descentralizadas en sectores
-- Programa de Circulación anual
-
-**17 Eventos Culturales Anuales:**
-- Festival de Música
-- Encuentro de Danza
-- Carnaval
-- Encuentro de Teatro
-- Plan Decenal de Cultura 2022-2032
-
-**Infraestructura:**
-- Centro Cultural y de Convenciones Fernando Botero
-- 2 Casas de la Cultura
-- 2 Bibliotecas Municipales
-- Portafolio de Estímulos a Talentos
-
-## 🏃‍♂️ Deporte Detallado
-
-**INSDEPORTES Cajicá:** ente rector del deporte
-
-**Escuela Polideportiva:**
-- **42 programas** activos
-- Múltiples disciplinas deportivas
-- Proceso de deporte formativo, competitivo y altos logros
-
-**Infraestructura Deportiva:**
-- **32 escenarios deportivos**
-- **29 parques infantiles**
-- **24 parques biosaludables**
-
-**Programas:**
-- Deporte comunitario
-- Educación física en 7 I.E. públicas
-- Eventos recreo-deportivos
-- Deporte adaptado para discapacidad
-
-## 💼 Desarrollo Económico Detallado
-
-**Indicadores Socioeconómicos:**
-- **Índice de pobreza multidimensional:** 10.3%
-- **NBI:** 7.1%
-- **Desempleo joven:** 9.8% (2023)
-
-**Programas de Empleo:**
-- "Viernes de Empleo" (ferias laborales)
-- Emprendimiento juvenil
-- Articulación con SENA
-- Fondo de Emprendimiento de Cajicá
-- Escuela de emprendimiento
-
-**Comercio y Turismo:**
-- Centros comerciales y servicios especializados
-- Plan de Desarrollo Turístico
-- Marca Cajicá
-- Edificio Empresarial (en construcción)
-- Plaza de Artesanos proyectada
-
-**Agricultura:**
-- Productos: flores, hortalizas (papa, maíz, arveja), lácteos
-- Pecuaria: bovino, porcino, avícola, apícola
-- Asociaciones campesinas
-- Asistencia técnica rural
-
-## 🚗 Movilidad y Transporte
-
-**Red Vial:**
-- Vías rurales: >100 km (muchas requieren mantenimiento)
-- Plan anual de mantenimiento a 13 km de malla rural
-- Mejoramiento 3,000 metros lineales vías rurales
-- Rehabilitación 1,000 m² vías urbanas
-
-**Proyectos:**
-- Construcción ciclorrutas y bicicarriles
-- Terminal de transporte (gestión privada)
-- Plan Municipal de Movilidad Seguro y Sostenible
-- Organismo de Tránsito y Transporte Municipal
-
-## 🔬 Ciencia, Tecnología e Innovación
-
-**Programas:**
-- "Cajicá Innova"
-- Semana de la Ciencia y la Innovación (anual)
-- Comité Municipal de CTI
-- Politécnico de la Sabana como Parque Tecnológico
-
-## 💻 Tecnologías de la Información
-
-**Conectividad:**
-- **52 zonas Wi-Fi comunitarias**
-- Gobierno digital con trámites en línea
-- Plan Estratégico de TIC (PETIC)
-- 6 actividades anuales de transformación digital
-
-**Desafíos:**
-- Cobertura desigual en zonas rurales
-- Brecha digital en adultos mayores
-- Fortalecimiento ciberseguridad
-
-## 🏛️ Gobierno y Administración
-
-**Estructura Administrativa:**
-- Secretarías principales: Gobierno, Planeación, Hacienda, Desarrollo Económico, Educación, Salud, Infraestructura, Desarrollo Social
-- INSDEPORTES Cajicá
-- Instituto Municipal de Cultura y Turismo
-
-**Gestión Pública:**
-- Certificación ISO 9001-2015
-- Modelo Integrado de Planeación y Gestión (MIPG)
-- Plan Anticorrupción y Atención al Ciudadano (PAAC)
-- Banco Municipal de Proyectos
-- Sistema de Participación Ciudadana
-
-**Participación Ciudadana:**
-- Presupuesto Participativo
-- Juntas de Acción Comunal (convenios solidarios)
-- Consejo Territorial de Planeación
-- Red Municipal de Veedurías
-
-**Seguridad y Convivencia:**
-- Plan de Seguridad y Convivencia (PISSC)
-- Fondo de Seguridad Territorial (FONSET)
-- Centro de Comando y Control 123
-- Cuerpo Oficial de Bomberos
-- Centro de Traslado por Protección
-
-**Protección Animal:**
-- Política Pública de Protección y Bienestar Animal
-- Junta Defensora de Animales
-- Albergue animal proyectado
-
-**Justicia:**
-- Casa de la Justicia
-- 3 Comisarías de Familia
-- 3 Inspecciones de Policía
-- Jueces de Paz
-- Casa de la Equidad (Capellanía, en gestión)
-
-**Gestión del Riesgo:**
-- Plan Municipal de Gestión del Riesgo
-- Cuerpo Oficial de Bomberos
-- Sistema de Información y Comunicación
-- Convenios con organismos de socorro
-
-## 📋 Contacto Municipal
-
-**Dirección:** Carrera 7 No. 1-19, Cajicá, Cundinamarca
-**Teléfono principal:** (+57) 1 878 2828
-**Portal oficial:** www.cajica-cundinamarca.gov.co
-**Email:** contacto@cajica-cundinamarca.gov.co
-**Horario de atención:** Lunes a viernes 8:00 AM - 5:00 PM
-
-## 📈 Indicadores de Resultados del Plan de Desarrollo
-
-### **Dimensión 1: Cajicá Ambiental Ideal y Sostenible**
-- **IR-1:** Áreas en proceso de restauración - Meta: 1% cuatrienio
-- **IR-2:** Fortalecimiento institucional ambiental - Meta: 100%
-- **IR-8:** Cobertura de alcantarillado - Meta: 100%
-- **IR-9:** Tratamiento adecuado residuos sólidos - Meta: 100%
-- **IR-10:** Déficit habitacional cuantitativo rural - Meta: 355 unidades
-
-### **Dimensión 2: Cajicá Desarrollo Social Ideal**
-- **IR-11:** Cobertura bruta en transición - Meta: 60%
-- **IR-12:** Cobertura bruta educación primaria - Meta: 82.06%
-- **IR-13:** Cobertura bruta educación secundaria - Meta: 82.13%
-- **IR-14:** Cobertura bruta educación media - Meta: 50.73%
-- **IR-16:** Cobertura régimen subsidiado salud - Meta: 73%
-- **IR-17:** Población pobre no atendida - Meta: 1%
-- **IR-20:** Cobertura vacunación triple viral - Meta: 90%
-
-## 🎯 Programas y Proyectos Estratégicos Principales
-
-### **Ambiente y Sostenibilidad:**
-- Plan anual adquisición y protección áreas de reserva hídrica
-- Implementación SIGAM (Sistema de Gestión Ambiental Municipal)
-- Plan Municipal de Educación Ambiental
-- Programa "Cajicá Innova" para economía circular
-- Sendero Ecológico Quebrada del Campo - La Cumbre
-
-### **Educación:**
-- Funcionamiento completo Colegio Agustín de Guerricabeitia
-- Plan Alimentario Escolar (PAE) al 100%
-- Transporte Escolar garantizado
-- Cátedra "Cajiqueño Soy"
-- Programa de multilingiüismo en I.E. públicas
-- Fondo de Educación Superior
-- Preparación Pruebas SABER
-
-### **Salud:**
-- Programa "Medicina en tu Hogar" (3,600 personas vulnerables)
-- Fortalecimiento ESE Hospital Jorge Cavelier
-- Estrategia Ciudades Saludables y Sustentables
-- Ruta Integral Atención Materno Perinatal
-- Programa de Ruta Saludable
-- 37,805 dosis vacunas antirrábicas cuatrienio
-
-### **Cultura:**
-- 8 Escuelas de Formación Artística y Cultural (EFACC)
-- 17 eventos culturales anuales
-- Portafolio Estímulos Talentos Artísticos
-- Concurso Municipal de Cuento "Cajicá Cuenta Diferente"
-- Centro Cultural Fernando Botero como epicentro regional
-- Plan Especial Manejo Patrimonio Histórico (PEMP)
-
-### **Deporte:**
-- 32 deportes en Escuela Polideportiva
-- Programas de altos logros y rendimiento deportivo
-- Construcción y mantenimiento escenarios deportivos
-- Apoyo educación física en 7 I.E. públicas
-
-### **Desarrollo Social:**
-- 16 Centros Atención Primera Infancia
-- Centro Día Persona Mayor (Quebrada del Campo)
-- Centro Protección Persona Mayor
-- Unidad Atención Integral Personas con Discapacidad
-- Banco de Alimentos
-- Casa de la Mujer Cajiqueña
-- Escuela de Liderazgo para la Mujer
-- Centro de Vida Sensorial
-
-### **Desarrollo Económico:**
-- Edificio Empresarial (Fase 1 y 2)
-- Plaza de Artesanos y Área de Gastronomía
-- Fondo de Emprendimiento de Cajicá
-- Escuela de emprendimiento y desarrollo empresarial
-- Sistema de Empleo de Cajicá
-- Estrategia "Cajicá Compra Cajicá" (CCC)
-- Promoción "Marca Cajicá"
-
-### **Infraestructura y Servicios:**
-- Tanque compensación 10,000 m³ agua potable
-- Estación bombeo con 2 tanques 2,500 m³ c/u
-- Optimización PTAR Calahorra
-- Puesta en marcha PTAR Rincón Santo
-- Plan Maestro Espacio Público y Movilidad Cero Emisiones
-- Parque integración familiar "Tronquitos"
-
-### **Vivienda:**
-- 90 unidades Vivienda Interés Prioritario (Rosales del Parque)
-- 35 subsidios construcción Vivienda Sitio Propio
-- 320 subsidios mejoramiento vivienda
-- Asesoría 250 hogares saneamiento y titulación predios
-
-### **Movilidad:**
-- Mantenimiento anual 13 km malla vial rural
-- Construcción 3,000 metros vias rurales
-- Rehabilitación 1,000 m² vías urbanas
-- Red Municipal Ciclorrutas y Bicicarriles
-- Terminal de transporte (gestión privada)
-- Organismo Tránsito y Transporte Municipal
-
-### **Gobierno y Administración:**
-- Sede Administrativa Alcaldía de Cajicá
-- Centro Comando, Control y Comunicaciones 123
-- Presupuesto Participativo anual
-- Fortalecimiento Cuerpo Oficial Bomberos
-- Albergue animal y parque para mascotas
-- Casa de la Equidad Capellanía
-
-### **Tecnología e Innovación:**
-- CajicaDATA (base datos estadísticos y espaciales)
-- Actualización catastro rural y urbano
-- 80% infraestructura conectividad
-- 6 actividades transformación digital anuales
-- Sistema Integral Información Municipal
-
-## 📊 Inversión y Presupuesto
-
-**Presupuesto Total Cuatrienio:** Más de 1.2 billones de pesos proyectados
-
-**Sectores con Mayor Inversión:**
-- Educación: >10,000 millones (Fondo Educación Superior, infraestructura)
-- Salud: >80,000 millones (régimen subsidiado, Hospital Cavelier)
-- Infraestructura vial: >10,000 millones (vías rurales y urbanas)
-- Servicios públicos: >20,000 millones (acueducto, alcantarillado, aseo)
-- Desarrollo social: >15,000 millones (primera infancia, adulto mayor)
-- Seguridad: >4,000 millones (FONSET, bomberos)
-
-**Principales Fuentes de Financiación:**
-- Recursos propios municipales
-- Transferencias nacionales (SGP)
-- Recursos departamentales
-- Cofinanciación nacional
-- Alianzas público-privadas
-            
-## Desarrollador de el asistente Virtual
-    - Samuel Esteban Ramirezco
-
-## 🔍 Seguimiento y Evaluación
-
-**Sistema de Monitoreo:**
-- Indicadores de resultado (IR) y gestión (IP)
-- Seguimiento trimestral y anual
-- Rendición de cuentas pública
-- Evaluaciones de impacto
-- Sistema de alertas tempranas
-
-**Instrumentos de Control:**
-- Modelo Integrado Planeación y Gestión (MIPG)
-- Plan Anticorrupción y Atención Ciudadano (PAAC)
-- Observatorio de Seguridad y Convivencia
-- Sistema de Participación Ciudadana
-- Veedurías ciudadanas
+Los datos detallados del municipio (alcaldesa, población, servicios públicos, indicadores, avances sectoriales, programas, presupuesto, contactos y normativa) **no están en estas instrucciones**: están en la base de conocimiento oficial.
+- Para un indicador de resultado por su código (por ejemplo "IR-12"), usa `consultar_indicador`.
+- Para el avance, indicadores, inversión y metas de uno de los 18 sectores, usa `avance_sector`.
+- Para cualquier otro dato, usa `buscar_informacion` con una consulta breve y específica (por ejemplo: "cobertura acueducto", "horario de atención").
+- Responde únicamente con lo que devuelvan las herramientas y cita la fuente o sección de la que proviene.
+- Si la herramienta no devuelve el dato, dilo claramente en lugar de aproximarlo.
 
 ## 🏛️ Uso de esta información
 
-Toda la información aquí contenida proviene de fuentes oficiales del Plan de Desarrollo Municipal "Cajicá Ideal 2024-2027" (Acuerdo 01 de 2024) y documentos técnicos de la administración municipal. Los datos deben ser utilizados respetando las reglas de precisión absoluta y transparencia ciudadana.
-""")
-
-class CajicaAssistantLite(Agent):
-    def __init__(self) -> None:
+Toda la información de la base de conocimiento proviene de fuentes oficiales del Plan de Desarrollo Municipal "Cajicá Ideal 2024-2027" (Acuerdo 01 de 2024) y documentos técnicos de la administración municipal. Los datos deben ser utilizados respetando las reglas de precisión absoluta y transparencia ciudadana.
+"""
+
+class CachedAnswersAgent(Agent):
+    """Responde desde la caché de respuestas antes de consultar el modelo.
+
+    Solo los agentes con ``caches_answers`` guardan sus respuestas; el resto solo las consulta.
+    La caché solo se usa con la primera pregunta de la conversación: una de seguimiento
+    ("¿y su horario?") depende de los turnos anteriores y no vale para otra llamada.
+    """
+
+    caches_answers = False
+
+    def __init__(
+        self,
+        *,
+        answer_cache: AnswerCache | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._answer_cache = answer_cache
+        self._pending_question: str | None = None
+        self._store_tasks: set[asyncio.Task[bool]] = set()
+
+    async def on_enter(self) -> None:
+        if self._answer_cache is not None and self.caches_answers:
+            self.session.on("conversation_item_added", self._record_answer)
+
+    async def on_exit(self) -> None:
+        if self._answer_cache is not None and self.caches_answers:
+            self.session.off("conversation_item_added", self._record_answer)
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        if self._answer_cache is None:
+            return
+        if not _standalone(turn_ctx):
+            self._pending_question = None
+            return
+        question = new_message.text_content or ""
+        # La caché vive en SQLite, compartida con los demás procesos: fuera del loop
+        answer = await asyncio.to_thread(self._answer_cache.lookup, question)
+        if answer is None:
+            self._pending_question = question
+            return
+        self._pending_question = None
+        logger.info(f"Respuesta desde caché para '{question}'")
+        self.session.say(answer)
+        raise StopResponse()
+
+    def _record_answer(self, ev: ConversationItemAddedEvent) -> None:
+        item = ev.item
+        cache = self._answer_cache
+        if (
+            cache is None
+            or not isinstance(item, llm.ChatMessage)
+            or item.role != "assistant"
+            or self._pending_question is None
+        ):
+            return
+        if not item.interrupted and item.text_content:
+            task = asyncio.create_task(asyncio.to_thread(cache.store, self._pending_question, item.text_content))
+            self._store_tasks.add(task)
+            task.add_done_callback(self._store_tasks.discard)
+        self._pending_question = None
+
+def _standalone(turn_ctx: llm.ChatContext) -> bool:
+    """Sin turnos previos del ciudadano ni su resumen: la pregunta no depende del contexto."""
+    return not any(
+        isinstance(item, llm.ChatMessage) and (item.role == "user" or is_summary(item)) for item in turn_ctx.items
+    )
+
+class CajicaAssistant(CachedAnswersAgent):
+    """Agente con las herramientas de datos oficiales.
+
+    Con ``tool_cache`` los resultados de las herramientas se comparten entre las sesiones
+    del proceso que usan la misma ``data_version``.
+    """
+
+    caches_answers = True
+
+    def __init__(
+        self,
+        knowledge: KnowledgeIndex,
+        indicators: IndicatorStore,
+        instructions: str = CAJICA_INSTRUCTIONS,
+        chat_ctx: llm.ChatContext | None = None,
+        answer_cache: AnswerCache | None = None,
+        tool_cache: ToolCache | None = None,
+        data_version: str | None = None,
+    ) -> None:
         super().__init__(
-            instructions=(
-                "Eres el asistente virtual de la Alcaldía de Cajicá. Responde con precisión,"
-                " cita fuentes oficiales cuando sea posible y no inventes cifras. Si falta una cifra exacta, dilo claramente."
-            )
+            instructions=instructions,
+            chat_ctx=chat_ctx,
+            answer_cache=answer_cache,
         )
+        self._knowledge = knowledge
+        self._indicators = indicators
+        self._tool_cache = tool_cache
+        self._data_version = data_version
+
+    async def _cached_tool(self, name: str, fn: Callable[..., Awaitable[str]], *args: str) -> str:
+        if self._tool_cache is None:
+            return await fn(*args)
+        return await self._tool_cache.get_or_call(name, args, self._data_version, lambda: fn(*args))
+
+    @function_tool()
+    async def buscar_informacion(self, context: RunContext, consulta: str) -> str:
+        """Busca información oficial del municipio de Cajicá y del Plan de Desarrollo "Cajicá Ideal 2024-2027": alcaldesa, población, servicios públicos, indicadores, avance de sectores, programas, presupuesto, normativa y datos de contacto.
+
+        Args:
+            consulta: Pregunta o palabras clave en español, por ejemplo "cobertura acueducto" o "horario de atención".
+        """
+        return await self._cached_tool("buscar_informacion", self._buscar_informacion, consulta)
+
+    async def _buscar_informacion(self, consulta: str) -> str:
+        results = self._knowledge.search(consulta, k=3)
+        logger.info(f"Búsqueda '{consulta}': {[p.title for p, _ in results]}")
+        if not results:
+            return "No se encontró información oficial sobre esa consulta en la base de conocimiento."
+        return "\n\n".join(passage.render() for passage, _ in results)
+
+    @function_tool()
+    async def consultar_indicador(self, context: RunContext, codigo: str) -> str:
+        """Devuelve la meta oficial de un indicador de resultado del Plan de Desarrollo a partir de su código.
+
+        Args:
+            codigo: Código del indicador, por ejemplo "IR-12".
+        """
+        return await self._cached_tool("consultar_indicador", self._consultar_indicador, codigo)
+
+    async def _consultar_indicador(self, codigo: str) -> str:
+        indicator = self._indicators.get_indicator(codigo)
+        logger.info(f"Indicador '{codigo}': {'encontrado' if indicator else 'no encontrado'}")
+        if indicator is None:
+            available = ", ".join(self._indicators.indicators)
+            return f"No existe el indicador '{codigo}' en el Plan de Desarrollo. Indicadores disponibles: {available}."
+        return self._indicators.describe_indicator(indicator)
+
+    @function_tool()
+    async def avance_sector(self, context: RunContext, sector: str) -> str:
+        """Devuelve el avance actual, los indicadores, la inversión y las metas de uno de los 18 sectores del Plan de Desarrollo.
+
+        Args:
+            sector: Nombre o número del sector, por ejemplo "Educación", "Salud" o "13".
+        """
+        return await self._cached_tool("avance_sector", self._avance_sector, sector)
+
+    async def _avance_sector(self, sector: str) -> str:
+        found = self._indicators.find_sector(sector)
+        logger.info(f"Sector '{sector}': {found.name if found else 'no encontrado'}")
+        if found is None:
+            available = ", ".join(s.name for s in self._indicators.sectors.values())
+            return f"No se identificó el sector '{sector}'. Sectores del Plan: {available}."
+        return self._indicators.describe_sector(found)
+
+CAJICA_LITE_INSTRUCTIONS = (
+    "Eres el asistente virtual de la Alcaldía de Cajicá. Responde con precisión,"
+    " cita fuentes oficiales cuando sea posible y no inventes cifras. Si falta una cifra exacta, dilo claramente."
+)
 
-async def entrypoint(ctx: JobContext):
-    try:
-        logger.info(f"Conectando a la sala {ctx.room.name}")
-        await asyncio.wait_for(ctx.connect(), timeout=60.0)
-
-        logger.info("Inicializando asistente virtual de Cajicá...")
+CAJICA_LITE_ESCALATION_INSTRUCTIONS = (
+    " Si el ciudadano pregunta por cifras, indicadores, avances, presupuesto, programas, contactos o cualquier"
+    " dato oficial del municipio, usa `transferir_a_asistente_completo` en lugar de responder de memoria."
+)
 
-        # Crear modelo LLM
-        model = openai.realtime.RealtimeModel(
-            voice="alloy",
-            model="gpt-4o-realtime-preview",
-            temperature=0.6,
+class CajicaAssistantLite(CachedAnswersAgent):
+    def __init__(
+        self,
+        escalate_to: Callable[[llm.ChatContext], Agent] | None = None,
+        chat_ctx: llm.ChatContext | None = None,
+        answer_cache: AnswerCache | None = None,
+    ) -> None:
+        instructions = CAJICA_LITE_INSTRUCTIONS
+        tools: list[llm.Tool] = []
+        if escalate_to is not None:
+            instructions += CAJICA_LITE_ESCALATION_INSTRUCTIONS
+            tools.append(
+                function_tool(
+                    self._transfer_to_full,
+                    name="transferir_a_asistente_completo",
+                    description=(
+                        "Transfiere la conversación al asistente con acceso a la información oficial"
+                        " del municipio (indicadores, sectores, programas, presupuesto y contactos)."
+                    ),
+                )
+            )
+        super().__init__(
+            instructions=instructions,
+            tools=tools,
+            chat_ctx=chat_ctx,
+            answer_cache=answer_cache,
+        )
+        self._escalate_to = escalate_to
+
+    async def _transfer_to_full(self, context: RunContext) -> tuple[Agent, str]:
+        assert self._escalate_to is not None, "la herramienta solo existe con escalate_to"
+        logger.info("Escalando la sesión al asistente completo")
+        return (
+            self._escalate_to(self.chat_ctx),
+            "Conversación transferida. Responde la consulta pendiente usando las herramientas oficiales.",
         )
 
-        # Pre-cargar VAD
-        logger.info("Cargando VAD...")
-        vad = silero.VAD.load()
-        
-        # Crear agente de Cajicá con conocimiento completo
-        agent = CajicaAssistant()
-
-        # Iniciar sesión
-        session = AgentSession(
-            llm=model,
-            vad=vad,
+def _prewarm_asset(proc: JobProcess, name: str, loader: Callable[[], Any]) -> None:
+    start = time.perf_counter()
+    proc.userdata[name] = loader()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    proc.userdata.setdefault("startup_timings", {})[name] = elapsed_ms
+    logger.info(f"Prewarm: '{name}' cargado en {elapsed_ms:.1f} ms (pid {proc.pid})")
+
+def prewarm(proc: JobProcess):
+    # Recursos pesados compartidos por todos los trabajos de este proceso
+    turn_config = TurnConfig.from_env()
+    proc.userdata["turn_config"] = turn_config
+    # El VAD de la sesión corre en un pool de hilos, fuera del event loop
+    audio_config = AudioFrontendConfig.from_env()
+    proc.userdata["audio_config"] = audio_config
+    _prewarm_asset(proc, "vad", lambda: load_vad(turn_config.profile, audio_config))
+    _prewarm_asset(proc, "instructions", CAJICA_INSTRUCTIONS.strip)
+    # Conocimiento e indicadores: se recargan en segundo plano cuando cambian los archivos
+    _prewarm_asset(proc, "data", DataWatcher.from_env)
+    _prewarm_asset(proc, "greeting", load_greeting)
+    _prewarm_asset(proc, "recovery_audio", load_recovery_audio)
+    _prewarm_asset(proc, "answer_cache", lambda: _load_answer_cache(proc.userdata["data"].current))
+    _prewarm_asset(proc, "tool_cache", ToolCache.from_env)
+
+def _load_answer_cache(data: MunicipalData) -> AnswerCache | None:
+    cache = AnswerCache.from_env()
+    if cache is not None:
+        # Las respuestas precalculadas se guardan aquí, antes de la primera sala
+        cache.set_data_version(data.version, data.indicators.sector_terms)
+    return cache
+
+async def _cache_greeting(proc: JobProcess) -> None:
+    try:
+        proc.userdata["greeting"] = await synthesize_greeting()
+    except Exception as e:
+        logger.warning(f"No se pudo sintetizar el saludo en caché: {e}")
+
+def create_session(
+    proc: JobProcess,
+    decision: TierDecision,
+    model: llm.RealtimeModel | llm.LLM | None = None,
+    chat_ctx: llm.ChatContext | None = None,
+) -> tuple[AgentSession, Agent]:
+    """Arma la sesión y el agente inicial con los recursos precargados del proceso.
+
+    ``model`` reemplaza a los modelos de OpenAI (lo usa ``bench.py``). ``chat_ctx`` es la
+    conversación previa cuando la sesión se vuelve a armar tras un error.
+    """
+    recovery = RecoveryConfig.from_env()
+    answer_cache = proc.userdata["answer_cache"]
+    tool_cache = proc.userdata["tool_cache"]
+    turn_config: TurnConfig = proc.userdata["turn_config"]
+    # La sesión conserva la versión de los datos con la que empezó, aunque luego se recarguen
+    data = proc.userdata["data"].current
+    if answer_cache is not None:
+        # Las respuestas guardadas con otra versión pueden citar cifras distintas: no se usan
+        answer_cache.set_data_version(data.version, data.indicators.sector_terms)
+    if tool_cache is not None:
+        # Los resultados de versiones anteriores se descartan; la clave incluye la versión
+        tool_cache.set_data_version(data.version)
+
+    # Crear modelos: realtime o STT → LLM → TTS según CAJICA_MODEL_MODE. La caché de
+    # respuestas necesita la transcripción antes de que el modelo responda, así que con
+    # ella el fin de turno se detecta en el agente también en modo realtime
+    if model is None:
+        model_config = ModelConfig.from_env()
+        model_options = model_config.session_options(
+            turn_config, transcribe_turns=answer_cache is not None, conn_options=recovery.conn_options()
         )
-        await session.start(
-            room=ctx.room,
-            agent=agent,
-            room_input_options=RoomInputOptions(close_on_disconnect=False)
+        logger.info(
+            f"Modo de modelo: {model_config.mode.value}, turnos: perfil {turn_config.profile.name}"
+            f"{' con modelo de fin de turno' if turn_config.eou_model else ''}"
         )
+        # La conexión con el modelo realtime se abre ya, sin esperar a session.start()
+        if isinstance(model_options["llm"], llm.RealtimeModel):
+            pool = RealtimeSessionPool.from_env(model_options["llm"])
+            pool.start()
+            model_options["llm"] = PooledRealtimeModel(pool)
+    else:
+        model_options = dict(llm=model, turn_handling=turn_config.turn_handling(transcripts=False))
+
+    # Crear agente de Cajicá con búsqueda e indicadores oficiales
+    def full_agent(chat_ctx: llm.ChatContext | None = None) -> CajicaAssistant:
+        return CajicaAssistant(
+            knowledge=data.knowledge,
+            indicators=data.indicators,
+            instructions=proc.userdata["instructions"],
+            chat_ctx=chat_ctx,
+            answer_cache=answer_cache,
+            tool_cache=tool_cache,
+            data_version=data.version,
+        )
+
+    # Elegir el agente inicial según la política de tiering y la carga del worker
+    if decision.start_lite:
+        agent = CajicaAssistantLite(
+            escalate_to=full_agent if decision.allow_escalation else None,
+            chat_ctx=chat_ctx,
+            answer_cache=answer_cache,
+        )
+    else:
+        agent = full_agent(chat_ctx)
+    logger.info(f"Agente inicial: {type(agent).__name__} ({decision.reason})")
+
+    # VAD precargado en prewarm
+    session = AgentSession(
+        vad=proc.userdata["vad"],
+        conn_options=recovery.session_conn_options(),
+        **model_options,
+    )
+    # Contexto acotado: los turnos antiguos se resumen para que el costo por turno no
+    # crezca con la duración de la llamada (resumen local en el benchmark)
+    ContextWindow.from_env(local_summary=model is not None).attach(session)
+    return session, agent
+
+async def entrypoint(ctx: JobContext):
+    try:
+        # La carga se mide mientras se conecta, sin añadir espera antes del saludo
+        tiering_policy = TieringPolicy.from_env()
+        load_task = asyncio.create_task(sample_worker_load())
+        lag_monitor = LoopLagMonitor()
+        lag_monitor.start()
+        ctx.add_shutdown_callback(lag_monitor.aclose)
+        # Registro de la conversación en el servidor para auditoría, fuera del camino del audio
+        transcript_sink = TranscriptSink.from_env()
+        transcript: TranscriptRecorder | None = None
+        if transcript_sink is not None:
+            transcript_sink.start()
+            ctx.add_shutdown_callback(transcript_sink.aclose)
+            transcript = TranscriptRecorder(transcript_sink, ctx.job.id, ctx.room.name)
+        # Transcripción en vivo para el frontend; sobrevive a los reinicios de la sesión
+        transcript_stream = TranscriptStream.from_env()
 
-        # Generar saludo inicial
-        await session.generate_reply(
-            instructions=(
-                "Di exactamente este texto sin cambios ni adiciones: "
-                "'¡Hola! Soy el asistente virtual de la Alcaldía de Cajicá. "
-                "Puedo ayudarte con información sobre nuestro Plan de Desarrollo Municipal "
-                "Cajicá Ideal 2024-2027, sus 18 sectores estratégicos y los servicios municipales. "
-                "¿En qué puedo ayudarte hoy?'"
+        logger.info(f"Conectando a la sala {ctx.room.name}")
+        connect_start = time.perf_counter()
+        connect_task = asyncio.create_task(asyncio.wait_for(ctx.connect(), timeout=60.0))
+        decision = tiering_policy.decide(await load_task)
+
+        answer_cache = ctx.proc.userdata["answer_cache"]
+        if answer_cache is not None:
+
+            async def log_answer_cache_stats() -> None:
+                answer_cache.log_stats()
+
+            ctx.add_shutdown_callback(log_answer_cache_stats)
+
+        tool_cache = ctx.proc.userdata["tool_cache"]
+        if tool_cache is not None:
+
+            async def log_tool_cache_stats() -> None:
+                tool_cache.log_stats()
+
+            ctx.add_shutdown_callback(log_tool_cache_stats)
+
+        async def start_session(chat_ctx: llm.ChatContext | None) -> AgentSession:
+            # Mientras la sala se conecta: elegir el agente y abrir la sesión del modelo.
+            # create_session lee la misma versión de los datos, sin await de por medio
+            data_version = ctx.proc.userdata["data"].current.version
+            session, agent = create_session(ctx.proc, decision, chat_ctx=chat_ctx)
+            pool = session.llm.pool if isinstance(session.llm, PooledRealtimeModel) else None
+            if pool is not None:
+                ctx.add_shutdown_callback(pool.aclose)
+
+            session_metrics = SessionMetrics.from_env(ctx.room.name, sink=transcript.record if transcript else None)
+            if chat_ctx is None:
+                await connect_task
+                session_metrics.record_connect(time.perf_counter() - connect_start)
+                if transcript_stream is not None:
+                    transcript_stream.start(ctx.room)
+                    ctx.add_shutdown_callback(transcript_stream.aclose)
+                logger.info("Inicializando asistente virtual de Cajicá...")
+
+            # Iniciar sesión
+            session_metrics.attach(session)
+            if transcript is not None:
+                transcript.attach(session, data_version)
+            if transcript_stream is not None:
+                transcript_stream.attach(session)
+            await session.start(
+                room=ctx.room,
+                agent=agent,
+                room_options=room_io.RoomOptions(
+                    audio_input=room_io.AudioInputOptions(
+                        noise_cancellation=ctx.proc.userdata["audio_config"].noise_filter(),
+                    ),
+                    # La transcripción en vivo recibe el texto del agente sincronizado con el
+                    # audio, así que una respuesta interrumpida solo muestra lo que se dijo
+                    text_output=room_io.TextOutputOptions(
+                        next_in_chain=transcript_stream.text_output() if transcript_stream is not None else None,
+                    ),
+                    close_on_disconnect=False,
+                ),
             )
+            # El proceso atiende una sola sala: no hace falta reponer la sesión reclamada
+            if pool is not None:
+                await pool.aclose()
+            return session
+
+        # Si el modelo cae del todo, la sesión se vuelve a armar con el contexto de la conversación
+        supervisor = SessionSupervisor(
+            ctx,
+            start_session,
+            max_restarts=RecoveryConfig.from_env().max_restarts,
+            audio=ctx.proc.userdata["recovery_audio"],
         )
+        session = await supervisor.start()
+
+        # En salas preaprovisionadas el agente llega antes que el ciudadano
+        await ctx.wait_for_participant()
+
+        # Saludo inicial: audio en caché si existe, sin pasar por el modelo
+        greeting = ctx.proc.userdata["greeting"]
+        if greeting is not None:
+            await session.say(greeting.text, audio=greeting.frames())
+        else:
+            await session.generate_reply(
+                instructions=f"Di exactamente este texto sin cambios ni adiciones: '{GREETING_TEXT}'"
+            )
+            # Poblar la caché fuera del camino crítico para los siguientes trabajos
+            if "greeting_task" not in ctx.proc.userdata:
+                ctx.proc.userdata["greeting_task"] = asyncio.create_task(_cache_greeting(ctx.proc))
 
         logger.info("Asistente virtual de Cajicá listo para atender")
 
@@ -853,13 +612,72 @@ async def entrypoint(ctx: JobContext):
         logger.error(f"Error in entrypoint: {e}", exc_info=True)
         raise
 
+def profile_startup() -> None:
+    """Reporta cuánto tarda un proceso de trabajo en importar el agente y precargar sus recursos."""
+    import psutil
+
+    imports_started_at = time.time() - (time.perf_counter() - _IMPORT_START)
+    timings = {
+        "intérprete": (imports_started_at - psutil.Process().create_time()) * 1000,
+        "imports de agent.py": _IMPORT_SECONDS * 1000,
+    }
+    start = time.perf_counter()
+    register_plugins()
+    timings["plugins (openai, silero)"] = (time.perf_counter() - start) * 1000
+
+    proc = JobProcess(executor_type=JobExecutorType.THREAD, user_arguments=None, http_proxy=None)
+    prewarm(proc)
+    timings.update({f"prewarm: {name}": ms for name, ms in proc.userdata["startup_timings"].items()})
+
+    width = max(len(name) for name in timings)
+    for name, ms in timings.items():
+        print(f"{name:<{width}}  {ms:8.1f} ms")
+    print(f"{'total':<{width}}  {sum(timings.values()):8.1f} ms")
+
 if __name__ == "__main__":
+    configure_logging()
+    if "--profile-startup" in sys.argv:
+        profile_startup()
+        sys.exit(0)
     try:
-        cli.run_app(
+        check_environment()
+        register_plugins()
+        # Con CAJICA_METRICS_PORT el worker expone /metrics en formato Prometheus,
+        # agregando las métricas de todos los procesos de trabajo
+        metrics_options: dict[str, Any] = {}
+        if os.getenv("CAJICA_METRICS_PORT"):
+            metrics_options = dict(
+                prometheus_port=int(os.environ["CAJICA_METRICS_PORT"]),
+                prometheus_multiproc_dir=os.getenv(
+                    "PROMETHEUS_MULTIPROC_DIR", os.path.join(os.path.dirname(__file__), ".cache", "prometheus")
+                ),
+            )
+        # Procesos precargados a la espera de una sala; cada uno abre su sesión realtime
+        # en cuanto recibe el trabajo, así que reponen el "pool" entre salas
+        idle_options: dict[str, Any] = {}
+        if os.getenv("CAJICA_IDLE_PROCESSES"):
+            idle_options = dict(num_idle_processes=int(os.environ["CAJICA_IDLE_PROCESSES"]))
+        # Con nombre, el agente solo entra a las salas a las que se despacha explícitamente
+        # (connection_service.py las preaprovisiona)
+        dispatch_options: dict[str, Any] = {}
+        if os.getenv("CAJICA_AGENT_NAME"):
+            dispatch_options = dict(agent_name=os.environ["CAJICA_AGENT_NAME"])
+        worker_load = WorkerLoad.from_env()
+        server = AgentServer.from_server_options(
             WorkerOptions(
                 entrypoint_fnc=entrypoint,
+                prewarm_fnc=prewarm,
+                load_fnc=worker_load,
+                load_threshold=float(os.getenv("CAJICA_LOAD_THRESHOLD", "0.75")),
+                # Con SIGTERM el worker deja de aceptar salas y espera a que terminen las llamadas
+                drain_timeout=RecoveryConfig.from_env().drain_timeout,
+                **metrics_options,
+                **idle_options,
+                **dispatch_options,
             )
         )
+        worker_load.attach(server)
+        cli.run_app(server)
     except Exception as e:
         logger.error(f"Failed to start application: {e}", exc_info=True)
         raise
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""Análisis offline de las transcripciones: temas más consultados y preguntas sin respuesta.
+
+Lee ``transcripts.sqlite3`` (ver ``transcripts.py``) sesión por sesión en bloques de
+``--chunk-size`` filas, clasifica cada pregunta del ciudadano en la taxonomía del Plan
+(indicador, sector y dimensión, o sección de la base de conocimiento) y escribe un
+reporte JSON con los temas principales, las preguntas que quedaron sin respuesta, un
+conjunto de respuestas precalculadas para la caché de respuestas
+(``CAJICA_ANSWER_CACHE_SEED``) y pistas de búsqueda para las preguntas más frecuentes.
+
+La memoria queda acotada: solo se guarda el turno en curso y, como mucho,
+``--max-questions`` preguntas distintas por contador.
+
+Uso:
+    python analytics.py .cache/transcripts/transcripts.sqlite3 --out reporte.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from indicators import IndicatorStore, normalize_code
+from knowledge import KnowledgeIndex, normalize, tokenize
+from municipal_data import load_municipal_data
+
+logger = logging.getLogger("cajica-assistant")
+
+_CODE_RE = re.compile(r"\b(IR|IP)\s*-?\s*(\d+)\b", re.IGNORECASE)
+
+# Frases con las que el asistente y las herramientas reconocen que no tienen el dato
+_NOT_FOUND = (
+    "no tengo disponible",
+    "no dispongo",
+    "necesito verificar",
+    "no se encontro",
+    "no existe el indicador",
+    "no se identifico",
+)
+
+
+def _not_found(text: str) -> bool:
+    text = normalize(text)
+    return any(phrase in text for phrase in _NOT_FOUND)
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str | None = None
+    interrupted: bool = False
+    tools: list[dict] = field(default_factory=list)
+    # Versión de los datos municipales con la que se generó la respuesta
+    data_version: str | None = None
+
+    @property
+    def answered(self) -> bool:
+        if not self.answer or _not_found(self.answer):
+            return False
+        # Si se consultaron herramientas, al menos una debe haber devuelto el dato
+        return not self.tools or any(not t["is_error"] and not _not_found(t["output"] or "") for t in self.tools)
+
+    @property
+    def grounded(self) -> bool:
+        """Respuesta completa y basada en datos de las herramientas: apta para precalcular."""
+        return self.answered and not self.interrupted and bool(self.tools)
+
+
+class BoundedCounter:
+    """Cuenta preguntas distintas conservando como mucho ``capacity`` claves.
+
+    Cuando se llena, descarta la mitad menos frecuente: las preguntas calientes de un log
+    grande sobreviven y la memoria no depende del tamaño del log.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts: Counter[str] = Counter()
+        self.examples: dict[str, str] = {}
+        self.pruned = 0
+
+    def add(self, key: str, example: str) -> None:
+        if key not in self.counts and len(self.counts) >= self.capacity:
+            keep = dict(self.counts.most_common(self.capacity // 2))
+            self.pruned += len(self.counts) - len(keep)
+            self.counts = Counter(keep)
+            self.examples = {k: self.examples[k] for k in keep}
+        self.counts[key] += 1
+        self.examples.setdefault(key, example)
+
+    def most_common(self, n: int) -> list[tuple[str, str, int]]:
+        return [(key, self.examples[key], count) for key, count in self.counts.most_common(n)]
+
+
+def question_key(question: str) -> str:
+    return " ".join(sorted(set(tokenize(question))))
+
+
+class IntentClassifier:
+    """Asigna cada pregunta a un tema de la taxonomía del Plan de Desarrollo."""
+
+    def __init__(self, indicators: IndicatorStore, knowledge: KnowledgeIndex) -> None:
+        self.indicators = indicators
+        self.knowledge = knowledge
+
+    def _sector_intent(self, name: str) -> str | None:
+        sector = self.indicators.find_sector(name)
+        if sector is None:
+            return None
+        dimension = self.indicators.dimensions[sector.dimension]
+        return f"Sector {sector.number}. {sector.name} (Dimensión {dimension.number}: {dimension.name})"
+
+    def classify(self, turn: Turn) -> str:
+        codes = [normalize_code(f"{m.group(1)}-{m.group(2)}") for m in _CODE_RE.finditer(turn.question)]
+        codes += [normalize_code(str(_arguments(t).get("codigo", ""))) for t in turn.tools if t["name"] == "consultar_indicador"]
+        for code in codes:
+            indicator = self.indicators.indicators.get(code) if code else None
+            if indicator is not None:
+                return f"Indicador {indicator.code}: {indicator.name}"
+        for tool in turn.tools:
+            if tool["name"] == "avance_sector" and (intent := self._sector_intent(str(_arguments(tool).get("sector", "")))):
+                return intent
+        if intent := self._sector_intent(turn.question):
+            return intent
+        results = self.knowledge.search(turn.question, k=1)
+        if results:
+            # Sección de primer nivel del pasaje: "Servicios públicos", "Contacto", ...
+            return f"Tema: {results[0][0].title.split(' › ')[0]}"
+        return "Otro"
+
+
+def _arguments(tool: dict) -> dict:
+    try:
+        arguments = json.loads(tool["arguments"] or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return arguments if isinstance(arguments, dict) else {}
+
+
+def iter_turns(db_path: Path, chunk_size: int = 5000) -> Iterator[tuple[str, Turn]]:
+    """Reconstruye los turnos (pregunta, herramientas, respuesta) sesión por sesión."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT session_id, kind, data FROM events WHERE kind IN ('message', 'tool')"
+            " ORDER BY session_id, created_at, id"
+        )
+        # Sin sesión todavía: ningún session_id de la base es vacío
+        session = ""
+        turn: Turn | None = None
+        while rows := cursor.fetchmany(chunk_size):
+            for session_id, kind, raw in rows:
+                if session_id != session:
+                    if turn is not None:
+                        yield session, turn
+                    session, turn = session_id, None
+                data = json.loads(raw)
+                if kind == "message" and data["role"] == "user":
+                    if turn is not None:
+                        yield session, turn
+                    turn = Turn(question=data["text"])
+                elif turn is None:
+                    continue
+                elif kind == "tool":
+                    turn.tools.append(data)
+                else:
+                    # Varias respuestas al mismo turno (por ejemplo, tras una herramienta): gana la última
+                    turn.answer = data["text"]
+                    turn.interrupted = data["interrupted"]
+                    turn.data_version = data.get("data_version")
+        if turn is not None:
+            yield session, turn
+    finally:
+        conn.close()
+
+
+@dataclass
+class AnalyticsReport:
+    generated_at: float
+    sessions: int
+    questions: int
+    unanswered_questions: int
+    pruned_questions: int
+    intents: list[dict]
+    unanswered: list[dict]
+    precomputed_answers: list[dict]
+    retrieval_hints: list[dict]
+
+
+def analyze(
+    db_path: Path,
+    *,
+    indicators: IndicatorStore,
+    knowledge: KnowledgeIndex,
+    chunk_size: int = 5000,
+    max_questions: int = 10000,
+    top: int = 50,
+) -> AnalyticsReport:
+    classifier = IntentClassifier(indicators, knowledge)
+    intents: Counter[str] = Counter()
+    intent_examples: dict[str, list[str]] = {}
+    questions = BoundedCounter(max_questions)
+    unanswered = BoundedCounter(max_questions)
+    # Clave de la pregunta -> (respuesta, versión de los datos)
+    answers: dict[str, tuple[str, str | None]] = {}
+    sessions: set[str] = set()
+    total = missed = 0
+
+    for session_id, turn in iter_turns(db_path, chunk_size):
+        key = question_key(turn.question)
+        if not key:
+            continue
+        sessions.add(session_id)
+        total += 1
+        intent = classifier.classify(turn)
+        intents[intent] += 1
+        examples = intent_examples.setdefault(intent, [])
+        if len(examples) < 3 and turn.question not in examples:
+            examples.append(turn.question)
+        questions.add(key, turn.question)
+        if not turn.answered:
+            missed += 1
+            unanswered.add(key, turn.question)
+        elif turn.grounded and turn.answer is not None:
+            # La respuesta más reciente con datos oficiales para cada pregunta
+            answers[key] = (turn.answer, turn.data_version)
+        if len(answers) > max_questions:
+            answers = {k: v for k, v in answers.items() if k in questions.counts}
+
+    hot = questions.most_common(top)
+    precomputed = [
+        {"question": example, "answer": answers[key][0], "data_version": answers[key][1], "count": count}
+        for key, example, count in hot
+        if key in answers and key not in unanswered.counts
+    ]
+    hints = [
+        {"question": example, "count": count, "passages": [p.title for p, _ in knowledge.search(example, k=3)]}
+        for _, example, count in hot
+    ]
+    return AnalyticsReport(
+        generated_at=time.time(),
+        sessions=len(sessions),
+        questions=total,
+        unanswered_questions=missed,
+        pruned_questions=questions.pruned,
+        intents=[
+            {"intent": intent, "count": count, "examples": intent_examples[intent]}
+            for intent, count in intents.most_common(top)
+        ],
+        unanswered=[{"question": example, "count": count} for _, example, count in unanswered.most_common(top)],
+        precomputed_answers=precomputed,
+        retrieval_hints=hints,
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("db", type=Path, help="Base de datos de transcripciones (transcripts.sqlite3)")
+    parser.add_argument("--out", type=Path, required=True, help="Escribe el reporte en este archivo JSON")
+    parser.add_argument("--answers", type=Path, help="Escribe además las respuestas precalculadas (CAJICA_ANSWER_CACHE_SEED)")
+    parser.add_argument("--top", type=int, default=50, help="Temas y preguntas que se reportan")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Filas leídas por bloque")
+    parser.add_argument("--max-questions", type=int, default=10000, help="Preguntas distintas que se cuentan a la vez")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    data = load_municipal_data()
+    report = analyze(
+        args.db,
+        indicators=data.indicators,
+        knowledge=data.knowledge,
+        chunk_size=args.chunk_size,
+        max_questions=args.max_questions,
+        top=args.top,
+    )
+    args.out.write_text(json.dumps(asdict(report), ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.answers:
+        args.answers.write_text(json.dumps(report.precomputed_answers, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(
+        f"{report.sessions} sesiones, {report.questions} preguntas, {report.unanswered_questions} sin respuesta\n"
+        f"{len(report.precomputed_answers)} respuestas precalculadas, {len(report.intents)} temas"
+    )
+    for intent in report.intents[:10]:
+        print(f"  {intent['count']:6d}  {intent['intent']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
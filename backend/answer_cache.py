@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from knowledge import tokenize
+
+logger = logging.getLogger("cajica-assistant")
+
+CACHE_PATH = Path(os.getenv("CAJICA_CACHE_DIR", Path(__file__).parent / ".cache")) / "answers.sqlite3"
+
+_CODE_RE = re.compile(r"\b(IR|IP)\s*-?\s*(\d+)\b", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    data_version TEXT NOT NULL,
+    entities TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_key ON answers (data_version, entities);
+CREATE INDEX IF NOT EXISTS answers_used ON answers (used_at);
+"""
+
+
+@dataclass
+class AnswerCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class AnswerCache:
+    """Caché semántica de respuestas a preguntas frecuentes, compartida entre procesos.
+
+    Cada proceso de trabajo atiende una sola sala, así que las respuestas viven en SQLite
+    (modo WAL) en ``path`` y las comparten todas las sesiones de la máquina. Una pregunta
+    solo reutiliza una respuesta si nombra exactamente las mismas entidades (códigos de
+    indicador, números y palabras de los nombres de sector, ver ``entities``) y, entre
+    esas, si sus términos normalizados (hashing trick) tienen similitud coseno de al menos
+    ``threshold``: "avance del sector salud" nunca recibe la cifra de educación. Las
+    entradas expiran tras ``ttl`` segundos, solo valen para la versión de los datos con la
+    que se generaron y, por encima de ``capacity``, se descartan las menos usadas.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_PATH,
+        *,
+        capacity: int = 512,
+        ttl: float = 6 * 3600,
+        threshold: float = 0.85,
+        dim: int = 1024,
+        min_terms: int = 2,
+        max_answer_chars: int = 1500,
+    ) -> None:
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self.dim = dim
+        self.min_terms = min_terms
+        self.max_answer_chars = max_answer_chars
+        self.stats = AnswerCacheStats()
+        # Versión de los datos municipales de las sesiones de este proceso
+        self.data_version: str | None = None
+        # Palabras de los nombres de sector de esa versión
+        self.entity_terms: frozenset[str] = frozenset()
+        self._seed: list[dict] = []
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> AnswerCache | None:
+        if os.getenv("CAJICA_ANSWER_CACHE", "0").strip().lower() not in ("1", "true", "yes"):
+            return None
+        cache = cls(
+            capacity=int(os.getenv("CAJICA_ANSWER_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("CAJICA_ANSWER_CACHE_TTL", str(6 * 3600))),
+            threshold=float(os.getenv("CAJICA_ANSWER_CACHE_THRESHOLD", "0.85")),
+        )
+        # Respuestas precalculadas por analytics.py para las preguntas más frecuentes; se
+        # guardan al conocer la versión de los datos (``set_data_version``)
+        seed_path = os.getenv("CAJICA_ANSWER_CACHE_SEED")
+        if seed_path:
+            try:
+                cache._seed = json.loads(Path(seed_path).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"No se pudieron cargar las respuestas precalculadas de {seed_path}: {e}")
+        return cache
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def set_data_version(self, version: str, entity_terms: Iterable[str] = ()) -> None:
+        """Versión de los datos y palabras de los nombres de sector con que trabaja el proceso."""
+        self.data_version = version
+        self.entity_terms = frozenset(entity_terms)
+        if self._seed:
+            seed, self._seed = self._seed, []
+            self.seed(seed)
+
+    def entities(self, question: str) -> str:
+        """Clave de entidades de una pregunta: debe coincidir exactamente para reutilizar una respuesta."""
+        found = {f"{m.group(1).upper()}-{int(m.group(2))}" for m in _CODE_RE.finditer(question)}
+        found.update(t for t in tokenize(question) if t.isdigit() or t in self.entity_terms)
+        return " ".join(sorted(found))
+
+    def _embed(self, text: str) -> np.ndarray | None:
+        terms = tokenize(text)
+        if len(set(terms)) < self.min_terms:
+            return None
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for term in terms:
+            vec[zlib.crc32(term.encode("utf-8")) % self.dim] += 1.0
+        return vec / np.linalg.norm(vec)
+
+    def _best_match(
+        self, conn: sqlite3.Connection, vec: np.ndarray, entities: str, now: float
+    ) -> tuple[int, str] | None:
+        rows = conn.execute(
+            "SELECT id, vector, answer FROM answers WHERE data_version = ? AND entities = ? AND expires_at > ?",
+            (self.data_version, entities, now),
+        ).fetchall()
+        if not rows:
+            return None
+        scores = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) @ vec
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return rows[best][0], rows[best][2]
+
+    def lookup(self, question: str) -> str | None:
+        """Respuesta guardada para una pregunta equivalente; hace E/S de disco, usar fuera del loop."""
+        vec = self._embed(question)
+        if vec is None or self.data_version is None:
+            self.stats.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            match = self._best_match(conn, vec, self.entities(question), now)
+            if match is None:
+                self.stats.misses += 1
+                return None
+            with conn:
+                conn.execute("UPDATE answers SET used_at = ? WHERE id = ?", (now, match[0]))
+        self.stats.hits += 1
+        return match[1]
+
+    def store(self, question: str, answer: str) -> bool:
+        answer = answer.strip()
+        vec = self._embed(question)
+        if vec is None or self.data_version is None or not answer or len(answer) > self.max_answer_chars:
+            return False
+        now = time.time()
+        entities = self.entities(question)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self.stats.expirations += conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,)).rowcount
+                # Una pregunta equivalente ya en caché conserva su respuesta y su expiración
+                if self._best_match(conn, vec, entities, now) is not None:
+                    return False
+                conn.execute(
+                    "INSERT INTO answers (data_version, entities, vector, question, answer, expires_at, used_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.data_version, entities, vec.tobytes(), question, answer, now + self.ttl, now),
+                )
+                self.stats.evictions += conn.execute(
+                    "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY used_at"
+                    " LIMIT max((SELECT COUNT(*) FROM answers) - ?, 0))",
+                    (self.capacity,),
+                ).rowcount
+        self.stats.stores += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM answers")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def seed(self, entries: list[dict]) -> int:
+        """Precarga ``{"question", "answer", "data_version"}``, del más al menos frecuente.
+
+        Solo se guardan las respuestas generadas con la versión actual de los datos: las de
+        versiones anteriores pueden citar cifras que ya cambiaron.
+        """
+        current = [entry for entry in entries if entry.get("data_version") == self.data_version]
+        stored = 0
+        for entry in current[: self.capacity]:
+            stored += self.store(entry["question"], entry["answer"])
+        logger.info(
+            f"Caché de respuestas: {stored} respuestas precalculadas cargadas,"
+            f" {len(entries) - len(current)} descartadas por ser de otra versión de los datos"
+        )
+        return stored
+
+    def log_stats(self) -> None:
+        s = self.stats
+        logger.info(
+            f"Caché de respuestas: {s.hits} aciertos, {s.misses} fallos (tasa {s.hit_rate:.1%}),"
+            f" {len(self)}/{self.capacity} entradas, {s.evictions} desalojos, {s.expirations} expiradas"
+        )
@@ -0,0 +1,339 @@
+"""Front end de audio fuera del event loop: remuestreo y VAD en un pool acotado de hilos.
+
+El VAD de Silero del plugin remuestrea y aplica su máquina de estados en el event loop
+de la sesión, y abre un hilo por stream para la inferencia. ``OffloadedVAD`` agrupa los
+cuadros de audio de cada sesión en lotes de ``batch_ms`` y los procesa completos (mezcla
+a mono, remuestreo a 16 kHz, inferencia de Silero y detección de inicio y fin de habla)
+en un pool de ``workers`` hilos. El loop solo entrega cuadros y reenvía eventos, así que
+los picos de CPU del VAD ya no retrasan el WebSocket ni el resto del trabajo de la sesión.
+
+La supresión de ruido, si se activa, la aplica LiveKit en código nativo al audio de
+entrada de la sala, antes del VAD y del modelo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad
+from prometheus_client import Histogram
+
+from turn_detection import TurnProfile
+
+logger = logging.getLogger("cajica-assistant")
+
+SAMPLE_RATE = 16000
+# Ventana de inferencia de Silero a 16 kHz: 32 ms
+WINDOW_SAMPLES = 512
+WINDOW_SECONDS = WINDOW_SAMPLES / SAMPLE_RATE
+_MAX_BUFFERED_SPEECH = 60.0
+_SMOOTHING = 0.35
+
+_NOISE_FILTERS = {"nc": "NC", "bvc": "BVC", "bvc_telephony": "BVCTelephony"}
+
+LOOP_LAG_SECONDS = Histogram(
+    "cajica_event_loop_lag_seconds",
+    "Retraso del event loop de un proceso de trabajo respecto a lo programado",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+@dataclass(frozen=True)
+class AudioFrontendConfig:
+    """Cómo se procesa el audio de entrada de la sesión.
+
+    - ``workers``: hilos del proceso que remuestrean y corren el VAD; ``0`` usa el VAD de
+      Silero del plugin tal cual.
+    - ``batch_ms``: audio que se acumula antes de enviarlo al pool.
+    - ``noise_cancellation``: filtro de LiveKit (``nc``, ``bvc`` o ``bvc_telephony``) que
+      se aplica al audio del ciudadano; requiere ``livekit-plugins-noise-cancellation``.
+    """
+
+    workers: int = 2
+    batch_ms: int = 64
+    noise_cancellation: str | None = None
+
+    @classmethod
+    def from_env(cls) -> AudioFrontendConfig:
+        noise = os.getenv("CAJICA_NOISE_CANCELLATION", "").strip().lower() or None
+        if noise is not None and noise not in _NOISE_FILTERS:
+            logger.warning(f"CAJICA_NOISE_CANCELLATION inválido '{noise}', se desactiva la supresión de ruido")
+            noise = None
+        return cls(
+            workers=int(os.getenv("CAJICA_AUDIO_WORKERS", str(cls.workers))),
+            batch_ms=int(os.getenv("CAJICA_AUDIO_BATCH_MS", str(cls.batch_ms))),
+            noise_cancellation=noise,
+        )
+
+    def noise_filter(self) -> Any | None:
+        """Filtro para ``RoomInputOptions(noise_cancellation=...)``."""
+        if self.noise_cancellation is None:
+            return None
+        from livekit.plugins import noise_cancellation  # pyright: ignore[reportAttributeAccessIssue]
+
+        return getattr(noise_cancellation, _NOISE_FILTERS[self.noise_cancellation])()
+
+
+class AudioFrontend:
+    """Pool de hilos y sesión ONNX de Silero de un proceso de trabajo.
+
+    Cada proceso atiende una sola sala, pero una sesión puede abrir más de un stream de
+    VAD (por ejemplo, al reanudarse). La sesión de ONNX Runtime admite llamadas
+    concurrentes; cada stream tiene su propio estado recurrente y nunca más de un lote en
+    el pool, así que los hilos no comparten estado mutable.
+    """
+
+    def __init__(self, config: AudioFrontendConfig) -> None:
+        from livekit.plugins.silero import onnx_model
+
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=max(config.workers, 1), thread_name_prefix="cajica-audio")
+        self._onnx_model = onnx_model
+        self._onnx_session = onnx_model.new_inference_session(force_cpu=True)
+
+    def new_model(self) -> Any:
+        return self._onnx_model.OnnxModel(onnx_session=self._onnx_session, sample_rate=SAMPLE_RATE)
+
+    def vad(self, profile: TurnProfile) -> OffloadedVAD:
+        return OffloadedVAD(self, profile)
+
+
+def load_vad(profile: TurnProfile, config: AudioFrontendConfig | None = None) -> vad.VAD:
+    """VAD de las sesiones: en el pool del front end de audio o, sin hilos, el de Silero."""
+    config = config or AudioFrontendConfig.from_env()
+    if config.workers <= 0:
+        return profile.load_vad()
+    return AudioFrontend(config).vad(profile)
+
+
+class OffloadedVAD(vad.VAD):
+    """VAD de Silero con los parámetros de un ``TurnProfile``, procesado en el pool."""
+
+    def __init__(self, frontend: AudioFrontend, profile: TurnProfile) -> None:
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=WINDOW_SECONDS))
+        self.frontend = frontend
+        self.profile = profile
+
+    @property
+    def model(self) -> str:
+        return "silero"
+
+    @property
+    def provider(self) -> str:
+        return "cajica-audio-frontend"
+
+    def stream(self) -> OffloadedVADStream:
+        return OffloadedVADStream(self)
+
+
+class OffloadedVADStream(vad.VADStream):
+    def __init__(self, vad: OffloadedVAD) -> None:
+        self._frontend = vad.frontend
+        self._profile = vad.profile
+        self._detector: _SpeechDetector | None = None
+        super().__init__(vad)
+
+    async def _main_task(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: list[rtc.AudioFrame] = []
+        batch_samples = 0
+        detector = self._detector
+        async for item in self._input_ch:
+            if isinstance(item, rtc.AudioFrame):
+                if detector is None:
+                    detector = self._detector = _SpeechDetector(
+                        self._frontend.new_model(), self._profile, item.sample_rate
+                    )
+                elif item.sample_rate != detector.input_rate:
+                    logger.error("La frecuencia de muestreo del audio de entrada cambió a mitad del stream")
+                    continue
+                batch.append(item)
+                batch_samples += item.samples_per_channel
+                if batch_samples * 1000 < self._frontend.config.batch_ms * item.sample_rate:
+                    continue
+            # Un flush sin cuadros pendientes (o antes del primero) no tiene nada que procesar
+            if detector is None or not batch:
+                continue
+            # Mientras el lote está en el pool, los cuadros nuevos esperan en el canal
+            events = await loop.run_in_executor(self._frontend.executor, detector.process, batch)
+            batch, batch_samples = [], 0
+            for event in events:
+                self._event_ch.send_nowait(event)
+
+
+class _SpeechDetector:
+    """Máquina de estados de inicio y fin de habla de un stream, como la del plugin de Silero.
+
+    Corre en los hilos del pool, un lote a la vez. El lote cruza al pool como referencias
+    a los ``rtc.AudioFrame`` y sus muestras se leen con vistas de ``numpy`` sobre el buffer
+    de cada cuadro; la única copia es la del audio que espera completar una ventana.
+    """
+
+    def __init__(self, model: Any, profile: TurnProfile, input_rate: int) -> None:
+        self.model = model
+        self.profile = profile
+        self.input_rate = input_rate
+        self._resampler = (
+            rtc.AudioResampler(input_rate, SAMPLE_RATE, quality=rtc.AudioResamplerQuality.QUICK)
+            if input_rate != SAMPLE_RATE
+            else None
+        )
+        self._input_per_window = round(WINDOW_SAMPLES * input_rate / SAMPLE_RATE)
+        self._deactivation_threshold = max(profile.activation_threshold - 0.15, 0.01)
+        # Audio pendiente de ventana completa, a 16 kHz y a la frecuencia de entrada
+        self._model_audio = np.empty(0, dtype=np.float32)
+        self._input_audio = np.empty(0, dtype=np.int16)
+        self._prefix: deque[np.ndarray] = deque(maxlen=max(round(profile.prefix_padding_duration / WINDOW_SECONDS), 1))
+        self._speech: list[np.ndarray] = []
+        self._max_speech_windows = round(_MAX_BUFFERED_SPEECH / WINDOW_SECONDS)
+        self._probability = 0.0
+        self._samples_index = 0
+        self._timestamp = 0.0
+        self._speaking = False
+        self._speech_duration = 0.0
+        self._silence_duration = 0.0
+        self._raw_speech = 0.0
+        self._raw_silence = 0.0
+
+    def _mono(self, frame: rtc.AudioFrame) -> np.ndarray:
+        samples = np.frombuffer(frame.data, dtype=np.int16)
+        if frame.num_channels == 1:
+            return samples
+        return samples.reshape(-1, frame.num_channels).mean(axis=1).astype(np.int16)
+
+    def process(self, frames: list[rtc.AudioFrame]) -> list[vad.VADEvent]:
+        mono = [self._mono(frame) for frame in frames]
+        resampled: list[np.ndarray] = []
+        for frame, samples in zip(frames, mono):
+            if self._resampler is None:
+                resampled.append(samples)
+                continue
+            source = frame if frame.num_channels == 1 else _frame(samples, self.input_rate)
+            resampled.extend(np.frombuffer(f.data, dtype=np.int16) for f in self._resampler.push(source))
+        self._input_audio = np.concatenate([self._input_audio, *mono])
+        self._model_audio = np.concatenate(
+            [self._model_audio, *(r.astype(np.float32) / np.iinfo(np.int16).max for r in resampled)]
+        )
+
+        events: list[vad.VADEvent] = []
+        while len(self._model_audio) >= WINDOW_SAMPLES and len(self._input_audio) >= self._input_per_window:
+            window, self._model_audio = self._model_audio[:WINDOW_SAMPLES], self._model_audio[WINDOW_SAMPLES:]
+            chunk, self._input_audio = (
+                self._input_audio[: self._input_per_window],
+                self._input_audio[self._input_per_window :],
+            )
+            start = time.perf_counter()
+            raw = self.model(window)
+            events.extend(self._advance(chunk, raw, time.perf_counter() - start))
+        return events
+
+    def _advance(self, chunk: np.ndarray, raw: float, inference_duration: float) -> list[vad.VADEvent]:
+        self._probability = _SMOOTHING * self._probability + (1 - _SMOOTHING) * raw
+        self._samples_index += len(chunk)
+        self._timestamp += WINDOW_SECONDS
+        self._prefix.append(chunk)
+        if self._speaking and len(self._speech) < self._max_speech_windows:
+            self._speech.append(chunk)
+
+        events = [
+            self._event(
+                vad.VADEventType.INFERENCE_DONE,
+                [_frame(chunk, self.input_rate)],
+                inference_duration=inference_duration,
+            )
+        ]
+        threshold = self._deactivation_threshold if self._speaking else self.profile.activation_threshold
+        if self._probability >= threshold:
+            self._raw_speech += WINDOW_SECONDS
+            self._raw_silence = 0.0
+            if not self._speaking and self._raw_speech >= self.profile.min_speech_duration:
+                self._speaking = True
+                self._speech = list(self._prefix)
+                self._speech_duration, self._silence_duration = self._raw_speech, 0.0
+                events.append(self._event(vad.VADEventType.START_OF_SPEECH, [self._speech_frame()]))
+        else:
+            self._raw_silence += WINDOW_SECONDS
+            self._raw_speech = 0.0
+            if self._speaking and self._raw_silence >= self.profile.min_silence_duration:
+                self._speaking = False
+                self._speech_duration, self._silence_duration = 0.0, self._raw_silence
+                events.append(self._event(vad.VADEventType.END_OF_SPEECH, [self._speech_frame()]))
+                self._speech = []
+
+        if self._speaking:
+            self._speech_duration += WINDOW_SECONDS
+        else:
+            self._silence_duration += WINDOW_SECONDS
+        return events
+
+    def _speech_frame(self) -> rtc.AudioFrame:
+        return _frame(np.concatenate(self._speech) if self._speech else np.empty(0, np.int16), self.input_rate)
+
+    def _event(
+        self, type: vad.VADEventType, frames: list[rtc.AudioFrame], *, inference_duration: float = 0.0
+    ) -> vad.VADEvent:
+        return vad.VADEvent(
+            type=type,
+            samples_index=self._samples_index,
+            timestamp=self._timestamp,
+            speech_duration=self._speech_duration,
+            silence_duration=self._silence_duration,
+            frames=frames,
+            probability=self._probability,
+            inference_duration=inference_duration,
+            speaking=self._speaking,
+            raw_accumulated_silence=self._raw_silence,
+            raw_accumulated_speech=self._raw_speech,
+        )
+
+
+def _frame(samples: np.ndarray, sample_rate: int) -> rtc.AudioFrame:
+    return rtc.AudioFrame(
+        data=samples.tobytes(), sample_rate=sample_rate, num_channels=1, samples_per_channel=len(samples)
+    )
+
+
+class LoopLagMonitor:
+    """Mide cuánto se retrasa el event loop de un proceso de trabajo.
+
+    Cada ``interval`` segundos compara cuándo debía despertar con cuándo despertó; el
+    retraso se observa en ``cajica_event_loop_lag_seconds`` y, si supera ``warn_after``,
+    se registra una advertencia (como mucho una cada 10 segundos).
+    """
+
+    def __init__(self, *, interval: float = 0.1, warn_after: float = 0.1) -> None:
+        self.interval = interval
+        self.warn_after = warn_after
+        self.max_lag = 0.0
+        self._last_warning = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - scheduled, 0.0)
+            LOOP_LAG_SECONDS.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.warn_after and loop.time() - self._last_warning > 10:
+                self._last_warning = loop.time()
+                logger.warning(f"El event loop se retrasó {lag * 1000:.0f} ms")
@@ -0,0 +1,562 @@
+"""Benchmark offline del agente: N sesiones simuladas contra un modelo realtime falso.
+
+Cada sesión se arma con ``agent.create_session`` (mismo agente, tiering y VAD que en
+producción), pero el modelo de OpenAI se reemplaza por ``FakeRealtimeModel`` y la sala
+por una entrada de audio que reproduce grabaciones WAV en tiempo real y una salida que
+"reproduce" la respuesta al ritmo del reloj. No requiere LiveKit Cloud ni OpenAI.
+
+El fin de turno lo detecta el VAD del agente (Silero) sobre las grabaciones, así que la
+latencia reportada va desde el último frame de cada pregunta hasta el primer frame de
+audio de la respuesta e incluye el silencio que el VAD necesita para cerrar el turno.
+
+Uso:
+    python bench.py --wav grabaciones/*.wav --sessions 8 --turns 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import wave
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import psutil
+from livekit import rtc
+from livekit.agents import llm, metrics, utils
+from livekit.agents.job import JobExecutorType, JobProcess
+from livekit.agents.types import NOT_GIVEN, NotGivenOr
+from livekit.agents.voice import io
+
+import agent as cajica
+from audio_frontend import LoopLagMonitor, load_vad
+from prompt_budget import agent_prompts, count_tokens
+from tiering import PromptTier, TieringPolicy
+from turn_detection import TURN_PROFILES
+
+logger = logging.getLogger("cajica-assistant")
+
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+FRAME_SECONDS = 0.02
+REPLY_TEXT = (
+    "Según el Plan de Desarrollo Municipal Cajicá Ideal 2024-2027, ese programa hace parte "
+    "de la dimensión social y tiene metas de cobertura definidas para el cuatrienio."
+)
+
+
+def load_utterance(path: Path) -> np.ndarray:
+    """Lee un WAV PCM de 16 bits y lo devuelve mono a ``INPUT_SAMPLE_RATE``."""
+    with wave.open(str(path), "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: se esperaba PCM de 16 bits, no {f.getsampwidth() * 8}")
+        rate = f.getframerate()
+        channels = f.getnchannels()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    samples = pcm.reshape(-1, channels).mean(axis=1)
+    if rate != INPUT_SAMPLE_RATE:
+        positions = np.arange(0, len(samples), rate / INPUT_SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+
+def _frame(samples: np.ndarray, sample_rate: int) -> rtc.AudioFrame:
+    return rtc.AudioFrame(
+        data=samples.tobytes(),
+        sample_rate=sample_rate,
+        num_channels=1,
+        samples_per_channel=len(samples),
+    )
+
+
+class FakeRealtimeModel(llm.RealtimeModel):
+    """Sustituto local de ``openai.realtime.RealtimeModel``.
+
+    Responde cada turno con un texto y un tono fijos. El primer audio llega tras ``ttft``
+    segundos más ``prefill_per_1k_chars`` por cada mil caracteres de instrucciones e
+    historial, de modo que un prompt más largo se refleja en la latencia, y el audio se
+    entrega ``stream_speed`` veces más rápido que el tiempo real.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttft: float = 0.45,
+        prefill_per_1k_chars: float = 0.01,
+        reply_seconds: float = 3.0,
+        stream_speed: float = 4.0,
+        reply_text: str = REPLY_TEXT,
+    ) -> None:
+        super().__init__(
+            capabilities=llm.RealtimeCapabilities(
+                message_truncation=True,
+                turn_detection=False,
+                user_transcription=False,
+                auto_tool_reply_generation=False,
+                audio_output=True,
+                manual_function_calls=False,
+                mutable_chat_context=True,
+                mutable_instructions=True,
+                mutable_tools=True,
+            )
+        )
+        self.ttft = ttft
+        self.prefill_per_1k_chars = prefill_per_1k_chars
+        self.stream_speed = stream_speed
+        self.reply_text = reply_text
+        self.sessions: list[FakeRealtimeSession] = []
+        t = np.arange(int(reply_seconds * OUTPUT_SAMPLE_RATE)) / OUTPUT_SAMPLE_RATE
+        self.reply_pcm = (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16)
+
+    @property
+    def model(self) -> str:
+        return "fake-realtime"
+
+    @property
+    def provider(self) -> str:
+        return "bench"
+
+    def session(self, *, turn_detection_disabled: bool = False) -> FakeRealtimeSession:
+        self.sessions.append(FakeRealtimeSession(self))
+        return self.sessions[-1]
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeRealtimeSession(llm.RealtimeSession):
+    def __init__(self, model: FakeRealtimeModel) -> None:
+        super().__init__(model)
+        self._model = model
+        self._instructions = ""
+        self._chat_ctx = llm.ChatContext.empty()
+        self._tools = llm.ToolContext.empty()
+        self._input_seconds = 0.0
+        self._generation: asyncio.Task[None] | None = None
+        self.prompt_chars: list[int] = []
+
+    @property
+    def chat_ctx(self) -> llm.ChatContext:
+        return self._chat_ctx.copy()
+
+    @property
+    def tools(self) -> llm.ToolContext:
+        return self._tools
+
+    async def update_instructions(self, instructions: str) -> None:
+        self._instructions = instructions
+
+    async def update_chat_ctx(self, chat_ctx: llm.ChatContext) -> None:
+        self._chat_ctx = chat_ctx.copy()
+
+    async def update_tools(self, tools: list[llm.Tool]) -> None:
+        self._tools = llm.ToolContext(tools)
+
+    def update_options(self, *, tool_choice: NotGivenOr[llm.ToolChoice | None] = NOT_GIVEN) -> None:
+        pass
+
+    def push_audio(self, frame: rtc.AudioFrame) -> None:
+        self._input_seconds += frame.duration
+
+    def push_video(self, frame: rtc.VideoFrame) -> None:
+        pass
+
+    def commit_audio(self) -> None:
+        self._chat_ctx.add_message(role="user", content=f"[audio {self._input_seconds:.1f} s]")
+        self._input_seconds = 0.0
+
+    def clear_audio(self) -> None:
+        self._input_seconds = 0.0
+
+    def _prompt_chars(self) -> int:
+        history = sum(len(msg.text_content or "") for msg in self._chat_ctx.messages())
+        return len(self._instructions) + history
+
+    def generate_reply(
+        self,
+        *,
+        instructions: NotGivenOr[str] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        tools: NotGivenOr[list[llm.Tool]] = NOT_GIVEN,
+    ) -> asyncio.Future[llm.GenerationCreatedEvent]:
+        self.interrupt()
+        message_ch = utils.aio.Chan[llm.MessageGeneration]()
+        function_ch = utils.aio.Chan[llm.FunctionCall]()
+        text_ch = utils.aio.Chan[str]()
+        audio_ch = utils.aio.Chan[rtc.AudioFrame]()
+        modalities: asyncio.Future[list[Literal["text", "audio"]]] = asyncio.Future()
+        modalities.set_result(["audio", "text"])
+        message_ch.send_nowait(
+            llm.MessageGeneration(
+                message_id=utils.shortuuid("bench_item_"),
+                text_stream=text_ch,
+                audio_stream=audio_ch,
+                modalities=modalities,
+            )
+        )
+        message_ch.close()
+        function_ch.close()
+
+        prompt_chars = self._prompt_chars() + (len(instructions) if isinstance(instructions, str) else 0)
+        self.prompt_chars.append(prompt_chars)
+        self._generation = asyncio.create_task(self._stream_reply(text_ch, audio_ch, prompt_chars))
+
+        fut: asyncio.Future[llm.GenerationCreatedEvent] = asyncio.Future()
+        fut.set_result(
+            llm.GenerationCreatedEvent(
+                message_stream=message_ch,
+                function_stream=function_ch,
+                user_initiated=True,
+                response_id=utils.shortuuid("bench_resp_"),
+            )
+        )
+        return fut
+
+    async def _stream_reply(
+        self, text_ch: utils.aio.Chan[str], audio_ch: utils.aio.Chan[rtc.AudioFrame], prompt_chars: int
+    ) -> None:
+        model = self._model
+        started_at = time.perf_counter()
+        ttft = model.ttft + model.prefill_per_1k_chars * prompt_chars / 1000
+        cancelled = False
+        try:
+            await asyncio.sleep(ttft)
+            for word in model.reply_text.split(" "):
+                text_ch.send_nowait(word + " ")
+            samples = int(FRAME_SECONDS * OUTPUT_SAMPLE_RATE)
+            for start in range(0, len(model.reply_pcm), samples):
+                audio_ch.send_nowait(_frame(model.reply_pcm[start : start + samples], OUTPUT_SAMPLE_RATE))
+                await asyncio.sleep(FRAME_SECONDS / model.stream_speed)
+            self._chat_ctx.add_message(role="assistant", content=model.reply_text)
+        except asyncio.CancelledError:
+            cancelled = True
+        finally:
+            text_ch.close()
+            audio_ch.close()
+
+        input_tokens = prompt_chars // 4
+        output_tokens = len(model.reply_text) // 4
+        duration = time.perf_counter() - started_at
+        self.emit(
+            "metrics_collected",
+            metrics.RealtimeModelMetrics(
+                label=model.label,
+                request_id=utils.shortuuid("bench_req_"),
+                timestamp=time.time(),
+                duration=duration,
+                ttft=ttft,
+                cancelled=cancelled,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+                tokens_per_second=output_tokens / duration if duration else 0.0,
+                input_token_details=metrics.RealtimeModelMetrics.InputTokenDetails(text_tokens=input_tokens),
+                output_token_details=metrics.RealtimeModelMetrics.OutputTokenDetails(text_tokens=output_tokens),
+            ),
+        )
+
+    def interrupt(self) -> None:
+        if self._generation is not None and not self._generation.done():
+            self._generation.cancel()
+
+    def truncate(
+        self,
+        *,
+        message_id: str,
+        modalities: list[Literal["text", "audio"]],
+        audio_end_ms: int,
+        audio_transcript: NotGivenOr[str] = NOT_GIVEN,
+    ) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        self.interrupt()
+
+
+class BenchAudioInput(io.AudioInput):
+    """Micrófono simulado: entrega un frame cada 20 ms, silencio salvo cuando se habla."""
+
+    def __init__(self) -> None:
+        super().__init__(label="Bench")
+        self._speech: deque[np.ndarray] = deque()
+        self._speech_done: asyncio.Future[float] | None = None
+        self._silence = np.zeros(int(FRAME_SECONDS * INPUT_SAMPLE_RATE), dtype=np.int16)
+        self._next_at: float | None = None
+        self._closed = False
+
+    def speak(self, pcm: np.ndarray) -> asyncio.Future[float]:
+        """Encola una grabación; el futuro devuelve el instante en que se entregó el último frame."""
+        samples = len(self._silence)
+        self._speech.extend(pcm[i : i + samples] for i in range(0, len(pcm), samples))
+        self._speech_done = asyncio.get_running_loop().create_future()
+        return self._speech_done
+
+    def close(self) -> None:
+        self._closed = True
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        if self._closed:
+            raise StopAsyncIteration
+        now = time.perf_counter()
+        if self._next_at is None:
+            self._next_at = now
+        elif self._next_at > now:
+            await asyncio.sleep(self._next_at - now)
+        self._next_at += FRAME_SECONDS
+
+        if not self._speech:
+            return _frame(self._silence, INPUT_SAMPLE_RATE)
+        samples = self._speech.popleft()
+        if not self._speech and self._speech_done is not None and not self._speech_done.done():
+            self._speech_done.set_result(time.perf_counter())
+        return _frame(samples, INPUT_SAMPLE_RATE)
+
+
+class BenchAudioOutput(io.AudioOutput):
+    """Parlante simulado: marca el primer frame de cada respuesta y la "reproduce" en tiempo real."""
+
+    def __init__(self) -> None:
+        super().__init__(label="Bench", capabilities=io.AudioOutputCapabilities(pause=False))
+        self._first_frame: asyncio.Future[float] | None = None
+        self._started_at: float | None = None
+        self._pushed = 0.0
+        self._interrupted = asyncio.Event()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def expect_reply(self) -> asyncio.Future[float]:
+        self._first_frame = asyncio.get_running_loop().create_future()
+        return self._first_frame
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+            self.on_playback_started(created_at=time.time())
+            if self._first_frame is not None and not self._first_frame.done():
+                self._first_frame.set_result(self._started_at)
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._started_at is not None:
+            self._flush_task = asyncio.create_task(self._wait_for_playout())
+
+    def clear_buffer(self) -> None:
+        if self._started_at is not None:
+            self._interrupted.set()
+
+    async def _wait_for_playout(self) -> None:
+        assert self._started_at is not None
+        remaining = self._started_at + self._pushed - time.perf_counter()
+        try:
+            await asyncio.wait_for(self._interrupted.wait(), timeout=max(remaining, 0.0))
+            interrupted = True
+        except asyncio.TimeoutError:
+            interrupted = False
+        position = min(time.perf_counter() - self._started_at, self._pushed)
+        self._started_at = None
+        self._pushed = 0.0
+        self._interrupted.clear()
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
+
+
+@dataclass
+class SessionResult:
+    latencies: list[float] = field(default_factory=list)
+    timeouts: int = 0
+    cut_turns: int = 0
+    prompt_chars: list[int] = field(default_factory=list)
+
+
+@dataclass
+class BenchReport:
+    sessions: int
+    turn_profile: str
+    turns: int
+    timeouts: int
+    cut_turns: int
+    wall_seconds: float
+    turns_per_second: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    mean_prompt_chars: float
+    instructions_tokens: dict[str, int]
+    rss_mb_per_session: float
+    cpu_per_session: float
+    loop_lag_max: float
+
+
+async def run_session(
+    index: int,
+    proc: JobProcess,
+    policy: TieringPolicy,
+    utterances: list[np.ndarray],
+    args: argparse.Namespace,
+) -> SessionResult:
+    result = SessionResult()
+    model = FakeRealtimeModel(
+        ttft=args.ttft,
+        prefill_per_1k_chars=args.prefill_per_1k_chars,
+        reply_seconds=args.reply_seconds,
+        stream_speed=args.stream_speed,
+    )
+    session, agent = cajica.create_session(proc, policy.decide(0.0), model=model)
+    audio_in, audio_out = BenchAudioInput(), BenchAudioOutput()
+    session.input.audio = audio_in
+    session.output.audio = audio_out
+
+    await session.start(agent=agent)
+    try:
+        for turn in range(args.turns):
+            reply = audio_out.expect_reply()
+            spoke_at = await audio_in.speak(utterances[(index + turn) % len(utterances)])
+            if reply.done():
+                # El turno se cerró en una pausa de la pregunta: se mide la respuesta que
+                # sigue al final real de la pregunta
+                result.cut_turns += 1
+                reply = audio_out.expect_reply()
+            try:
+                first_audio_at = await asyncio.wait_for(reply, timeout=args.turn_timeout)
+            except asyncio.TimeoutError:
+                result.timeouts += 1
+                logger.warning(f"Sesión {index}: el turno {turn + 1} no obtuvo respuesta")
+                continue
+            result.latencies.append(first_audio_at - spoke_at)
+            await audio_out.wait_for_playout()
+            await asyncio.sleep(args.pause)
+    finally:
+        audio_in.close()
+        await session.aclose()
+    result.prompt_chars = [n for rt in model.sessions for n in rt.prompt_chars]
+    return result
+
+
+async def run_bench(args: argparse.Namespace) -> BenchReport:
+    utterances = [load_utterance(Path(p)) for p in args.wav]
+    policy = TieringPolicy(tier=PromptTier(args.tier)) if args.tier else TieringPolicy.from_env()
+
+    process = psutil.Process()
+    proc = JobProcess(executor_type=JobExecutorType.THREAD, user_arguments=None, http_proxy=None)
+    cajica.prewarm(proc)
+    # La caché de respuestas necesita STT y TTS de OpenAI; el benchmark mide el camino del modelo
+    proc.userdata["answer_cache"] = None
+    if args.turn_profile:
+        turn_config = replace(proc.userdata["turn_config"], profile=TURN_PROFILES[args.turn_profile])
+        proc.userdata["turn_config"] = turn_config
+        proc.userdata["vad"] = load_vad(turn_config.profile, proc.userdata["audio_config"])
+
+    baseline_rss = process.memory_info().rss
+    peak_rss = baseline_rss
+
+    async def sample_rss() -> None:
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(0.25)
+
+    async def staggered(index: int) -> SessionResult:
+        await asyncio.sleep(index * args.ramp)
+        return await run_session(index, proc, policy, utterances, args)
+
+    sampler = asyncio.create_task(sample_rss())
+    # Todas las sesiones comparten el loop: su retraso es el que sufriría el WebSocket
+    lag_monitor = LoopLagMonitor()
+    lag_monitor.start()
+    cpu_start = process.cpu_times()
+    wall_start = time.perf_counter()
+    results = await asyncio.gather(*(staggered(i) for i in range(args.sessions)))
+    wall = time.perf_counter() - wall_start
+    cpu_end = process.cpu_times()
+    sampler.cancel()
+    await lag_monitor.aclose()
+
+    latencies = np.array([lat for r in results for lat in r.latencies])
+    prompt_chars = [n for r in results for n in r.prompt_chars]
+    cpu_seconds = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+
+    def percentile(q: float) -> float:
+        return float(np.percentile(latencies, q)) if len(latencies) else float("nan")
+
+    return BenchReport(
+        sessions=args.sessions,
+        turn_profile=proc.userdata["turn_config"].profile.name,
+        turns=len(latencies),
+        timeouts=sum(r.timeouts for r in results),
+        cut_turns=sum(r.cut_turns for r in results),
+        wall_seconds=wall,
+        turns_per_second=len(latencies) / wall,
+        latency_p50=percentile(50),
+        latency_p95=percentile(95),
+        latency_p99=percentile(99),
+        mean_prompt_chars=float(np.mean(prompt_chars)) if prompt_chars else 0.0,
+        instructions_tokens={name: count_tokens(text) for name, text in agent_prompts().items()},
+        rss_mb_per_session=(peak_rss - baseline_rss) / args.sessions / 2**20,
+        cpu_per_session=cpu_seconds / wall / args.sessions,
+        loop_lag_max=lag_monitor.max_lag,
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--wav", nargs="+", required=True, help="Grabaciones de preguntas (WAV PCM 16 bits)")
+    parser.add_argument("--sessions", type=int, default=4, help="Sesiones concurrentes")
+    parser.add_argument("--turns", type=int, default=3, help="Preguntas por sesión")
+    parser.add_argument("--ramp", type=float, default=0.2, help="Segundos entre el inicio de cada sesión")
+    parser.add_argument("--pause", type=float, default=0.5, help="Silencio tras cada respuesta, en segundos")
+    parser.add_argument("--turn-timeout", type=float, default=15.0, help="Espera máxima por respuesta")
+    parser.add_argument("--tier", choices=[t.value for t in PromptTier], help="Política de tiering (por defecto, del entorno)")
+    parser.add_argument(
+        "--turn-profile", choices=list(TURN_PROFILES), help="Perfil de detección de turnos (por defecto, del entorno)"
+    )
+    parser.add_argument("--ttft", type=float, default=0.45, help="Latencia base del modelo falso")
+    parser.add_argument(
+        "--prefill-per-1k-chars", type=float, default=0.01, help="Latencia extra por cada mil caracteres de prompt"
+    )
+    parser.add_argument("--reply-seconds", type=float, default=3.0, help="Duración del audio de cada respuesta")
+    parser.add_argument("--stream-speed", type=float, default=4.0, help="Velocidad de entrega del audio vs. tiempo real")
+    parser.add_argument("--json", type=Path, help="Escribe el reporte en este archivo JSON")
+    parser.add_argument("--max-p95", type=float, help="Falla (código 1) si la latencia p95 supera este valor")
+    parser.add_argument(
+        "--max-prompt-tokens", type=int, help="Falla (código 1) si las instrucciones de un agente superan este valor"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    cajica.configure_logging()
+    report = asyncio.run(run_bench(args))
+
+    print(
+        f"{report.sessions} sesiones, {report.turns} turnos ({report.timeouts} sin respuesta) en {report.wall_seconds:.1f} s"
+        f" -> {report.turns_per_second:.2f} turnos/s\n"
+        f"perfil de turnos {report.turn_profile}: {report.cut_turns} preguntas cortadas por una respuesta antes de terminar\n"
+        f"latencia de turno p50 {report.latency_p50 * 1000:.0f} ms, p95 {report.latency_p95 * 1000:.0f} ms,"
+        f" p99 {report.latency_p99 * 1000:.0f} ms (prompt medio {report.mean_prompt_chars:.0f} caracteres)\n"
+        f"instrucciones: {', '.join(f'{name} {tokens} tokens' for name, tokens in report.instructions_tokens.items())}\n"
+        f"por sesión: {report.rss_mb_per_session:.1f} MB de memoria, {report.cpu_per_session:.1%} de un CPU\n"
+        f"retraso máximo del event loop: {report.loop_lag_max * 1000:.0f} ms"
+    )
+    if args.json:
+        args.json.write_text(json.dumps(asdict(report), indent=2))
+
+    if report.timeouts or (args.max_p95 is not None and not report.latency_p95 <= args.max_p95):
+        return 1
+    if args.max_prompt_tokens is not None and max(report.instructions_tokens.values()) > args.max_prompt_tokens:
+        print(f"Las instrucciones superan {args.max_prompt_tokens} tokens: revisa python3 prompt_budget.py")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""Servicio de conexión: asigna salas preaprovisionadas y firma el token del ciudadano.
+
+Mantiene ``CAJICA_ROOM_POOL_SIZE`` salas ya creadas y con el agente despachado, así que
+cuando el ciudadano llega el worker ya está conectado y precargado. Cada sala en espera
+ocupa un trabajo con una sesión realtime abierta y se vuelve a crear cada
+``CAJICA_ROOM_POOL_MAX_IDLE`` segundos, por eso el pool está desactivado por defecto. Los nombres de sala
+e identidades son aleatorios (sin colisiones) y cada cliente tiene un límite de
+solicitudes por minuto.
+
+La IP de cada cliente solo se toma de los encabezados si la solicitud viene de un proxy
+de confianza (``CAJICA_TRUSTED_PROXIES``, por defecto la ruta de Next.js en la misma
+máquina): primero ``X-Cajica-Client-IP``, que la ruta llena con una sola IP, y si no la
+dirección más a la derecha de ``X-Forwarded-For`` que no sea de un proxy de confianza.
+Las entradas a la izquierda las escribe el propio cliente y no se usan. Si un proxy de
+confianza no informa ninguna IP verificada, la solicitud no se limita por cliente: todas
+caerían en la cubeta del proxy y el límite de una persona frenaría a toda la ciudad.
+
+Uso:
+    python connection_service.py   # escucha en CAJICA_CONNECTION_SERVICE_PORT (8089)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from aiohttp import web
+from livekit import api
+
+logger = logging.getLogger("cajica-assistant")
+
+CLIENT_IP_HEADER = "X-Cajica-Client-IP"
+
+_Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def parse_networks(value: str) -> tuple[_Network, ...]:
+    """``"127.0.0.1,::1,10.0.0.0/8"`` -> redes; las entradas inválidas se ignoran con una advertencia."""
+    networks = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+        except ValueError:
+            logger.warning(f"Proxy de confianza inválido en CAJICA_TRUSTED_PROXIES: '{item}'")
+    return tuple(networks)
+
+
+def _parse_ip(value: str) -> ipaddress.IPv4Address | ipaddress.IPv6Address | None:
+    try:
+        return ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+
+
+def client_address(remote: str | None, headers: Mapping[str, str], trusted: tuple[_Network, ...]) -> str | None:
+    """IP con la que se limita a un cliente; los encabezados solo cuentan desde un proxy de confianza.
+
+    ``None`` si la solicitud viene de un proxy de confianza que no informó la IP del cliente.
+    """
+    remote_ip = _parse_ip(remote or "")
+    if remote_ip is None:
+        return remote or "desconocido"
+
+    def is_trusted(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+        return any(ip in network for network in trusted)
+
+    if not is_trusted(remote_ip):
+        return str(remote_ip)
+    client_ip = _parse_ip(headers.get(CLIENT_IP_HEADER, ""))
+    if client_ip is not None:
+        return str(client_ip)
+    # De derecha a izquierda: cada proxy de confianza agrega la dirección de quien le habló
+    for hop in reversed(headers.get("X-Forwarded-For", "").split(",")):
+        hop_ip = _parse_ip(hop)
+        if hop_ip is None:
+            break
+        if not is_trusted(hop_ip):
+            return str(hop_ip)
+    return None
+
+
+@dataclass
+class _ProvisionedRoom:
+    name: str
+    created_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class AllocatorStats:
+    provisioned: int = 0
+    allocated: int = 0
+    misses: int = 0
+    expired: int = 0
+    failures: int = 0
+
+
+class RateLimiter:
+    """Cubeta de fichas por cliente: ``rate`` solicitudes por minuto con ráfagas de ``burst``.
+
+    Guarda como mucho ``max_clients`` clientes; el menos reciente se olvida primero.
+    """
+
+    def __init__(self, *, rate: float = 10.0, burst: int = 5, max_clients: int = 10000) -> None:
+        self.rate = rate / 60
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def allow(self, client: str) -> bool:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[client] = (tokens - 1 if allowed else tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed
+
+
+class RoomAllocator:
+    """Salas creadas y con el agente despachado antes de que un ciudadano las pida.
+
+    Con ``agent_name`` el agente se despacha explícitamente (el worker debe registrarse
+    con el mismo ``CAJICA_AGENT_NAME``); sin él, LiveKit lo despacha al crear la sala. Las
+    salas que nadie reclama en ``max_idle`` segundos se borran, lo que libera al worker.
+    Mientras espera, cada sala mantiene un trabajo con la sesión realtime abierta: con
+    ``size`` 0 (por defecto) cada sala se crea al pedirla.
+    """
+
+    def __init__(
+        self,
+        lkapi: api.LiveKitAPI,
+        *,
+        size: int = 0,
+        agent_name: str | None = None,
+        max_idle: float = 120.0,
+        empty_timeout: int = 300,
+        check_interval: float = 2.0,
+    ) -> None:
+        self.lkapi = lkapi
+        self.size = size
+        self.agent_name = agent_name
+        self.max_idle = max_idle
+        self.empty_timeout = empty_timeout
+        self.check_interval = check_interval
+        self.stats = AllocatorStats()
+        self._idle: deque[_ProvisionedRoom] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def start(self) -> None:
+        if self._task is None and self.size > 0:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def provision(self) -> str:
+        name = f"cajica-{secrets.token_hex(8)}"
+        await self.lkapi.room.create_room(api.CreateRoomRequest(name=name, empty_timeout=self.empty_timeout))
+        if self.agent_name:
+            await self.lkapi.agent_dispatch.create_dispatch(
+                api.CreateAgentDispatchRequest(agent_name=self.agent_name, room=name)
+            )
+        self.stats.provisioned += 1
+        return name
+
+    async def _expire(self) -> None:
+        now = time.monotonic()
+        for room in [r for r in self._idle if now - r.created_at > self.max_idle]:
+            self._idle.remove(room)
+            self.stats.expired += 1
+            try:
+                await self.lkapi.room.delete_room(api.DeleteRoomRequest(room=room.name))
+            except Exception as e:
+                logger.warning(f"No se pudo borrar la sala sin usar {room.name}: {e}")
+
+    async def _maintain(self) -> None:
+        while True:
+            await self._expire()
+            while len(self._idle) < self.size:
+                try:
+                    self._idle.append(_ProvisionedRoom(await self.provision()))
+                except Exception as e:
+                    self.stats.failures += 1
+                    logger.warning(f"No se pudo preaprovisionar una sala: {e}")
+                    break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def allocate(self) -> str:
+        self.stats.allocated += 1
+        if self._idle:
+            room = self._idle.popleft()
+            self._wakeup.set()
+            return room.name
+        self.stats.misses += 1
+        return await self.provision()
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        rooms = [room.name for room in self._idle]
+        self._idle.clear()
+        await asyncio.gather(
+            *(self.lkapi.room.delete_room(api.DeleteRoomRequest(room=name)) for name in rooms), return_exceptions=True
+        )
+
+
+class ConnectionService:
+    """``GET /connection-details`` con la misma respuesta que la ruta del frontend."""
+
+    def __init__(
+        self,
+        allocator: RoomAllocator,
+        limiter: RateLimiter,
+        *,
+        server_url: str,
+        api_key: str,
+        api_secret: str,
+        token_ttl: timedelta = timedelta(minutes=15),
+        trusted_proxies: tuple[_Network, ...] = (),
+    ) -> None:
+        self.allocator = allocator
+        self.limiter = limiter
+        self.server_url = server_url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.token_ttl = token_ttl
+        self.trusted_proxies = trusted_proxies
+        self._warned_unverified = False
+
+    @classmethod
+    def from_env(cls) -> ConnectionService:
+        lkapi = api.LiveKitAPI()
+        allocator = RoomAllocator(
+            lkapi,
+            size=int(os.getenv("CAJICA_ROOM_POOL_SIZE", "0")),
+            agent_name=os.getenv("CAJICA_AGENT_NAME") or None,
+            max_idle=float(os.getenv("CAJICA_ROOM_POOL_MAX_IDLE", "120")),
+        )
+        limiter = RateLimiter(
+            rate=float(os.getenv("CAJICA_CONNECTION_RATE", "10")),
+            burst=int(os.getenv("CAJICA_CONNECTION_BURST", "5")),
+        )
+        return cls(
+            allocator,
+            limiter,
+            server_url=os.environ["LIVEKIT_URL"],
+            api_key=os.environ["LIVEKIT_API_KEY"],
+            api_secret=os.environ["LIVEKIT_API_SECRET"],
+            trusted_proxies=parse_networks(os.getenv("CAJICA_TRUSTED_PROXIES", "127.0.0.1,::1")),
+        )
+
+    def participant_token(self, identity: str, room: str) -> str:
+        grants = api.VideoGrants(
+            room=room, room_join=True, can_publish=True, can_publish_data=True, can_subscribe=True
+        )
+        return (
+            api.AccessToken(self.api_key, self.api_secret)
+            .with_identity(identity)
+            .with_grants(grants)
+            .with_ttl(self.token_ttl)
+            .to_jwt()
+        )
+
+    async def connection_details(self, request: web.Request) -> web.Response:
+        client = client_address(request.remote, request.headers, self.trusted_proxies)
+        if client is None:
+            if not self._warned_unverified:
+                self._warned_unverified = True
+                logger.warning(
+                    f"Solicitud de {request.remote} sin IP de cliente verificada ({CLIENT_IP_HEADER} ni"
+                    " X-Forwarded-For): no se aplica el límite por cliente"
+                )
+        elif not self.limiter.allow(client):
+            logger.warning(f"Límite de conexiones excedido por {client}")
+            return web.Response(status=429, text="Demasiadas solicitudes", headers={"Retry-After": "10"})
+        try:
+            room = await self.allocator.allocate()
+        except Exception as e:
+            logger.error(f"No se pudo asignar una sala: {e}", exc_info=True)
+            return web.Response(status=503, text="No hay salas disponibles")
+        identity = f"ciudadano-{secrets.token_hex(8)}"
+        data = {
+            "serverUrl": self.server_url,
+            "roomName": room,
+            "participantName": identity,
+            "participantToken": self.participant_token(identity, room),
+        }
+        return web.json_response(data, headers={"Cache-Control": "no-store"})
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"idle_rooms": len(self.allocator), **asdict(self.allocator.stats)})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/connection-details", self.connection_details)
+        app.router.add_get("/healthz", self.health)
+
+        async def lifecycle(app: web.Application):
+            self.allocator.start()
+            yield
+            await self.allocator.aclose()
+            await self.allocator.lkapi.aclose()
+
+        app.cleanup_ctx.append(lifecycle)
+        return app
+
+
+async def create_app() -> web.Application:
+    # LiveKitAPI abre su sesión HTTP en el loop que la usa
+    return ConnectionService.from_env().app()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv(dotenv_path=".env.local")
+    web.run_app(
+        create_app(),
+        host=os.getenv("CAJICA_CONNECTION_SERVICE_HOST", "127.0.0.1"),
+        port=int(os.getenv("CAJICA_CONNECTION_SERVICE_PORT", "8089")),
+    )
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import TypeGuard
+
+from livekit.agents import Agent, AgentSession, CloseEvent, ConversationItemAddedEvent, llm
+
+logger = logging.getLogger("cajica-assistant")
+
+SUMMARY_INSTRUCTIONS = (
+    "Resume la parte antigua de una llamada entre un ciudadano y el asistente virtual de la Alcaldía de Cajicá."
+    " Conserva lo que el ciudadano quiere, sus datos y restricciones, las cifras y fuentes oficiales ya"
+    " entregadas y lo que quedó pendiente. Omite saludos y relleno. Responde en español, en pocas frases."
+)
+
+
+def estimate_tokens(item: llm.ChatItem) -> int:
+    """Tokens aproximados de un ítem del contexto (4 caracteres por token)."""
+    if isinstance(item, llm.ChatMessage):
+        chars = len(item.text_content or "")
+    elif isinstance(item, llm.FunctionCall):
+        chars = len(item.name) + len(item.arguments)
+    elif isinstance(item, llm.FunctionCallOutput):
+        chars = len(item.output)
+    else:
+        return 0
+    return chars // 4 + 4
+
+
+def _render(item: llm.ChatItem) -> str | None:
+    if isinstance(item, llm.ChatMessage) and item.role in ("user", "assistant"):
+        text = (item.text_content or "").strip()
+        return f"{'Ciudadano' if item.role == 'user' else 'Asistente'}: {text}" if text else None
+    if isinstance(item, llm.FunctionCallOutput) and not item.is_error:
+        return f"Dato oficial ({item.name}): {item.output.strip()}"
+    return None
+
+
+def is_summary(item: llm.ChatItem) -> TypeGuard[llm.ChatMessage]:
+    return isinstance(item, llm.ChatMessage) and item.extra.get("is_summary") is True
+
+
+class LLMSummarizer:
+    """Resume con un modelo de texto económico, fuera del camino de la respuesta."""
+
+    def __init__(self, model: llm.LLM) -> None:
+        self._model = model
+
+    async def summarize(self, previous: str | None, transcript: str) -> str:
+        chat_ctx = llm.ChatContext.empty()
+        chat_ctx.add_message(role="system", content=SUMMARY_INSTRUCTIONS)
+        content = f"Resumen anterior:\n{previous}\n\n" if previous else ""
+        chat_ctx.add_message(role="user", content=f"{content}Conversación a resumir:\n{transcript}")
+        chunks: list[str] = []
+        async with self._model.chat(chat_ctx=chat_ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    chunks.append(chunk.delta.content)
+        return "".join(chunks).strip()
+
+
+class ExtractiveSummarizer:
+    """Resumen local sin modelo: conserva las líneas más recientes que caben en ``max_chars``."""
+
+    def __init__(self, max_chars: int = 1200) -> None:
+        self.max_chars = max_chars
+
+    async def summarize(self, previous: str | None, transcript: str) -> str:
+        lines = ([previous] if previous else []) + transcript.splitlines()
+        kept: list[str] = []
+        used = 0
+        for line in reversed(lines):
+            line = line if len(line) <= 300 else line[:297] + "..."
+            if used + len(line) > self.max_chars:
+                break
+            kept.append(line)
+            used += len(line) + 1
+        return "\n".join(reversed(kept))
+
+
+@dataclass
+class ContextStats:
+    compactions: int = 0
+    summarized_items: int = 0
+    failures: int = 0
+
+
+class ContextWindow:
+    """Mantiene acotado el contexto de la conversación que se envía al modelo.
+
+    Cuando los ítems del contexto del agente activo superan ``max_tokens``, todo lo
+    anterior a los últimos ``keep_items`` se reemplaza por un único mensaje de resumen.
+    La compactación corre en segundo plano cuando el agente termina de responder, así que
+    no suma latencia al turno, y en modo realtime ``update_chat_ctx`` borra del servidor
+    los ítems resumidos junto con su audio. El historial completo sigue en
+    ``session.history``.
+    """
+
+    def __init__(
+        self,
+        summarizer: LLMSummarizer | ExtractiveSummarizer,
+        *,
+        max_tokens: int = 3000,
+        keep_items: int = 6,
+    ) -> None:
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.keep_items = keep_items
+        self.stats = ContextStats()
+        self._session: AgentSession | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @classmethod
+    def from_env(cls, *, local_summary: bool = False) -> ContextWindow:
+        """``CAJICA_CONTEXT_SUMMARY_MODEL=local`` (o ``local_summary``) resume sin llamar a OpenAI."""
+        summary_model = os.getenv("CAJICA_CONTEXT_SUMMARY_MODEL", "gpt-4o-mini")
+        if local_summary or summary_model == "local":
+            summarizer: LLMSummarizer | ExtractiveSummarizer = ExtractiveSummarizer()
+        else:
+            from livekit.plugins import openai
+
+            summarizer = LLMSummarizer(openai.LLM(model=summary_model, temperature=0.2))
+        return cls(
+            summarizer,
+            max_tokens=int(os.getenv("CAJICA_CONTEXT_MAX_TOKENS", "3000")),
+            keep_items=int(os.getenv("CAJICA_CONTEXT_KEEP_ITEMS", "6")),
+        )
+
+    def attach(self, session: AgentSession) -> None:
+        self._session = session
+        session.on("conversation_item_added", self._on_item_added)
+        session.on("close", self._on_close)
+
+    def _on_item_added(self, ev: ConversationItemAddedEvent) -> None:
+        if not isinstance(ev.item, llm.ChatMessage) or ev.item.role != "assistant":
+            return
+        if self._session is None or (self._task is not None and not self._task.done()):
+            return
+        agent = self._session.current_agent
+        if sum(estimate_tokens(item) for item in agent.chat_ctx.items) > self.max_tokens:
+            self._task = asyncio.create_task(self._compact(agent))
+
+    async def _compact(self, agent: Agent) -> None:
+        items = agent.chat_ctx.items
+        cut = len(items) - self.keep_items
+        # No separar el resultado de una herramienta de su llamada
+        while cut > 0 and isinstance(items[cut], llm.FunctionCallOutput):
+            cut -= 1
+        if cut <= 0:
+            return
+
+        head = items[:cut]
+        previous = next((item.text_content for item in head if is_summary(item)), None)
+        lines = [line for item in head if not is_summary(item) and (line := _render(item))]
+        if not lines:
+            return
+        try:
+            summary = await self.summarizer.summarize(previous, "\n".join(lines))
+        except Exception as e:
+            self.stats.failures += 1
+            logger.warning(f"No se pudo resumir el contexto: {e}")
+            return
+        if not summary or self._session is None or self._session.current_agent is not agent:
+            return
+
+        # El contexto pudo crecer mientras se resumía: se parte del actual
+        head_ids = {item.id for item in head}
+        kept = [
+            item
+            for item in agent.chat_ctx.items
+            if item.id not in head_ids
+            or not isinstance(item, (llm.ChatMessage, llm.FunctionCall, llm.FunctionCallOutput))
+            or (isinstance(item, llm.ChatMessage) and item.role in ("system", "developer") and not is_summary(item))
+        ]
+        chat_ctx = llm.ChatContext(kept)
+        tail_start = next((item.created_at for item in kept if item.id not in head_ids), None)
+        chat_ctx.insert(
+            llm.ChatMessage(
+                role="assistant",
+                content=[f"Resumen de la conversación anterior:\n{summary}"],
+                extra={"is_summary": True},
+                created_at=tail_start - 1e-6 if tail_start is not None else head[-1].created_at,
+            )
+        )
+        await agent.update_chat_ctx(chat_ctx)
+        self.stats.compactions += 1
+        self.stats.summarized_items += len(head)
+        logger.info(
+            f"Contexto compactado: {len(head)} ítems resumidos,"
+            f" ~{sum(estimate_tokens(item) for item in chat_ctx.items)} tokens en el contexto"
+        )
+
+    def _on_close(self, ev: CloseEvent) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        if self.stats.compactions or self.stats.failures:
+            logger.info(
+                f"Contexto: {self.stats.compactions} compactaciones, {self.stats.summarized_items} ítems resumidos,"
+                f" {self.stats.failures} fallos"
+            )
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import numpy as np
+from livekit import rtc
+
+logger = logging.getLogger("cajica-assistant")
+
+GREETING_TEXT = (
+    "¡Hola! Soy el asistente virtual de la Alcaldía de Cajicá. "
+    "Puedo ayudarte con información sobre nuestro Plan de Desarrollo Municipal "
+    "Cajicá Ideal 2024-2027, sus 18 sectores estratégicos y los servicios municipales. "
+    "¿En qué puedo ayudarte hoy?"
+)
+GREETING_VOICE = "alloy"
+GREETING_TTS_MODEL = "gpt-4o-mini-tts"
+
+SAMPLE_RATE = 24000
+CACHE_DIR = Path(os.getenv("CAJICA_CACHE_DIR", Path(__file__).parent / ".cache")) / "greetings"
+
+
+def greeting_cache_path(
+    text: str = GREETING_TEXT,
+    voice: str = GREETING_VOICE,
+    model: str = GREETING_TTS_MODEL,
+    cache_dir: Path = CACHE_DIR,
+) -> Path:
+    digest = hashlib.sha256(f"{voice}\0{model}\0{text}".encode("utf-8")).hexdigest()
+    return cache_dir / f"{digest[:16]}-{SAMPLE_RATE}.pcm"
+
+
+class CachedGreeting:
+    """Saludo pre-sintetizado (PCM s16le mono) mapeado en memoria de solo lectura."""
+
+    def __init__(self, text: str, path: Path) -> None:
+        self.text = text
+        self.path = path
+        self._pcm = np.memmap(path, dtype=np.int16, mode="r")
+
+    @property
+    def duration(self) -> float:
+        return len(self._pcm) / SAMPLE_RATE
+
+    async def frames(self, frame_ms: int = 20) -> AsyncIterator[rtc.AudioFrame]:
+        samples = SAMPLE_RATE * frame_ms // 1000
+        for start in range(0, len(self._pcm), samples):
+            chunk = self._pcm[start : start + samples]
+            yield rtc.AudioFrame(
+                data=chunk.tobytes(),
+                sample_rate=SAMPLE_RATE,
+                num_channels=1,
+                samples_per_channel=len(chunk),
+            )
+
+
+def load_greeting(text: str = GREETING_TEXT) -> CachedGreeting | None:
+    path = greeting_cache_path(text)
+    if not path.exists():
+        logger.info(f"Saludo sin audio en caché ({path.name}); se usará el modelo para el primer saludo")
+        return None
+    return CachedGreeting(text, path)
+
+
+async def synthesize_greeting(
+    text: str = GREETING_TEXT,
+    voice: str = GREETING_VOICE,
+    model: str = GREETING_TTS_MODEL,
+) -> CachedGreeting:
+    from livekit.plugins import openai
+
+    path = greeting_cache_path(text, voice, model)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+
+    tts = openai.TTS(model=model, voice=voice, response_format="pcm")
+    try:
+        with tmp_path.open("wb") as f:
+            async for audio in tts.synthesize(text):
+                if audio.frame.sample_rate != SAMPLE_RATE or audio.frame.num_channels != 1:
+                    raise ValueError(
+                        f"Formato de audio inesperado: {audio.frame.sample_rate} Hz, {audio.frame.num_channels} canales"
+                    )
+                f.write(audio.frame.data.tobytes())
+        # Reemplazo atómico: otros procesos nunca ven un archivo a medio escribir
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        await tts.aclose()
+
+    greeting = CachedGreeting(text, path)
+    logger.info(f"Saludo sintetizado en caché: {path} ({greeting.duration:.1f} s)")
+    return greeting
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv(dotenv_path=".env.local")
+
+    async def main() -> None:
+        from session_recovery import RECOVERY_PHRASES
+
+        # Saludo y mensajes de recuperación y despedida: la sesión realtime no tiene TTS
+        for text in (GREETING_TEXT, *RECOVERY_PHRASES):
+            await synthesize_greeting(text)
+
+    asyncio.run(main())
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from collections import defaultdict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import TypeVar
+
+from knowledge import normalize, tokenize
+
+logger = logging.getLogger("cajica-assistant")
+
+INDICATORS_PATH = Path(__file__).parent / "data" / "indicadores.json"
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_CODE_RE = re.compile(r"^\s*(IR|IP)\s*-?\s*(\d+)\s*$", re.IGNORECASE)
+
+
+def normalize_code(code: str) -> str | None:
+    match = _CODE_RE.match(code)
+    if match is None:
+        return None
+    return f"{match.group(1).upper()}-{int(match.group(2))}"
+
+
+def _fmt_number(value: float) -> str:
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+
+@dataclass(frozen=True, slots=True)
+class Dimension:
+    number: int
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class Indicator:
+    code: str
+    name: str
+    target: float
+    unit: str
+    note: str | None
+    dimension: int
+    sector: int | None
+
+    def render_target(self) -> str:
+        sep = "" if self.unit == "%" else " "
+        note = f" {self.note}" if self.note else ""
+        return f"{_fmt_number(self.target)}{sep}{self.unit}{note}"
+
+
+@dataclass(frozen=True, slots=True)
+class Sector:
+    number: int
+    name: str
+    dimension: int
+    progress: float
+    key_indicators: tuple[str, ...]
+    programs: tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Budget:
+    area: str
+    min_millions: float
+    detail: str
+    sector: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class ProgramTarget:
+    sector: int
+    description: str
+    value: float
+    unit: str
+
+
+def _frozen_groups(groups: dict[K, list[V]]) -> Mapping[K, tuple[V, ...]]:
+    return MappingProxyType({key: tuple(values) for key, values in groups.items()})
+
+
+class IndicatorStore:
+    """Tabla tipada de indicadores, avances sectoriales, presupuestos y metas del Plan."""
+
+    def __init__(self, data: dict) -> None:
+        self.source: str = data["fuente"]
+        self.total_budget: str = data["presupuesto_total"]
+        # Se carga una vez por proceso y la comparten todas las sesiones: todo es de solo lectura
+        self.dimensions = MappingProxyType(
+            {d["numero"]: Dimension(number=d["numero"], name=d["nombre"]) for d in data["dimensiones"]}
+        )
+        self.sectors = MappingProxyType({
+            s["numero"]: Sector(
+                number=s["numero"],
+                name=s["nombre"],
+                dimension=s["dimension"],
+                progress=float(s["avance"]),
+                key_indicators=tuple(s["indicadores_clave"]),
+                programs=tuple(s["programas"]),
+            )
+            for s in data["sectores"]
+        })
+        self.indicators = MappingProxyType({
+            i["codigo"]: Indicator(
+                code=i["codigo"],
+                name=i["nombre"],
+                target=float(i["meta"]),
+                unit=i["unidad"],
+                note=i.get("nota"),
+                dimension=i["dimension"],
+                sector=i.get("sector"),
+            )
+            for i in data["indicadores"]
+        })
+
+        by_sector: dict[int, list[Indicator]] = defaultdict(list)
+        by_dimension: dict[int, list[Indicator]] = defaultdict(list)
+        for indicator in self.indicators.values():
+            by_dimension[indicator.dimension].append(indicator)
+            if indicator.sector is not None:
+                by_sector[indicator.sector].append(indicator)
+        self._by_sector = _frozen_groups(by_sector)
+        self._by_dimension = _frozen_groups(by_dimension)
+
+        budgets: dict[int, list[Budget]] = defaultdict(list)
+        all_budgets: list[Budget] = []
+        for b in data["presupuestos"]:
+            budget = Budget(
+                area=b["area"], min_millions=float(b["minimo_millones"]), detail=b["detalle"], sector=b.get("sector")
+            )
+            all_budgets.append(budget)
+            if budget.sector is not None:
+                budgets[budget.sector].append(budget)
+        self.budgets = tuple(all_budgets)
+        self._budgets = _frozen_groups(budgets)
+
+        targets: dict[int, list[ProgramTarget]] = defaultdict(list)
+        for t in data["metas"]:
+            targets[t["sector"]].append(
+                ProgramTarget(sector=t["sector"], description=t["descripcion"], value=float(t["valor"]), unit=t["unidad"])
+            )
+        self._targets = _frozen_groups(targets)
+
+        # Nombre completo normalizado y, para nombres parciales, sectores por palabra
+        self._sector_names = MappingProxyType({normalize(s.name): s.number for s in self.sectors.values()})
+        sector_words: dict[str, list[int]] = defaultdict(list)
+        for s in self.sectors.values():
+            for tok in set(tokenize(s.name)):
+                sector_words[tok].append(s.number)
+        self._sector_words = _frozen_groups(sector_words)
+
+    def get_indicator(self, code: str) -> Indicator | None:
+        normalized = normalize_code(code)
+        return self.indicators.get(normalized) if normalized else None
+
+    def find_sector(self, name: str) -> Sector | None:
+        name = name.strip()
+        if name.isdigit():
+            return self.sectors.get(int(name))
+        number = self._sector_names.get(normalize(name))
+        if number is not None:
+            return self.sectors[number]
+        # El sector con más palabras en común, solo si no hay empate
+        votes: dict[int, int] = defaultdict(int)
+        for tok in tokenize(name):
+            for candidate in self._sector_words.get(tok, ()):
+                votes[candidate] += 1
+        ranked = sorted(votes.items(), key=lambda kv: kv[1], reverse=True)
+        if not ranked or (len(ranked) > 1 and ranked[0][1] == ranked[1][1]):
+            return None
+        return self.sectors[ranked[0][0]]
+
+    @property
+    def sector_terms(self) -> frozenset[str]:
+        """Palabras normalizadas de los nombres de sector ("salud", "educacion", ...)."""
+        return frozenset(self._sector_words)
+
+    def indicators_for_sector(self, sector: int) -> tuple[Indicator, ...]:
+        return self._by_sector.get(sector, ())
+
+    def indicators_for_dimension(self, dimension: int) -> tuple[Indicator, ...]:
+        return self._by_dimension.get(dimension, ())
+
+    def budgets_for_sector(self, sector: int) -> tuple[Budget, ...]:
+        return self._budgets.get(sector, ())
+
+    def targets_for_sector(self, sector: int) -> tuple[ProgramTarget, ...]:
+        return self._targets.get(sector, ())
+
+    def describe_indicator(self, indicator: Indicator) -> str:
+        lines = [
+            f"{indicator.code}: {indicator.name}",
+            f"- Meta: {indicator.render_target()}",
+            f"- Dimensión {indicator.dimension}: {self.dimensions[indicator.dimension].name}",
+        ]
+        if indicator.sector is not None:
+            lines.append(f"- Sector: {self.sectors[indicator.sector].name}")
+        lines.append(f"- Fuente: {self.source}")
+        return "\n".join(lines)
+
+    def describe_sector(self, sector: Sector) -> str:
+        lines = [
+            f"Sector {sector.number}. {sector.name}",
+            f"- Dimensión {sector.dimension}: {self.dimensions[sector.dimension].name}",
+            f"- Avance actual: {_fmt_number(sector.progress)}%",
+            f"- Indicadores clave: {', '.join(sector.key_indicators)}",
+            f"- Programas destacados: {', '.join(sector.programs)}",
+        ]
+        for indicator in self.indicators_for_sector(sector.number):
+            lines.append(f"- {indicator.code} {indicator.name}: meta {indicator.render_target()}")
+        for budget in self.budgets_for_sector(sector.number):
+            lines.append(f"- Inversión {budget.area}: más de {_fmt_number(budget.min_millions)} millones ({budget.detail})")
+        for target in self.targets_for_sector(sector.number):
+            lines.append(f"- Meta de programa: {target.description}: {_fmt_number(target.value)} {target.unit}")
+        lines.append(f"- Fuente: {self.source}")
+        return "\n".join(lines)
+
+
+def load_indicators(path: Path = INDICATORS_PATH) -> IndicatorStore:
+    store = IndicatorStore(json.loads(path.read_text(encoding="utf-8")))
+    logger.info(
+        f"Indicadores cargados: {len(store.indicators)} indicadores, {len(store.sectors)} sectores desde {path.name}"
+    )
+    return store
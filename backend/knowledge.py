@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger("cajica-assistant")
+
+KNOWLEDGE_PATH = Path(__file__).parent / "data" / "conocimiento.md"
+CACHE_DIR = Path(os.getenv("CAJICA_CACHE_DIR", Path(__file__).parent / ".cache")) / "knowledge"
+
+# Cambia si cambia el tokenizador o el cálculo de pesos: invalida los índices ya construidos
+INDEX_VERSION = 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^(#{2,3})\s+(.*)$")
+_MARKUP_RE = re.compile(r"[*`]")
+
+_STOPWORDS = frozenset(
+    """
+    a al algo ante como con cual cuales cuando de del desde donde el ella ellas ellos en
+    entre es esa ese eso esta este esto fue ha hay la las le les lo los mas me mi muy no
+    nos o para pero por que quien se segun ser si sin sobre son su sus te tiene tu un una
+    uno unos unas y ya cuanto cuanta cuantos cuantas
+    """.split()
+)
+
+
+def normalize(text: str) -> str:
+    # Minúsculas y sin tildes: "Educación" y "educacion" deben coincidir
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+
+
+_VOWELS = frozenset("aeiou")
+
+
+def _stem(token: str) -> str:
+    # Plurales simples del español: se quita la "s" y, tras consonante, la "e" que queda,
+    # de modo que singular y plural comparten raíz ("parque" y "parques" -> "parque",
+    # "sector" y "sectores" -> "sector", "calle" y "calles" -> "call")
+    if len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 3 and token.endswith("e") and token[-2] not in _VOWELS:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        _stem(tok)
+        for tok in _TOKEN_RE.findall(normalize(text))
+        if tok not in _STOPWORDS
+    ]
+
+
+@dataclass(frozen=True)
+class Passage:
+    title: str
+    text: str
+
+    def render(self) -> str:
+        return f"[{self.title}]\n{self.text}"
+
+
+def split_passages(markdown: str) -> list[Passage]:
+    """Divide el documento en pasajes por encabezados ``##`` y ``###``."""
+    passages: list[Passage] = []
+    section = ""
+    title = ""
+    body: list[str] = []
+
+    def flush() -> None:
+        text = "\n".join(body).strip()
+        if title and text:
+            passages.append(Passage(title=title, text=text))
+        body.clear()
+
+    for line in markdown.splitlines():
+        match = _HEADING_RE.match(line)
+        if match is None:
+            body.append(line)
+            continue
+        flush()
+        heading = _MARKUP_RE.sub("", match.group(2)).strip()
+        if match.group(1) == "##":
+            section = heading
+            title = heading
+        else:
+            title = f"{section} › {heading}" if section else heading
+    flush()
+    return passages
+
+
+class KnowledgeIndex:
+    """Índice BM25 en memoria sobre los pasajes de la base de conocimiento."""
+
+    def __init__(self, passages: list[Passage], *, k1: float = 1.5, b: float = 0.75) -> None:
+        self.passages = tuple(passages)
+        docs = [tokenize(f"{p.title} {p.text}") for p in passages]
+
+        self._vocab: dict[str, int] = {}
+        for tokens in docs:
+            for tok in tokens:
+                self._vocab.setdefault(tok, len(self._vocab))
+
+        tf = np.zeros((len(self._vocab), len(docs)), dtype=np.float32)
+        for j, tokens in enumerate(docs):
+            for tok in tokens:
+                tf[self._vocab[tok], j] += 1
+
+        doc_len = tf.sum(axis=0)
+        avg_len = float(doc_len.mean()) if len(docs) else 0.0
+        df = (tf > 0).sum(axis=1)
+        idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # Pesos BM25 precalculados: una consulta es la suma de filas de sus términos
+        norm = k1 * (1 - b + b * doc_len / max(avg_len, 1.0))
+        self._weights = idf[:, None] * tf * (k1 + 1) / (tf + norm)
+        # Se construye una vez por proceso y lo comparten todas las sesiones
+        self._weights.flags.writeable = False
+
+    @classmethod
+    def from_arrays(cls, passages: list[Passage], vocab: list[str], weights: np.ndarray) -> KnowledgeIndex:
+        index = cls.__new__(cls)
+        index.passages = tuple(passages)
+        index._vocab = {tok: row for row, tok in enumerate(vocab)}
+        index._weights = weights
+        return index
+
+    def save(self, directory: Path) -> None:
+        """Guarda el índice en ``directory``: pasajes y vocabulario en JSON, pesos en ``.npy``."""
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "weights.npy", self._weights)
+        meta = {"passages": [asdict(p) for p in self.passages], "vocab": list(self._vocab)}
+        (directory / "index.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load_mapped(cls, directory: Path) -> KnowledgeIndex:
+        """Abre un índice guardado con ``save`` con los pesos mapeados en memoria de solo lectura.
+
+        Los procesos de trabajo que abren el mismo archivo comparten sus páginas en la caché
+        del sistema operativo en lugar de tener cada uno su copia de la matriz.
+        """
+        meta = json.loads((directory / "index.json").read_text(encoding="utf-8"))
+        weights = np.load(directory / "weights.npy", mmap_mode="r")
+        return cls.from_arrays([Passage(**p) for p in meta["passages"]], meta["vocab"], weights)
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, k: int = 3) -> list[tuple[Passage, float]]:
+        rows = sorted({self._vocab[t] for t in tokenize(query) if t in self._vocab})
+        if not rows:
+            return []
+        scores = self._weights[rows].sum(axis=0)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(self.passages[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def index_cache_path(markdown: str, cache_dir: Path = CACHE_DIR) -> Path:
+    digest = hashlib.sha256(f"{INDEX_VERSION}\0{markdown}".encode("utf-8")).hexdigest()
+    return cache_dir / digest[:16]
+
+
+def build_index(path: Path = KNOWLEDGE_PATH, cache_dir: Path = CACHE_DIR) -> Path:
+    """Construye el índice de ``path`` y lo guarda en la caché si aún no existe."""
+    markdown = path.read_text(encoding="utf-8")
+    target = index_cache_path(markdown, cache_dir)
+    if target.exists():
+        return target
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-"))
+    try:
+        KnowledgeIndex(split_passages(markdown)).save(tmp_dir)
+        # Reemplazo atómico: otros procesos nunca ven un índice a medio escribir
+        os.rename(tmp_dir, target)
+        logger.info(f"Índice de conocimiento guardado en {target}")
+    except OSError:
+        # Otro proceso lo construyó al mismo tiempo
+        if not target.exists():
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return target
+
+
+def load_knowledge(path: Path = KNOWLEDGE_PATH, cache_dir: Path = CACHE_DIR) -> KnowledgeIndex:
+    try:
+        index = KnowledgeIndex.load_mapped(build_index(path, cache_dir))
+        source = "mapeado en memoria"
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo usar el índice en caché, se construye en memoria: {e}")
+        index = KnowledgeIndex(split_passages(path.read_text(encoding="utf-8")))
+        source = "en memoria"
+    logger.info(f"Base de conocimiento indexada: {len(index)} pasajes desde {path.name} ({source})")
+    return index
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(build_index())
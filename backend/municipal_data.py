@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from indicators import IndicatorStore, load_indicators
+from knowledge import KnowledgeIndex, load_knowledge
+
+logger = logging.getLogger("cajica-assistant")
+
+DATA_DIR = Path(os.getenv("CAJICA_DATA_DIR", Path(__file__).parent / "data"))
+KNOWLEDGE_FILE = "conocimiento.md"
+INDICATORS_FILE = "indicadores.json"
+
+
+@dataclass(frozen=True)
+class MunicipalData:
+    """Una versión de los datos municipales: base de conocimiento e indicadores.
+
+    Es inmutable; una recarga crea otra instancia y las sesiones que ya tenían la anterior
+    la siguen usando hasta terminar.
+    """
+
+    version: str
+    knowledge: KnowledgeIndex
+    indicators: IndicatorStore
+
+
+def data_version(data_dir: Path = DATA_DIR) -> str:
+    digest = hashlib.sha256()
+    for name in (KNOWLEDGE_FILE, INDICATORS_FILE):
+        digest.update((data_dir / name).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def load_municipal_data(data_dir: Path = DATA_DIR) -> MunicipalData:
+    return MunicipalData(
+        version=data_version(data_dir),
+        knowledge=load_knowledge(data_dir / KNOWLEDGE_FILE),
+        indicators=load_indicators(data_dir / INDICATORS_FILE),
+    )
+
+
+class DataWatcher:
+    """Recarga los datos municipales cuando cambian sus archivos, sin reiniciar el worker.
+
+    Un hilo revisa cada ``interval`` segundos la fecha y el tamaño de los archivos; si
+    cambiaron, reconstruye los índices en ese mismo hilo y reemplaza ``current`` en una
+    sola asignación. Las sesiones nuevas toman ``current`` al crearse. Si los archivos
+    nuevos no se pueden cargar (por ejemplo, un JSON a medio escribir), se conserva la
+    versión anterior hasta que vuelvan a cambiar.
+    """
+
+    def __init__(self, data: MunicipalData, *, data_dir: Path = DATA_DIR, interval: float = 30.0) -> None:
+        self.current = data
+        self.data_dir = data_dir
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_env(cls) -> DataWatcher:
+        """Carga la versión inicial; ``CAJICA_DATA_RELOAD_INTERVAL=0`` desactiva la recarga."""
+        watcher = cls(load_municipal_data(), interval=float(os.getenv("CAJICA_DATA_RELOAD_INTERVAL", "30")))
+        logger.info(f"Datos municipales versión {watcher.current.version} desde {DATA_DIR}")
+        if watcher.interval > 0:
+            watcher.start()
+        return watcher
+
+    def _stat(self) -> tuple[tuple[int, int], ...]:
+        stats = [(self.data_dir / name).stat() for name in (KNOWLEDGE_FILE, INDICATORS_FILE)]
+        return tuple((st.st_mtime_ns, st.st_size) for st in stats)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cajica-data-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        try:
+            signature = self._stat()
+        except OSError as e:
+            logger.warning(f"No se pueden leer los datos municipales en {self.data_dir}: {e}")
+            return False
+        if signature == self._signature:
+            return False
+        # Un archivo inválido no se reintenta hasta que vuelva a cambiar
+        self._signature = signature
+        try:
+            if data_version(self.data_dir) == self.current.version:
+                return False
+            data = load_municipal_data(self.data_dir)
+        except Exception as e:
+            logger.warning(f"No se pudieron recargar los datos municipales, se mantiene la versión {self.current.version}: {e}")
+            return False
+        previous, self.current = self.current, data
+        logger.info(f"Datos municipales recargados: versión {previous.version} -> {data.version}")
+        return True
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+from turn_detection import TurnConfig
+
+if TYPE_CHECKING:
+    from livekit.agents.types import APIConnectOptions
+
+logger = logging.getLogger("cajica-assistant")
+
+
+class ModelMode(str, Enum):
+    REALTIME = "realtime"
+    PIPELINE = "pipeline"
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """Modelos con los que se arma cada ``AgentSession``.
+
+    - ``realtime``: el modelo realtime de OpenAI recibe el audio y responde con audio.
+    - ``pipeline``: STT en streaming, un LLM de texto y TTS. El TTS sintetiza oración por
+      oración, así que el audio empieza con la primera oración que produce el LLM.
+    """
+
+    mode: ModelMode = ModelMode.REALTIME
+    realtime_model: str = "gpt-4o-realtime-preview"
+    llm_model: str = "gpt-4o-mini"
+    stt_model: str = "gpt-4o-mini-transcribe"
+    tts_model: str = "gpt-4o-mini-tts"
+    voice: str = "alloy"
+    language: str = "es"
+    temperature: float = 0.6
+    min_sentence_len: int = 20
+
+    @classmethod
+    def from_env(cls) -> ModelConfig:
+        raw_mode = os.getenv("CAJICA_MODEL_MODE", ModelMode.REALTIME.value).strip().lower()
+        try:
+            mode = ModelMode(raw_mode)
+        except ValueError:
+            logger.warning(f"CAJICA_MODEL_MODE inválido '{raw_mode}', usando '{ModelMode.REALTIME.value}'")
+            mode = ModelMode.REALTIME
+        return cls(
+            mode=mode,
+            realtime_model=os.getenv("CAJICA_REALTIME_MODEL", cls.realtime_model),
+            llm_model=os.getenv("CAJICA_LLM_MODEL", cls.llm_model),
+            stt_model=os.getenv("CAJICA_STT_MODEL", cls.stt_model),
+            tts_model=os.getenv("CAJICA_TTS_MODEL", cls.tts_model),
+        )
+
+    def session_options(
+        self,
+        turns: TurnConfig,
+        *,
+        transcribe_turns: bool = False,
+        conn_options: APIConnectOptions | None = None,
+    ) -> dict[str, Any]:
+        """Argumentos de ``AgentSession`` para este modo.
+
+        Con ``transcribe_turns`` el modo realtime también detecta el fin de turno en el
+        agente (VAD + STT), para tener la transcripción antes de que el modelo responda, y
+        agrega un TTS para lo que el agente diga sin pasar por el modelo. ``turns`` fija
+        cómo se cierra el turno, en el agente o en el servidor del modelo realtime.
+        ``conn_options`` fija los reintentos con que el modelo realtime se reconecta.
+        """
+        from livekit.plugins import openai
+
+        if self.mode is ModelMode.PIPELINE:
+            return dict(
+                stt=self._stt(),
+                llm=openai.LLM(model=self.llm_model, temperature=self.temperature),
+                tts=self._tts(),
+                turn_handling=turns.turn_handling(),
+            )
+
+        realtime_options: dict[str, Any] = dict(voice=self.voice, model=self.realtime_model, temperature=self.temperature)
+        if conn_options is not None:
+            realtime_options["conn_options"] = conn_options
+        if not transcribe_turns:
+            return dict(
+                llm=openai.realtime.RealtimeModel(turn_detection=turns.realtime_turn_detection(), **realtime_options)
+            )
+        return dict(
+            stt=self._stt(),
+            llm=openai.realtime.RealtimeModel(turn_detection=None, **realtime_options),
+            tts=self._tts(),
+            turn_handling=turns.turn_handling(),
+        )
+
+    def _stt(self) -> Any:
+        from livekit.plugins import openai
+
+        return openai.STT(model=self.stt_model, language=self.language, use_realtime=True)
+
+    def _tts(self) -> Any:
+        from livekit.agents import tokenize, tts
+        from livekit.plugins import openai
+
+        return tts.StreamAdapter(
+            tts=openai.TTS(model=self.tts_model, voice=self.voice),
+            sentence_tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=self.min_sentence_len),
+        )
@@ -0,0 +1,262 @@
+"""Perfil de tokens de las instrucciones de los agentes y versión compacta del prompt.
+
+Cuenta los tokens de cada sección de las instrucciones de ``CajicaAssistant`` y
+``CajicaAssistantLite`` (y de la base de conocimiento), estima su costo y su latencia
+por sesión, señala hechos repetidos entre secciones y escribe una variante sin emojis,
+separadores ni hechos duplicados.
+
+Los tokens se cuentan con ``tiktoken`` (codificación ``o200k_base``) si está instalado
+y la codificación se puede cargar (sin red, solo si ya está en caché); si no, se estiman
+a 4 caracteres por token.
+
+Uso:
+    python prompt_budget.py --turns 8 --compact full --out instrucciones_compactas.md
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+import sys
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+from knowledge import tokenize
+
+logger = logging.getLogger("cajica-assistant")
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.*)$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*]|\d+\.)\s+")
+_RULE_RE = re.compile(r"^\s*-{3,}\s*$")
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # tiktoken es opcional (ver requirements.txt)
+    try:
+        import tiktoken  # pyright: ignore[reportMissingImports]
+    except ImportError:
+        return None
+    try:
+        # Sin el archivo en caché, tiktoken lo descarga: sin red falla con su propia excepción
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"No se pudo cargar la codificación o200k_base de tiktoken: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text))
+
+
+@dataclass
+class Section:
+    title: str
+    text: str
+    tokens: int = 0
+
+
+@dataclass
+class Duplicate:
+    first_section: str
+    second_section: str
+    first: str
+    second: str
+    similarity: float
+
+
+@dataclass
+class PromptProfile:
+    name: str
+    tokens: int
+    sections: list[Section]
+    duplicates: list[Duplicate] = field(default_factory=list)
+    compact_tokens: int = 0
+    cost_per_session: float | None = None
+    prefill_seconds_per_turn: float | None = None
+
+
+def split_sections(text: str) -> list[Section]:
+    """Divide un prompt en Markdown por encabezados, incluido el texto antes del primero."""
+    sections: list[Section] = []
+    title = "(inicio)"
+    lines: list[str] = []
+    for line in text.strip().splitlines():
+        match = _HEADING_RE.match(line)
+        if match is not None and match.group(1) != "#":
+            if "\n".join(lines).strip():
+                sections.append(Section(title, "\n".join(lines)))
+            title, lines = match.group(2).strip(), []
+        lines.append(line)
+    if "\n".join(lines).strip():
+        sections.append(Section(title, "\n".join(lines)))
+    for section in sections:
+        section.tokens = count_tokens(section.text)
+    return sections
+
+
+def _strip_decoration(line: str) -> str:
+    # Emojis y selectores de variación no aportan al modelo y cuestan tokens
+    line = "".join(c for c in line if unicodedata.category(c) not in ("So", "Sk", "Cf", "Mn") or c.isalnum())
+    line = line.replace("**", "")
+    return re.sub(r"[ \t]+", " ", line).rstrip()
+
+
+def _fact_terms(line: str) -> frozenset[str]:
+    return frozenset(tokenize(_BULLET_RE.sub("", line)))
+
+
+def find_duplicates(sections: list[Section], *, threshold: float = 0.8, min_terms: int = 4) -> list[Duplicate]:
+    """Líneas de secciones distintas cuyos términos coinciden en al menos ``threshold`` (Jaccard)."""
+    facts = [
+        (section.title, line.strip(), terms)
+        for section in sections
+        for line in section.text.splitlines()[1:]
+        if len(terms := _fact_terms(line)) >= min_terms
+    ]
+    duplicates = []
+    for (title_a, line_a, terms_a), (title_b, line_b, terms_b) in combinations(facts, 2):
+        if title_a == title_b:
+            continue
+        similarity = len(terms_a & terms_b) / len(terms_a | terms_b)
+        if similarity >= threshold:
+            duplicates.append(Duplicate(title_a, title_b, line_a, line_b, round(similarity, 2)))
+    return duplicates
+
+
+def _heading_level(line: str) -> int | None:
+    match = _HEADING_RE.match(line)
+    return len(match.group(1)) if match is not None else None
+
+
+def compact(text: str, *, threshold: float = 0.8, min_terms: int = 4) -> str:
+    """Versión sin decoración ni hechos repetidos; se conserva la primera aparición."""
+    seen: list[frozenset[str]] = []
+    kept: list[str] = []
+    for line in text.strip().splitlines():
+        if _RULE_RE.match(line):
+            continue
+        line = _strip_decoration(line)
+        terms = _fact_terms(line)
+        if len(terms) >= min_terms and not _HEADING_RE.match(line):
+            if any(len(terms & other) / len(terms | other) >= threshold for other in seen):
+                continue
+            seen.append(terms)
+        kept.append(line)
+    # Encabezados que quedaron sin contenido: les sigue otro del mismo nivel o superior
+    result: list[str] = []
+    for i, line in enumerate(kept):
+        level = _heading_level(line)
+        if level is not None:
+            following = next((l for l in kept[i + 1 :] if l.strip()), None)
+            following_level = _heading_level(following) if following is not None else 0
+            if following_level is not None and following_level <= level:
+                continue
+        result.append(line)
+    return _BLANK_RUN_RE.sub("\n\n", "\n".join(result)).strip() + "\n"
+
+
+def agent_prompts() -> dict[str, str]:
+    """Instrucciones que cada agente envía al modelo en cada respuesta."""
+    import agent as cajica
+
+    return {
+        "full": cajica.CAJICA_INSTRUCTIONS.strip(),
+        "lite": cajica.CAJICA_LITE_INSTRUCTIONS + cajica.CAJICA_LITE_ESCALATION_INSTRUCTIONS,
+    }
+
+
+def profile_prompt(
+    name: str,
+    text: str,
+    *,
+    turns: int | None = None,
+    price_per_mtok: float = 5.0,
+    prefill_ms_per_1k: float = 20.0,
+) -> PromptProfile:
+    """Tokens por sección, duplicados y, con ``turns``, costo y prefill por sesión.
+
+    Las instrucciones se facturan como tokens de entrada en cada respuesta del modelo,
+    así que el costo por sesión crece con los turnos.
+    """
+    sections = split_sections(text)
+    profile = PromptProfile(
+        name=name,
+        tokens=count_tokens(text),
+        sections=sorted(sections, key=lambda s: s.tokens, reverse=True),
+        duplicates=find_duplicates(sections),
+        compact_tokens=count_tokens(compact(text)),
+    )
+    if turns is not None:
+        profile.cost_per_session = profile.tokens * turns * price_per_mtok / 1e6
+        profile.prefill_seconds_per_turn = profile.tokens / 1000 * prefill_ms_per_1k / 1000
+    return profile
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--turns", type=int, default=8, help="Turnos por sesión para estimar el costo")
+    parser.add_argument("--price-per-mtok", type=float, default=5.0, help="USD por millón de tokens de entrada")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=20.0, help="Milisegundos de prefill por cada mil tokens")
+    parser.add_argument("--knowledge", type=Path, help="Perfila también esta base de conocimiento (Markdown)")
+    parser.add_argument("--compact", help="Prompt del que se escribe la variante compacta (full, lite o knowledge)")
+    parser.add_argument("--out", type=Path, help="Archivo para la variante compacta")
+    parser.add_argument("--json", type=Path, help="Escribe el reporte en este archivo JSON")
+    parser.add_argument("--max-tokens", type=int, help="Falla (código 1) si las instrucciones de un agente superan este valor")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    prompts = agent_prompts()
+    profiles = [
+        profile_prompt(
+            name, text, turns=args.turns, price_per_mtok=args.price_per_mtok, prefill_ms_per_1k=args.prefill_ms_per_1k
+        )
+        for name, text in prompts.items()
+    ]
+    if args.knowledge:
+        prompts["knowledge"] = args.knowledge.read_text(encoding="utf-8")
+        profiles.append(profile_prompt("knowledge", prompts["knowledge"]))
+
+    if _encoding() is None:
+        print("tiktoken no está disponible: tokens estimados a 4 caracteres por token\n")
+    for p in profiles:
+        print(f"{p.name}: {p.tokens} tokens, {p.compact_tokens} compactado ({1 - p.compact_tokens / max(p.tokens, 1):.0%} menos)")
+        if p.cost_per_session is not None and p.prefill_seconds_per_turn is not None:
+            print(
+                f"  por sesión de {args.turns} turnos: US${p.cost_per_session:.4f},"
+                f" prefill ~{p.prefill_seconds_per_turn * 1000:.0f} ms por turno"
+            )
+        for section in p.sections[:10]:
+            print(f"  {section.tokens:6d}  {section.tokens / max(p.tokens, 1):5.1%}  {section.title}")
+        for dup in p.duplicates[:10]:
+            print(f"  repetido ({dup.similarity:.0%}): [{dup.first_section}] {dup.first!r} ~ [{dup.second_section}] {dup.second!r}")
+
+    if args.compact:
+        text = compact(prompts[args.compact])
+        if args.out:
+            args.out.write_text(text, encoding="utf-8")
+        else:
+            print(text)
+    if args.json:
+        args.json.write_text(json.dumps([asdict(p) for p in profiles], ensure_ascii=False, indent=2), encoding="utf-8")
+
+    over = [p.name for p in profiles if p.name in ("full", "lite") and args.max_tokens and p.tokens > args.max_tokens]
+    if over:
+        print(f"Instrucciones por encima de {args.max_tokens} tokens: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from livekit.agents import llm
+
+logger = logging.getLogger("cajica-assistant")
+
+
+@dataclass
+class _Standby:
+    session: llm.RealtimeSession
+    opened_at: float = field(default_factory=time.monotonic)
+    failed: bool = False
+
+
+@dataclass
+class RealtimePoolStats:
+    opened: int = 0
+    claimed: int = 0
+    misses: int = 0
+    evicted: int = 0
+
+
+class RealtimeSessionPool:
+    """Sesiones del modelo realtime abiertas antes de que una sesión de agente las pida.
+
+    Cada sesión abre su WebSocket y envía la configuración del modelo (voz, modelo,
+    temperatura) apenas se crea, así que abrirlas mientras la sala se conecta saca el
+    handshake del camino al saludo. Las instrucciones y herramientas del agente se envían
+    al reclamarla; ``update_instructions`` no espera respuesta del servidor.
+
+    El pool mantiene ``size`` sesiones en espera y cada ``check_interval`` segundos repone
+    las reclamadas y reemplaza las que reportaron un error no recuperable o llevan más de
+    ``max_idle`` segundos sin usarse.
+    """
+
+    def __init__(
+        self,
+        model: llm.RealtimeModel,
+        *,
+        size: int = 1,
+        max_idle: float = 300.0,
+        check_interval: float = 5.0,
+    ) -> None:
+        self.model = model
+        self.size = size
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.stats = RealtimePoolStats()
+        self._idle: deque[_Standby] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._closing: set[asyncio.Task[None]] = set()
+
+    @classmethod
+    def from_env(cls, model: llm.RealtimeModel) -> RealtimeSessionPool:
+        return cls(
+            model,
+            size=int(os.getenv("CAJICA_REALTIME_POOL_SIZE", "1")),
+            max_idle=float(os.getenv("CAJICA_REALTIME_POOL_MAX_IDLE", "300")),
+        )
+
+    def start(self) -> None:
+        if self._task is None and self.size > 0:
+            self._task = asyncio.create_task(self._maintain())
+
+    def _open(self) -> None:
+        standby = _Standby(session=self.model.session())
+
+        def on_error(ev: llm.RealtimeModelError) -> None:
+            if not ev.recoverable:
+                standby.failed = True
+                self._wakeup.set()
+
+        standby.session.on("error", on_error)
+        self._idle.append(standby)
+        self.stats.opened += 1
+
+    def _close(self, standby: _Standby) -> None:
+        task = asyncio.create_task(standby.session.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for standby in list(self._idle):
+            if standby.failed or now - standby.opened_at > self.max_idle:
+                self._idle.remove(standby)
+                self._close(standby)
+                self.stats.evicted += 1
+
+    async def _maintain(self) -> None:
+        while True:
+            self._evict()
+            while len(self._idle) < self.size:
+                self._open()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def claim(self) -> llm.RealtimeSession | None:
+        self._evict()
+        if not self._idle:
+            self.stats.misses += 1
+            return None
+        standby = self._idle.popleft()
+        self.stats.claimed += 1
+        logger.info(f"Sesión realtime tomada del pool (abierta hace {time.monotonic() - standby.opened_at:.1f} s)")
+        return standby.session
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            self._close(self._idle.popleft())
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+class PooledRealtimeModel(llm.RealtimeModel):
+    """Envuelve un modelo realtime para que sus sesiones salgan primero del pool."""
+
+    def __init__(self, pool: RealtimeSessionPool) -> None:
+        super().__init__(capabilities=pool.model.capabilities)
+        self.pool = pool
+        self._label = pool.model.label
+
+    @property
+    def model(self) -> str:
+        return self.pool.model.model
+
+    @property
+    def provider(self) -> str:
+        return self.pool.model.provider
+
+    def session(self, *, turn_detection_disabled: bool = False) -> llm.RealtimeSession:
+        # Las sesiones del pool se abren con la detección de turnos del modelo
+        if not turn_detection_disabled and (session := self.pool.claim()) is not None:
+            return session
+        return self.pool.model.session(turn_detection_disabled=turn_detection_disabled)
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+        await self.pool.model.aclose()
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable
+
+from livekit.agents import (
+    AgentSession,
+    AgentStateChangedEvent,
+    CloseEvent,
+    MetricsCollectedEvent,
+    UserStateChangedEvent,
+    metrics,
+)
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger("cajica-assistant")
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0)
+
+CONNECT_SECONDS = Histogram(
+    "cajica_connect_seconds", "Tiempo de ctx.connect() por sesión", buckets=_LATENCY_BUCKETS
+)
+EOU_DELAY_SECONDS = Histogram(
+    "cajica_end_of_utterance_delay_seconds",
+    "Desde que el VAD detecta fin de habla hasta que se confirma el fin de turno",
+    buckets=_LATENCY_BUCKETS,
+)
+VAD_INFERENCE_SECONDS = Histogram(
+    "cajica_vad_inference_seconds",
+    "Duración media de una inferencia del VAD por ventana de reporte",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05),
+)
+FIRST_AUDIO_SECONDS = Histogram(
+    "cajica_time_to_first_audio_seconds",
+    "Tiempo hasta el primer audio del modelo (ttft del modelo realtime o ttfb del TTS)",
+    buckets=_LATENCY_BUCKETS,
+)
+TURN_LATENCY_SECONDS = Histogram(
+    "cajica_turn_latency_seconds",
+    "Desde que el ciudadano deja de hablar hasta que el agente empieza a hablar",
+    buckets=_LATENCY_BUCKETS,
+)
+TOKENS = Counter("cajica_tokens", "Tokens consumidos por los modelos", ["direction"])
+INTERRUPTIONS = Counter("cajica_interruptions", "Veces que el ciudadano interrumpe al agente")
+TURNS = Counter("cajica_turns", "Turnos de conversación completados")
+
+
+@dataclass
+class TurnRecord:
+    turn: int
+    started_at: float
+    eou_delay: float | None = None
+    time_to_first_audio: float | None = None
+    turn_latency: float | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    interrupted: bool = False
+
+
+@dataclass
+class SessionSummary:
+    room: str
+    started_at: float = field(default_factory=time.time)
+    connect_seconds: float | None = None
+    turns: int = 0
+    interruptions: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class SessionMetrics:
+    """Métricas por sesión y por turno a partir de los eventos de ``AgentSession``.
+
+    Cada valor se observa en los histogramas de Prometheus del proceso y, si hay un
+    ``jsonl_dir``, cada turno y el resumen de la sesión se añaden como una línea JSON a
+    ``turns-<pid>.jsonl``. ``sink`` recibe además cada registro (tipo y datos), por ejemplo
+    para guardarlo junto a la transcripción.
+    """
+
+    def __init__(
+        self,
+        room: str,
+        *,
+        jsonl_dir: Path | None = None,
+        sink: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> None:
+        self.summary = SessionSummary(room=room)
+        self.sink = sink
+        self._turn: TurnRecord | None = None
+        self._user_stopped_at: float | None = None
+        self._agent_speaking = False
+        self._file: IO[str] | None = None
+        if jsonl_dir is not None:
+            jsonl_dir.mkdir(parents=True, exist_ok=True)
+            self._file = (jsonl_dir / f"turns-{os.getpid()}.jsonl").open("a", encoding="utf-8", buffering=1)
+
+    @classmethod
+    def from_env(cls, room: str, *, sink: Callable[[str, dict[str, Any]], None] | None = None) -> SessionMetrics:
+        jsonl_dir = os.getenv("CAJICA_METRICS_JSONL_DIR")
+        return cls(room, jsonl_dir=Path(jsonl_dir) if jsonl_dir else None, sink=sink)
+
+    def record_connect(self, seconds: float) -> None:
+        self.summary.connect_seconds = seconds
+        CONNECT_SECONDS.observe(seconds)
+
+    def attach(self, session: AgentSession) -> None:
+        session.on("user_state_changed", self._on_user_state)
+        session.on("agent_state_changed", self._on_agent_state)
+        session.on("metrics_collected", self._on_metrics)
+        session.on("close", self._on_close)
+
+    def _current_turn(self) -> TurnRecord:
+        if self._turn is None:
+            self._turn = TurnRecord(turn=self.summary.turns + 1, started_at=time.time())
+        return self._turn
+
+    def _on_user_state(self, ev: UserStateChangedEvent) -> None:
+        if ev.new_state == "speaking":
+            if self._agent_speaking:
+                INTERRUPTIONS.inc()
+                self.summary.interruptions += 1
+                if self._turn is not None:
+                    self._turn.interrupted = True
+            self._flush_turn()
+            self._current_turn()
+        elif ev.old_state == "speaking":
+            self._user_stopped_at = ev.created_at
+
+    def _on_agent_state(self, ev: AgentStateChangedEvent) -> None:
+        self._agent_speaking = ev.new_state == "speaking"
+        if self._agent_speaking and self._user_stopped_at is not None:
+            latency = ev.created_at - self._user_stopped_at
+            self._user_stopped_at = None
+            TURN_LATENCY_SECONDS.observe(latency)
+            self._current_turn().turn_latency = latency
+
+    def _on_metrics(self, ev: MetricsCollectedEvent) -> None:
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics):
+            EOU_DELAY_SECONDS.observe(m.end_of_utterance_delay)
+            self._current_turn().eou_delay = m.end_of_utterance_delay
+        elif isinstance(m, metrics.VADMetrics):
+            if m.inference_count:
+                VAD_INFERENCE_SECONDS.observe(m.inference_duration_total / m.inference_count)
+        elif isinstance(m, metrics.RealtimeModelMetrics):
+            if m.ttft >= 0:
+                self._observe_first_audio(m.ttft)
+            self._add_tokens(m.input_tokens, m.output_tokens)
+        elif isinstance(m, metrics.LLMMetrics):
+            self._add_tokens(m.prompt_tokens, m.completion_tokens)
+        elif isinstance(m, metrics.TTSMetrics):
+            if m.ttfb >= 0:
+                self._observe_first_audio(m.ttfb)
+
+    def _observe_first_audio(self, seconds: float) -> None:
+        turn = self._current_turn()
+        if turn.time_to_first_audio is None:
+            FIRST_AUDIO_SECONDS.observe(seconds)
+            turn.time_to_first_audio = seconds
+
+    def _add_tokens(self, input_tokens: int, output_tokens: int) -> None:
+        TOKENS.labels(direction="input").inc(input_tokens)
+        TOKENS.labels(direction="output").inc(output_tokens)
+        turn = self._current_turn()
+        turn.input_tokens += input_tokens
+        turn.output_tokens += output_tokens
+        self.summary.input_tokens += input_tokens
+        self.summary.output_tokens += output_tokens
+
+    def _flush_turn(self) -> None:
+        turn, self._turn = self._turn, None
+        if turn is None or (turn.turn_latency is None and turn.time_to_first_audio is None):
+            return
+        TURNS.inc()
+        self.summary.turns += 1
+        self._write({"type": "turn", "room": self.summary.room, **asdict(turn)})
+
+    def _on_close(self, ev: CloseEvent) -> None:
+        self._flush_turn()
+        s = self.summary
+        logger.info(
+            f"Métricas de la sesión {s.room}: {s.turns} turnos, {s.interruptions} interrupciones,"
+            f" {s.input_tokens} tokens de entrada, {s.output_tokens} de salida"
+        )
+        self._write({"type": "session", "reason": getattr(ev.reason, "value", ev.reason), **asdict(s)})
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: dict) -> None:
+        if self.sink is not None:
+            self.sink(record["type"], {k: v for k, v in record.items() if k != "type"})
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+
+from livekit import rtc
+from livekit.agents import AgentSession, CloseEvent, CloseReason, JobContext, llm
+from livekit.agents.voice import SpeechHandle
+from livekit.agents.types import APIConnectOptions
+from livekit.agents.voice.agent_session import SessionConnectOptions
+
+from greeting import CachedGreeting, load_greeting
+
+logger = logging.getLogger("cajica-assistant")
+
+RECOVERY_MESSAGE = "Disculpa, tuve un problema de conexión. Ya estoy de nuevo contigo, ¿en qué íbamos?"
+DRAIN_MESSAGE = (
+    "Debo terminar esta llamada por mantenimiento del servicio. Si necesitas algo más,"
+    " vuelve a llamar en un momento. ¡Gracias por comunicarte con la Alcaldía de Cajicá!"
+)
+RECOVERY_PHRASES = (RECOVERY_MESSAGE, DRAIN_MESSAGE)
+
+
+def load_recovery_audio() -> dict[str, CachedGreeting]:
+    """Audio pre-sintetizado de los mensajes de recuperación y despedida que ya está en caché."""
+    cached = {text: load_greeting(text) for text in RECOVERY_PHRASES}
+    return {text: audio for text, audio in cached.items() if audio is not None}
+
+
+@dataclass(frozen=True)
+class RecoveryConfig:
+    """Cómo sobrevive una llamada a los despliegues y a los cortes de red.
+
+    - ``drain_timeout``: segundos que el worker, al recibir SIGTERM, deja terminar las
+      llamadas activas sin aceptar salas nuevas.
+    - ``max_retry`` y ``retry_interval``: reintentos de conexión con los modelos; el modelo
+      realtime se reconecta solo y reenvía instrucciones, herramientas y contexto.
+    - ``max_restarts``: veces que se vuelve a armar la sesión de agente, con el contexto
+      de la conversación, si se cierra por un error no recuperable.
+    """
+
+    drain_timeout: int = 600
+    max_retry: int = 5
+    retry_interval: float = 0.5
+    timeout: float = 10.0
+    max_restarts: int = 2
+
+    @classmethod
+    def from_env(cls) -> RecoveryConfig:
+        return cls(
+            drain_timeout=int(os.getenv("CAJICA_DRAIN_TIMEOUT", str(cls.drain_timeout))),
+            max_retry=int(os.getenv("CAJICA_MODEL_MAX_RETRY", str(cls.max_retry))),
+            retry_interval=float(os.getenv("CAJICA_MODEL_RETRY_INTERVAL", str(cls.retry_interval))),
+            max_restarts=int(os.getenv("CAJICA_SESSION_RESTARTS", str(cls.max_restarts))),
+        )
+
+    def conn_options(self) -> APIConnectOptions:
+        return APIConnectOptions(max_retry=self.max_retry, retry_interval=self.retry_interval, timeout=self.timeout)
+
+    def session_conn_options(self) -> SessionConnectOptions:
+        options = self.conn_options()
+        return SessionConnectOptions(stt_conn_options=options, llm_conn_options=options, tts_conn_options=options)
+
+
+class SessionSupervisor:
+    """Vuelve a armar la sesión de agente de una sala cuando se cierra por un error.
+
+    ``start`` crea, conecta e inicia una ``AgentSession`` a partir de un contexto de chat
+    (``None`` en la primera). Si la sesión se cierra con ``CloseReason.ERROR`` mientras el
+    ciudadano sigue en la sala, se inicia otra con el contexto de la anterior, hasta
+    ``max_restarts`` veces. Al apagar el proceso (fin del drenado) se despide del ciudadano
+    en lugar de cortar la llamada en silencio.
+
+    La sesión realtime no tiene TTS, así que los mensajes se dicen con el audio de
+    ``audio`` (ver ``load_recovery_audio``) y, si no está en caché, los lee el modelo.
+    """
+
+    def __init__(
+        self,
+        ctx: JobContext,
+        start: Callable[[llm.ChatContext | None], Awaitable[AgentSession]],
+        *,
+        max_restarts: int = 2,
+        farewell_timeout: float = 8.0,
+        audio: Mapping[str, CachedGreeting] | None = None,
+    ) -> None:
+        self._ctx = ctx
+        self._start = start
+        self._audio = dict(audio or {})
+        self.max_restarts = max_restarts
+        self.farewell_timeout = farewell_timeout
+        self.restarts = 0
+        self.session: AgentSession | None = None
+        self._restart_task: asyncio.Task[None] | None = None
+        self._shutting_down = False
+        ctx.add_shutdown_callback(self._on_shutdown)
+
+    async def start(self) -> AgentSession:
+        session = await self._start(None)
+        self._watch(session)
+        return session
+
+    def _watch(self, session: AgentSession) -> None:
+        self.session = session
+        session.on("close", lambda ev: self._on_close(session, ev))
+
+    def _citizen_present(self) -> bool:
+        room = self._ctx.room
+        return room.isconnected() and any(
+            p.kind != rtc.ParticipantKind.PARTICIPANT_KIND_AGENT for p in room.remote_participants.values()
+        )
+
+    def _on_close(self, session: AgentSession, ev: CloseEvent) -> None:
+        if ev.reason != CloseReason.ERROR or self._shutting_down or not self._citizen_present():
+            return
+        if self.restarts >= self.max_restarts:
+            logger.error(f"Sesión cerrada por error tras {self.restarts} reinicios: {ev.error}")
+            return
+        logger.warning(f"Sesión cerrada por error, reiniciando con el contexto de la conversación: {ev.error}")
+        self._restart_task = asyncio.create_task(self._restart(_conversation_ctx(session)))
+
+    async def _restart(self, chat_ctx: llm.ChatContext) -> None:
+        self.restarts += 1
+        await asyncio.sleep(min(0.5 * self.restarts, 2.0))
+        try:
+            session = await self._start(chat_ctx)
+            self._watch(session)
+            logger.info(
+                f"Sesión reiniciada ({self.restarts}/{self.max_restarts}), {len(chat_ctx.items)} ítems de contexto"
+            )
+            self._speak(session, RECOVERY_MESSAGE)
+        except Exception as e:
+            logger.error(f"No se pudo reiniciar la sesión: {e}", exc_info=True)
+
+    async def _on_shutdown(self) -> None:
+        self._shutting_down = True
+        if self._restart_task is not None:
+            self._restart_task.cancel()
+        session = self.session
+        if session is None or not self._citizen_present():
+            return
+        try:
+            handle = self._speak(session, DRAIN_MESSAGE)
+            await asyncio.wait_for(handle.wait_for_playout(), timeout=self.farewell_timeout)
+        except Exception as e:
+            logger.warning(f"No se pudo despedir al ciudadano antes de cerrar: {e}")
+
+    def _speak(self, session: AgentSession, text: str) -> SpeechHandle:
+        cached = self._audio.get(text)
+        if cached is not None:
+            return session.say(text, audio=cached.frames(), add_to_chat_ctx=False)
+        if session.tts is not None:
+            return session.say(text, add_to_chat_ctx=False)
+        return session.generate_reply(instructions=f"Di exactamente este texto sin cambios ni adiciones: '{text}'")
+
+
+def _conversation_ctx(session: AgentSession) -> llm.ChatContext:
+    # El contexto del agente ya viene compactado por ContextWindow; el historial completo
+    # queda como respaldo si la sesión no alcanzó a tener agente
+    try:
+        chat_ctx = session.current_agent.chat_ctx
+    except RuntimeError:
+        chat_ctx = session.history
+    return chat_ctx.copy(exclude_instructions=True, exclude_empty_message=True)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos del backend se ejecutan como scripts desde backend/, no como paquete
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,52 @@
+import json
+import sqlite3
+
+from analytics import analyze, iter_turns
+from indicators import load_indicators
+from knowledge import load_knowledge
+from transcripts import _SCHEMA
+
+
+def _write_events(path, events) -> None:
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    conn.executemany(
+        "INSERT INTO events (session_id, room, kind, created_at, data) VALUES (?, 'sala', ?, ?, ?)",
+        [(session, kind, at, json.dumps(data)) for at, (session, kind, data) in enumerate(events)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_turns_and_grounded_answers(tmp_path) -> None:
+    db = tmp_path / "transcripts.sqlite3"
+    tool = {
+        "name": "consultar_indicador",
+        "arguments": '{"codigo": "IR-1"}',
+        "output": "IR-1: meta 95%",
+        "is_error": False,
+    }
+    _write_events(
+        db,
+        [
+            ("s1", "message", {"role": "user", "text": "¿Cuál es la meta del IR-1?", "interrupted": False}),
+            ("s1", "tool", tool),
+            (
+                "s1",
+                "message",
+                {"role": "assistant", "text": "La meta es 95%.", "interrupted": False, "data_version": "v1"},
+            ),
+            ("s2", "message", {"role": "user", "text": "¿Y el presupuesto de la luna?", "interrupted": False}),
+            ("s2", "message", {"role": "assistant", "text": "No dispongo de esa cifra.", "interrupted": False}),
+        ],
+    )
+
+    turns = list(iter_turns(db, chunk_size=2))
+    assert [session for session, _ in turns] == ["s1", "s2"]
+    assert turns[0][1].grounded and not turns[1][1].answered
+
+    report = analyze(db, indicators=load_indicators(), knowledge=load_knowledge(cache_dir=tmp_path / "index"))
+    assert (report.sessions, report.questions, report.unanswered_questions) == (2, 2, 1)
+    assert report.precomputed_answers == [
+        {"question": "¿Cuál es la meta del IR-1?", "answer": "La meta es 95%.", "data_version": "v1", "count": 1}
+    ]
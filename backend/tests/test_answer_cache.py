@@ -0,0 +1,69 @@
+import pytest
+
+from answer_cache import AnswerCache
+from indicators import load_indicators
+
+
+@pytest.fixture
+def cache(tmp_path) -> AnswerCache:
+    cache = AnswerCache(tmp_path / "answers.sqlite3")
+    cache.set_data_version("v1", load_indicators().sector_terms)
+    return cache
+
+
+def test_equivalent_question_hits(cache: AnswerCache) -> None:
+    cache.store("¿Cuál es el avance del sector educación?", "El sector Educación tiene un avance del 58%.")
+    assert cache.lookup("cual es el avance del sector de educacion") == "El sector Educación tiene un avance del 58%."
+
+
+@pytest.mark.parametrize(
+    ("stored", "asked"),
+    [
+        # Ambas superan el umbral de similitud: solo cambia la entidad
+        (
+            "¿Cuál es el porcentaje de avance del sector educación en el plan de desarrollo municipal?",
+            "¿Cuál es el porcentaje de avance del sector salud en el plan de desarrollo municipal?",
+        ),
+        (
+            "¿Cuál es la meta del indicador de resultado IR-12 del plan de desarrollo?",
+            "¿Cuál es la meta del indicador de resultado IR-14 del plan de desarrollo?",
+        ),
+        ("¿Cuál es la meta del indicador IR-12?", "¿Cuál es la meta del indicador IR 12 para 2027?"),
+        ("¿Qué programas tiene el sector 5?", "¿Qué programas tiene el sector 13?"),
+    ],
+)
+def test_different_entities_never_hit(cache: AnswerCache, stored: str, asked: str) -> None:
+    assert cache.store(stored, "respuesta con cifras")
+    assert cache.lookup(asked) is None
+
+
+def test_shared_between_processes_and_scoped_to_data_version(cache: AnswerCache, tmp_path) -> None:
+    cache.store("¿Cuál es la meta del indicador IR-12?", "La meta del IR-12 es 95%.")
+    other = AnswerCache(tmp_path / "answers.sqlite3")
+    other.set_data_version("v1", cache.entity_terms)
+    assert other.lookup("cual es la meta del indicador IR 12") == "La meta del IR-12 es 95%."
+    other.set_data_version("v2", cache.entity_terms)
+    assert other.lookup("cual es la meta del indicador IR 12") is None
+
+
+def test_capacity_drops_least_recently_used(tmp_path) -> None:
+    cache = AnswerCache(tmp_path / "answers.sqlite3", capacity=2)
+    cache.set_data_version("v1")
+    for n in (1, 2, 3):
+        assert cache.store(f"meta del indicador IR-{n}", f"respuesta {n}")
+    assert len(cache) == 2
+    assert cache.lookup("meta del indicador IR-1") is None
+    assert cache.stats.evictions == 1
+
+
+def test_seed_skips_answers_from_other_data_versions(tmp_path) -> None:
+    cache = AnswerCache(tmp_path / "answers.sqlite3")
+    cache._seed = [
+        {"question": "¿Cuál es el avance del sector educación?", "answer": "58%", "data_version": "v1"},
+        {"question": "¿Cuál es el avance del sector salud?", "answer": "40%", "data_version": "v2"},
+        {"question": "¿Cuál es la población del municipio?", "answer": "90.000"},
+    ]
+    cache.set_data_version("v2", load_indicators().sector_terms)
+    assert len(cache) == 1
+    assert cache.lookup("¿Cuál es el avance del sector salud?") == "40%"
+    assert cache.lookup("¿Cuál es el avance del sector educación?") is None
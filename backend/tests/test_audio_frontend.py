@@ -0,0 +1,28 @@
+import asyncio
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad
+
+from audio_frontend import AudioFrontend, AudioFrontendConfig
+from turn_detection import TURN_PROFILES
+
+
+def test_flush_before_audio_and_silence() -> None:
+    async def run() -> list[vad.VADEvent]:
+        frontend = AudioFrontend(AudioFrontendConfig(workers=1, batch_ms=64))
+        stream = frontend.vad(TURN_PROFILES["default"]).stream()
+        # Un flush antes del primer cuadro no tiene detector ni lote que procesar
+        stream.flush()
+        silence = np.zeros(480, dtype=np.int16).tobytes()
+        for _ in range(20):
+            stream.push_frame(rtc.AudioFrame(silence, sample_rate=48000, num_channels=1, samples_per_channel=480))
+        stream.flush()
+        stream.end_input()
+        events = [event async for event in stream]
+        frontend.executor.shutdown()
+        return events
+
+    events = asyncio.run(run())
+    assert events
+    assert {event.type for event in events} == {vad.VADEventType.INFERENCE_DONE}
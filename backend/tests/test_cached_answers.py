@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any
+
+from livekit.agents import llm
+
+from agent import CachedAnswersAgent
+
+
+class _Cache:
+    def __init__(self) -> None:
+        self.lookups: list[str] = []
+
+    def lookup(self, question: str) -> None:
+        self.lookups.append(question)
+
+
+def _turn(ctx: llm.ChatContext, question: str) -> tuple[CachedAnswersAgent, _Cache]:
+    cache = _Cache()
+    answer_cache: Any = cache
+    agent = CachedAnswersAgent(instructions="Asistente de prueba", answer_cache=answer_cache)
+    message = llm.ChatMessage(role="user", content=[question])
+    asyncio.run(agent.on_user_turn_completed(ctx, new_message=message))
+    return agent, cache
+
+
+def test_first_question_uses_the_cache() -> None:
+    ctx = llm.ChatContext.empty()
+    ctx.add_message(role="assistant", content="¡Hola! ¿En qué puedo ayudarte?")
+    agent, cache = _turn(ctx, "¿Cuál es el horario de la alcaldía?")
+    assert cache.lookups == ["¿Cuál es el horario de la alcaldía?"]
+    assert agent._pending_question == "¿Cuál es el horario de la alcaldía?"
+
+
+def test_follow_up_skips_the_cache() -> None:
+    ctx = llm.ChatContext.empty()
+    ctx.add_message(role="user", content="¿Dónde queda la casa de la cultura?")
+    ctx.add_message(role="assistant", content="En el centro, frente al parque principal.")
+    agent, cache = _turn(ctx, "¿Y su horario?")
+    assert cache.lookups == []
+    assert agent._pending_question is None
+
+
+def test_summarized_conversation_skips_the_cache() -> None:
+    ctx = llm.ChatContext.empty()
+    ctx.add_message(role="assistant", content="Resumen: preguntó por la casa de la cultura.", extra={"is_summary": True})
+    _, cache = _turn(ctx, "¿Y su horario?")
+    assert cache.lookups == []
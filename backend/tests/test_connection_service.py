@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from connection_service import CLIENT_IP_HEADER, ConnectionService, RateLimiter, client_address, parse_networks
+
+TRUSTED = parse_networks("127.0.0.1,::1,10.0.0.0/8")
+
+
+@pytest.mark.parametrize(
+    ("remote", "headers", "expected"),
+    [
+        # Ruta de Next.js en la misma máquina: una sola IP verificada
+        ("127.0.0.1", {CLIENT_IP_HEADER: "181.50.1.2"}, "181.50.1.2"),
+        # Sin encabezado dedicado: el salto más a la derecha que no es un proxy de confianza
+        ("127.0.0.1", {"X-Forwarded-For": "1.1.1.1, 181.50.1.2, 10.0.0.7"}, "181.50.1.2"),
+        # Un cliente directo no puede elegir su IP con encabezados
+        ("200.1.1.1", {CLIENT_IP_HEADER: "1.1.1.1", "X-Forwarded-For": "1.1.1.1"}, "200.1.1.1"),
+        # Un proxy de confianza que no informa una IP válida: no hay cliente verificado
+        ("127.0.0.1", {CLIENT_IP_HEADER: "no-es-una-ip"}, None),
+        ("127.0.0.1", {}, None),
+        ("127.0.0.1", {"X-Forwarded-For": "10.0.0.7"}, None),
+    ],
+)
+def test_client_address(remote: str, headers: dict[str, str], expected: str | None) -> None:
+    assert client_address(remote, headers, TRUSTED) == expected
+
+
+def test_spoofed_forwarded_for_shares_the_real_bucket() -> None:
+    limiter = RateLimiter(rate=0, burst=2)
+    clients = [client_address("127.0.0.1", {"X-Forwarded-For": f"6.6.6.{n}, 181.50.1.2"}, TRUSTED) for n in range(5)]
+    assert clients == ["181.50.1.2"] * 5
+    assert [limiter.allow(client) for client in clients if client] == [True, True, False, False, False]
+    # Otro ciudadano detrás de la misma ruta tiene su propia cubeta
+    assert limiter.allow("181.50.9.9")
+
+
+class _Allocator:
+    async def allocate(self) -> str:
+        return "cajica-sala"
+
+
+def _request(remote: str, headers: dict[str, str]) -> Any:
+    request = make_mocked_request("GET", "/connection-details", headers=headers)
+    # make_mocked_request no deja elegir la dirección remota
+    return request.clone(remote=remote)
+
+
+def test_requests_without_verified_ip_skip_the_per_client_limit() -> None:
+    allocator: Any = _Allocator()
+    service = ConnectionService(
+        allocator,
+        RateLimiter(rate=0, burst=1),
+        server_url="wss://livekit.test",
+        api_key="key",
+        api_secret="secret" * 8,
+        trusted_proxies=TRUSTED,
+    )
+
+    async def statuses(remote: str, headers: dict[str, str]) -> list[int]:
+        return [(await service.connection_details(_request(remote, headers))).status for _ in range(3)]
+
+    # La ruta no pudo determinar la IP: no se mete a toda la ciudad en la cubeta del proxy
+    assert asyncio.run(statuses("127.0.0.1", {})) == [200, 200, 200]
+    # Con IP verificada se sigue limitando por cliente
+    assert asyncio.run(statuses("127.0.0.1", {CLIENT_IP_HEADER: "181.50.1.2"})) == [200, 429, 429]
@@ -0,0 +1,8 @@
+import importlib
+
+import pytest
+
+
+@pytest.mark.parametrize("module", ["agent", "bench", "session_recovery"])
+def test_module_imports(module: str) -> None:
+    importlib.import_module(module)
@@ -0,0 +1,32 @@
+import pytest
+
+from knowledge import KnowledgeIndex, Passage, tokenize
+
+
+@pytest.mark.parametrize(
+    ("singular", "plural"),
+    [
+        ("parque", "parques"),
+        ("estudiante", "estudiantes"),
+        ("calle", "calles"),
+        ("deporte", "deportes"),
+        ("sede", "sedes"),
+        ("sector", "sectores"),
+        ("ciudad", "ciudades"),
+    ],
+)
+def test_singular_and_plural_share_a_stem(singular: str, plural: str) -> None:
+    assert tokenize(singular) == tokenize(plural)
+
+
+def test_singular_query_finds_plural_passage() -> None:
+    index = KnowledgeIndex(
+        [
+            Passage("Recreación", "Los parques y escenarios deportivos del municipio abren de 6 a 18."),
+            Passage("Movilidad", "Pavimentación de vías rurales y semaforización del centro."),
+            Passage("Educación", "Las sedes educativas reciben a los estudiantes de primaria."),
+        ]
+    )
+    assert index.search("horario del parque", k=1)[0][0].title == "Recreación"
+    assert index.search("en qué sede estudia un estudiante", k=1)[0][0].title == "Educación"
+
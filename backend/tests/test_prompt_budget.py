@@ -0,0 +1,16 @@
+import sys
+import types
+
+import prompt_budget
+
+
+def test_count_tokens_falls_back_when_the_encoding_cannot_load(monkeypatch) -> None:
+    def get_encoding(name: str):
+        raise ConnectionError("sin red")
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+    prompt_budget._encoding.cache_clear()
+    try:
+        assert prompt_budget.count_tokens("a" * 40) == 10
+    finally:
+        prompt_budget._encoding.cache_clear()
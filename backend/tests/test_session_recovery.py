@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import pytest
+from livekit import rtc
+from livekit.agents import Agent, AgentSession, llm
+
+from bench import BenchAudioOutput, FakeRealtimeModel
+from greeting import SAMPLE_RATE, CachedGreeting
+from session_recovery import DRAIN_MESSAGE, RECOVERY_MESSAGE, SessionSupervisor
+
+
+def _ctx() -> Any:
+    citizen = SimpleNamespace(kind=rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD)
+    room = SimpleNamespace(isconnected=lambda: True, remote_participants={"ciudadano": citizen})
+    return SimpleNamespace(room=room, add_shutdown_callback=lambda callback: None)
+
+
+async def _start_session(audio_out: BenchAudioOutput) -> AgentSession:
+    session = AgentSession(llm=FakeRealtimeModel(ttft=0.01, reply_seconds=0.2, stream_speed=20.0))
+    session.output.audio = audio_out
+    await session.start(agent=Agent(instructions="Asistente de prueba"))
+    return session
+
+
+def _cached(tmp_path, text: str) -> CachedGreeting:
+    path = tmp_path / "mensaje.pcm"
+    np.zeros(SAMPLE_RATE // 5, dtype=np.int16).tofile(path)
+    return CachedGreeting(text, path)
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_restart_speaks_recovery_message(tmp_path, caplog, cached: bool) -> None:
+    audio = {RECOVERY_MESSAGE: _cached(tmp_path, RECOVERY_MESSAGE)} if cached else {}
+
+    async def run() -> None:
+        audio_out = BenchAudioOutput()
+        sessions: list[AgentSession] = []
+
+        async def start(chat_ctx: Any) -> AgentSession:
+            sessions.append(await _start_session(audio_out))
+            return sessions[-1]
+
+        supervisor = SessionSupervisor(_ctx(), start, audio=audio)
+        first_frame = audio_out.expect_reply()
+        await supervisor._restart(llm.ChatContext.empty())
+        await asyncio.wait_for(first_frame, timeout=5)
+        await sessions[0].aclose()
+
+    with caplog.at_level(logging.WARNING, logger="cajica-assistant"):
+        asyncio.run(run())
+    assert not [r for r in caplog.records if r.name == "cajica-assistant" and r.levelno >= logging.ERROR]
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_shutdown_speaks_farewell(tmp_path, caplog, cached: bool) -> None:
+    audio = {DRAIN_MESSAGE: _cached(tmp_path, DRAIN_MESSAGE)} if cached else {}
+
+    async def run() -> None:
+        audio_out = BenchAudioOutput()
+        session = await _start_session(audio_out)
+
+        async def start(chat_ctx: Any) -> AgentSession:
+            return session
+
+        supervisor = SessionSupervisor(_ctx(), start, audio=audio, farewell_timeout=5)
+        await supervisor.start()
+        first_frame = audio_out.expect_reply()
+        await supervisor._on_shutdown()
+        assert first_frame.done()
+        await session.aclose()
+
+    with caplog.at_level(logging.WARNING, logger="cajica-assistant"):
+        asyncio.run(run())
+    # Sin el aviso de que no se pudo despedir al ciudadano
+    assert not [r for r in caplog.records if r.name == "cajica-assistant"]
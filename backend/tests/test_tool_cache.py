@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from tool_cache import ToolCache
+
+
+class Tool:
+    def __init__(self, result: str = "resultado") -> None:
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.result
+
+
+def test_disabled_by_default(monkeypatch) -> None:
+    monkeypatch.delenv("CAJICA_TOOL_CACHE", raising=False)
+    assert ToolCache.from_env() is None
+    monkeypatch.setenv("CAJICA_TOOL_CACHE", "1")
+    assert ToolCache.from_env() is not None
+
+
+@pytest.mark.parametrize(
+    ("tool", "args", "version"),
+    [
+        ("avance_sector", ("educación",), "v1"),
+        ("consultar_indicador", ("salud",), "v1"),
+        ("avance_sector", ("salud",), "v2"),
+    ],
+)
+def test_key_includes_tool_args_and_data_version(tool: str, args: tuple[str, ...], version: str) -> None:
+    cache = ToolCache()
+    cache.set_data_version("v1")
+    asyncio.run(cache.get_or_call("avance_sector", ("salud",), "v1", Tool("salud v1")))
+    assert asyncio.run(cache.get_or_call(tool, args, version, Tool("otro"))) == "otro"
+
+
+def test_concurrent_identical_calls_are_coalesced() -> None:
+    cache = ToolCache()
+    cache.set_data_version("v1")
+    tool = Tool()
+
+    async def run() -> list[str]:
+        return await asyncio.gather(*(cache.get_or_call("buscar_informacion", ("agua",), "v1", tool) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["resultado"] * 5
+    assert asyncio.run(cache.get_or_call("buscar_informacion", ("agua",), "v1", tool)) == "resultado"
+    assert tool.calls == 1
+    assert (cache.stats.coalesced, cache.stats.hits) == (4, 1)
+
+
+def test_new_data_version_drops_old_results() -> None:
+    cache = ToolCache()
+    cache.set_data_version("v1")
+    asyncio.run(cache.get_or_call("avance_sector", ("salud",), "v1", Tool()))
+    cache.set_data_version("v2")
+    assert len(cache) == 0
+    assert cache.stats.invalidations == 1
+
+
+def test_failures_are_not_cached() -> None:
+    cache = ToolCache()
+    cache.set_data_version("v1")
+
+    async def fail() -> str:
+        raise RuntimeError("sin datos")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_call("avance_sector", ("salud",), "v1", fail))
+    assert len(cache) == 0
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from transcript_stream import _MAX_PACKET_BYTES, TranscriptStream, _packets
+
+
+class Participant:
+    def __init__(self, fail_first: int = 0) -> None:
+        self.fail_first = fail_first
+        self.payloads: list[bytes] = []
+
+    async def publish_data(self, payload: bytes, **kwargs) -> None:
+        if self.fail_first:
+            self.fail_first -= 1
+            raise ConnectionError("canal de datos caído")
+        self.payloads.append(payload)
+
+
+class Room:
+    def __init__(self, participant: Participant) -> None:
+        self.local_participant = participant
+
+    def isconnected(self) -> bool:
+        return True
+
+
+def _deltas(payloads: list[bytes]) -> list[dict]:
+    return [delta for payload in payloads for delta in json.loads(payload)["deltas"]]
+
+
+def test_assistant_text_is_one_message_per_reply_finished_on_flush() -> None:
+    stream = TranscriptStream()
+    output = stream.text_output()
+
+    async def reply() -> None:
+        await output.capture_text("Hola, ")
+        await output.capture_text("¿en qué")
+        # Interrumpida: la sesión deja de entregar palabras y cierra el segmento
+        output.flush()
+        await output.capture_text("Otra respuesta")
+
+    asyncio.run(reply())
+    first, second = stream._take_deltas()
+    assert (first["text"], first.get("final")) == ("Hola, ¿en qué", True)
+    assert first["id"] != second["id"]
+    assert "final" not in second
+
+
+def test_oversized_delta_is_split_into_parts_with_the_same_seq() -> None:
+    text = "ñ" * 20000
+    deltas = [
+        {"seq": 7, "id": "a1", "role": "assistant", "text": text, "replace": True, "final": True},
+        {"seq": 8, "id": "u2", "role": "user", "text": "hola"},
+    ]
+    packets = _packets(deltas)
+    assert len(packets) > 1
+    assert all(len(packet) <= _MAX_PACKET_BYTES for packet in packets)
+
+    parts = [d for d in _deltas(packets) if d["id"] == "a1"]
+    assert "".join(p["text"] for p in parts) == text
+    assert {p["seq"] for p in parts} == {7}
+    assert [p.get("part", 0) for p in parts] == list(range(len(parts)))
+    assert [p.get("replace") for p in parts] == [True] + [None] * (len(parts) - 1)
+    assert [p.get("more") for p in parts] == [True] * (len(parts) - 1) + [None]
+    assert [p.get("final") for p in parts] == [None] * (len(parts) - 1) + [True]
+    assert _deltas(packets)[-1]["id"] == "u2"
+
+
+def test_failed_packet_does_not_drop_the_following_ones() -> None:
+    participant = Participant(fail_first=1)
+    stream = TranscriptStream()
+    stream._room = Room(participant)  # type: ignore[assignment]
+    deltas = [{"seq": i, "id": f"a{i}", "role": "assistant", "text": "x" * 5000} for i in range(1, 6)]
+
+    asyncio.run(stream._publish(deltas))
+    packets = _packets(deltas)
+    assert len(packets) > 2
+    assert participant.payloads == packets[1:]
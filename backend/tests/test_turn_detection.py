@@ -0,0 +1,19 @@
+import pytest
+
+from turn_detection import TURN_PROFILES, TurnConfig
+
+
+def test_eou_model_is_opt_in(monkeypatch) -> None:
+    monkeypatch.delenv("CAJICA_EOU_MODEL", raising=False)
+    assert TurnConfig().eou_model is False
+    assert TurnConfig.from_env().eou_model is False
+    monkeypatch.setenv("CAJICA_EOU_MODEL", "1")
+    assert TurnConfig.from_env().eou_model is True
+
+
+@pytest.mark.parametrize("name", list(TURN_PROFILES))
+def test_profiles_close_turns_on_vad_by_default(name: str) -> None:
+    handling = TurnConfig(profile=TURN_PROFILES[name]).turn_handling()
+    assert handling["turn_detection"] == "vad"
+    assert handling["endpointing"]["min_delay"] == TURN_PROFILES[name].min_endpointing_delay
+    assert TurnConfig(profile=TURN_PROFILES[name]).realtime_turn_detection().type == "server_vad"
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from livekit import rtc
+
+from worker_load import WorkerLoad
+
+
+class Server(rtc.EventEmitter):
+    # Lo único que la función de carga lee de AgentServer
+    active_jobs: list[object] = []
+
+
+def test_loop_lag_comes_from_the_worker_loop() -> None:
+    async def main() -> tuple[float, float]:
+        loop = asyncio.get_running_loop()
+        load = WorkerLoad(max_sessions=4, lag_budget=0.2, window=1, lag_interval=0.02)
+        worker: Any = Server()
+        load.attach(worker)
+        # Como AgentServer.run: el evento se emite en el loop del worker
+        worker.emit("worker_started")
+        # Como el worker: la función de carga corre en un hilo del executor
+        await loop.run_in_executor(None, load, worker)
+        await asyncio.sleep(0.1)
+        idle = await loop.run_in_executor(None, load, worker)
+        time.sleep(0.15)  # bloquea el loop
+        await asyncio.sleep(0.05)
+        busy = await loop.run_in_executor(None, load, worker)
+        return idle, busy
+
+    idle, busy = asyncio.run(main())
+    assert idle < 0.5
+    assert busy >= 0.5
+
+
+def test_tiering_reads_the_reported_load(tmp_path, monkeypatch) -> None:
+    from tiering import sample_worker_load
+    from worker_load import SNAPSHOT_ENV
+
+    path = tmp_path / "load.json"
+    monkeypatch.setenv(SNAPSHOT_ENV, str(path))
+    load = WorkerLoad(max_sessions=2, snapshot_path=str(path))
+    worker: Any = SimpleNamespace(active_jobs=[object()])
+    reported = load(worker)
+    assert reported == 0.5
+    assert asyncio.run(sample_worker_load()) == reported
+
+
+def test_close_removes_the_snapshot(tmp_path) -> None:
+    path = tmp_path / "load.json"
+    load = WorkerLoad(max_sessions=2, snapshot_path=str(path))
+    load(SimpleNamespace(active_jobs=[]))  # type: ignore[arg-type]
+    assert path.exists()
+    load.close()
+    assert not path.exists()
+    load.close()
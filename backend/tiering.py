@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from enum import Enum
+
+from livekit.agents.utils.hw import get_cpu_monitor
+
+from worker_load import read_snapshot
+
+logger = logging.getLogger("cajica-assistant")
+
+
+class PromptTier(str, Enum):
+    FULL = "full"
+    LITE = "lite"
+    ADAPTIVE = "adaptive"
+
+
+@dataclass(frozen=True)
+class TierDecision:
+    start_lite: bool
+    allow_escalation: bool
+    reason: str
+
+
+@dataclass(frozen=True)
+class TieringPolicy:
+    """Elige con qué agente arranca cada sesión.
+
+    - ``full``: siempre el asistente completo.
+    - ``lite``: siempre el asistente ligero, sin escalamiento.
+    - ``adaptive``: arranca en el ligero y escala al completo con un handoff cuando la
+      conversación necesita datos oficiales.
+
+    Con la carga del worker por encima de ``capacity_threshold`` toda sesión nueva
+    arranca en el ligero y sin escalamiento.
+    """
+
+    tier: PromptTier = PromptTier.ADAPTIVE
+    capacity_threshold: float = 0.8
+
+    @classmethod
+    def from_env(cls) -> TieringPolicy:
+        raw_tier = os.getenv("CAJICA_PROMPT_TIER", PromptTier.ADAPTIVE.value).strip().lower()
+        try:
+            tier = PromptTier(raw_tier)
+        except ValueError:
+            logger.warning(f"CAJICA_PROMPT_TIER inválido '{raw_tier}', usando '{PromptTier.ADAPTIVE.value}'")
+            tier = PromptTier.ADAPTIVE
+        threshold = float(os.getenv("CAJICA_LITE_LOAD_THRESHOLD", "0.8"))
+        return cls(tier=tier, capacity_threshold=threshold)
+
+    def decide(self, load: float) -> TierDecision:
+        if load >= self.capacity_threshold:
+            return TierDecision(start_lite=True, allow_escalation=False, reason=f"carga {load:.2f}")
+        if self.tier is PromptTier.FULL:
+            return TierDecision(start_lite=False, allow_escalation=False, reason="política full")
+        if self.tier is PromptTier.LITE:
+            return TierDecision(start_lite=True, allow_escalation=False, reason="política lite")
+        return TierDecision(start_lite=True, allow_escalation=True, reason="política adaptive")
+
+
+async def sample_worker_load(interval: float = 0.25) -> float:
+    """Carga del worker (0-1): la misma que ``WorkerLoad`` reporta a LiveKit.
+
+    Sin una medición reciente del worker (``bench.py``, o un proceso lanzado sin
+    ``WorkerLoad``) se usa el uso de CPU de la máquina, medido en un hilo para no
+    bloquear el loop.
+    """
+    snapshot = await asyncio.to_thread(read_snapshot)
+    if snapshot is not None:
+        return snapshot.load
+    return await asyncio.to_thread(get_cpu_monitor().cpu_percent, interval)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Mapping
+from dataclasses import dataclass
+
+from prometheus_client import Counter
+
+logger = logging.getLogger("cajica-assistant")
+
+TOOL_CACHE_LOOKUPS = Counter(
+    "cajica_tool_cache_lookups", "Llamadas a herramientas según la caché de resultados", ["tool", "result"]
+)
+
+# Las búsquedas en texto libre tienen una cola larga de variantes; los indicadores y
+# sectores son pocos y solo cambian con los datos
+DEFAULT_TTLS: Mapping[str, float] = {
+    "buscar_informacion": 3600,
+    "consultar_indicador": 6 * 3600,
+    "avance_sector": 6 * 3600,
+}
+
+# (herramienta, versión de los datos, argumentos)
+_Key = tuple[str, str | None, tuple[Hashable, ...]]
+
+
+@dataclass
+class ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+
+class ToolCache:
+    """Resultados de las herramientas del agente, compartidos por las sesiones del proceso.
+
+    La clave es la herramienta, la versión de los datos municipales con la que trabaja la
+    sesión y los argumentos exactos, así que una sesión nunca recibe un resultado de otra
+    versión. Al aparecer una versión nueva se descartan las entradas de las anteriores.
+    Cada herramienta tiene su TTL; con la caché llena se desaloja la menos usada
+    recientemente. Las llamadas idénticas concurrentes esperan a la que ya está en curso.
+
+    Está desactivada por defecto (``CAJICA_TOOL_CACHE``): las herramientas actuales son
+    consultas en memoria de unos microsegundos y la caché solo compensa para herramientas
+    que tarden más que su propia contabilidad, como las que consultan servicios externos.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int = 1024,
+        ttls: Mapping[str, float] = DEFAULT_TTLS,
+        default_ttl: float = 3600,
+    ) -> None:
+        self.capacity = capacity
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.stats = ToolCacheStats()
+        self.data_version: str | None = None
+        self._entries: OrderedDict[_Key, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[_Key, asyncio.Future[str]] = {}
+
+    @classmethod
+    def from_env(cls) -> ToolCache | None:
+        """``CAJICA_TOOL_CACHE_TTLS`` ajusta TTLs por herramienta, por ejemplo ``avance_sector=600``."""
+        if os.getenv("CAJICA_TOOL_CACHE", "0").strip().lower() not in ("1", "true", "yes"):
+            return None
+        ttls = dict(DEFAULT_TTLS)
+        for item in os.getenv("CAJICA_TOOL_CACHE_TTLS", "").split(","):
+            name, _, seconds = item.partition("=")
+            if not name.strip():
+                continue
+            try:
+                ttls[name.strip()] = float(seconds)
+            except ValueError:
+                logger.warning(f"TTL inválido en CAJICA_TOOL_CACHE_TTLS: '{item}'")
+        return cls(capacity=int(os.getenv("CAJICA_TOOL_CACHE_SIZE", "1024")), ttls=ttls)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_data_version(self, version: str) -> None:
+        if version == self.data_version:
+            return
+        if self.data_version is not None:
+            stale = [key for key in self._entries if key[1] != version]
+            for key in stale:
+                del self._entries[key]
+            self.stats.invalidations += len(stale)
+        self.data_version = version
+
+    def _lookup(self, key: _Key) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: _Key, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttls.get(key[0], self.default_ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def get_or_call(
+        self,
+        tool: str,
+        args: tuple[Hashable, ...],
+        version: str | None,
+        call: Callable[[], Awaitable[str]],
+    ) -> str:
+        """Resultado en caché de ``tool(*args)`` o, si no lo hay, el de ``call()``.
+
+        Si falla, no se guarda nada y el error llega también a las llamadas que esperaban.
+        """
+        key: _Key = (tool, version, args)
+        value = self._lookup(key)
+        if value is not None:
+            self.stats.hits += 1
+            TOOL_CACHE_LOOKUPS.labels(tool, "hit").inc()
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is asyncio.get_running_loop():
+            self.stats.coalesced += 1
+            TOOL_CACHE_LOOKUPS.labels(tool, "coalesced").inc()
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            # Se canceló la llamada en curso (por ejemplo, su sesión interrumpió la respuesta)
+            return await self.get_or_call(tool, args, version, call)
+
+        self.stats.misses += 1
+        TOOL_CACHE_LOOKUPS.labels(tool, "miss").inc()
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Si nadie más esperaba, evita el aviso de excepción no recuperada
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if version is None or version == self.data_version:
+                self._store(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def log_stats(self) -> None:
+        s = self.stats
+        logger.info(
+            f"Caché de herramientas: {s.hits} aciertos, {s.coalesced} unidas a una llamada en curso,"
+            f" {s.misses} fallos (tasa {s.hit_rate:.1%}), {len(self)}/{self.capacity} entradas,"
+            f" {s.evictions} desalojos, {s.expirations} expiradas, {s.invalidations} invalidadas"
+        )
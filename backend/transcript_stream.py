@@ -0,0 +1,299 @@
+"""Transcripción en vivo hacia el frontend por el canal de datos de LiveKit.
+
+Cada cambio del texto de un mensaje (una transcripción parcial del ciudadano, un
+fragmento de la respuesta del asistente) es un delta numerado con ``seq``. Los deltas se
+agrupan cada ``interval`` segundos y se publican como un solo paquete JSON en el tema
+``cajica.transcript``::
+
+    {"type": "transcript_batch", "deltas": [
+        {"seq": 41, "id": "a7", "role": "assistant", "text": " la cobertura"},
+        {"seq": 42, "id": "u8", "role": "user", "text": "y el acueduc", "replace": true},
+    ]}
+
+Un delta sin ``replace`` se agrega al final del texto del mensaje; con ``replace`` lo
+reemplaza; ``final`` indica que el mensaje ya no cambia. Un cliente que se reconecta o
+detecta un hueco en ``seq`` publica ``{"since": <último seq aplicado>}`` en
+``cajica.transcript.resume`` y recibe, solo él, el texto completo de los mensajes que
+cambiaron después, en paquetes marcados con ``"resume": true`` (sus ``seq`` no son
+consecutivos).
+
+Un delta que no cabe en un paquete se parte en trozos con el mismo ``seq``: los trozos
+siguientes al primero llevan ``"part": <n>`` y todos menos el último, ``"more": true``.
+Solo el primero puede llevar ``replace`` y solo el último, ``final``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from livekit import rtc
+from livekit.agents import AgentSession, UserInputTranscribedEvent
+from livekit.agents.voice import io
+
+logger = logging.getLogger("cajica-assistant")
+
+TOPIC = "cajica.transcript"
+RESUME_TOPIC = "cajica.transcript.resume"
+
+# Por debajo del límite de ~15 KB de un paquete confiable de LiveKit
+_MAX_PACKET_BYTES = 12000
+# Un carácter ocupa hasta 6 bytes en JSON (\uXXXX), así que un trozo siempre cabe
+_MAX_PART_CHARS = 1500
+
+
+@dataclass
+class _Message:
+    id: str
+    role: str
+    text: str = ""
+    final: bool = False
+    # Lo último que recibieron los clientes, para reenviarlo al reanudar
+    seq: int = 0
+    sent_text: str = ""
+    sent_final: bool = False
+
+
+class TranscriptStream:
+    """Publica la transcripción de una sala como deltas numerados y agrupados.
+
+    Se crea una vez por sala y sobrevive a los reinicios de la sesión de agente, así que
+    ``seq`` no vuelve a empezar. El texto del ciudadano llega con ``attach`` (eventos
+    ``user_input_transcribed``); el del asistente, con ``text_output`` al ritmo en que se
+    reproduce el audio. Guarda los últimos ``max_messages`` mensajes para atender
+    las solicitudes de reanudación.
+    """
+
+    def __init__(self, *, interval: float = 0.04, max_messages: int = 200) -> None:
+        self.interval = interval
+        self.max_messages = max_messages
+        self.seq = 0
+        self._messages: OrderedDict[str, _Message] = OrderedDict()
+        # id del mensaje -> desde qué carácter publicar (None: el texto completo)
+        self._pending: dict[str, int | None] = {}
+        self._counter = 0
+        self._user_message: _Message | None = None
+        self._room: rtc.Room | None = None
+        self._dirty = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._resume_tasks: set[asyncio.Task[None]] = set()
+
+    @classmethod
+    def from_env(cls) -> TranscriptStream | None:
+        """``CAJICA_TRANSCRIPT_STREAM_INTERVAL_MS=0`` desactiva la transcripción en vivo."""
+        interval_ms = float(os.getenv("CAJICA_TRANSCRIPT_STREAM_INTERVAL_MS", "40"))
+        if interval_ms <= 0:
+            return None
+        return cls(interval=interval_ms / 1000)
+
+    def start(self, room: rtc.Room) -> None:
+        if self._task is None:
+            self._room = room
+            room.on("data_received", self._on_data_received)
+            self._task = asyncio.create_task(self._run())
+
+    def attach(self, session: AgentSession) -> None:
+        session.on("user_input_transcribed", self._on_user_transcribed)
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self.flush()
+        if self._room is not None:
+            self._room.off("data_received", self._on_data_received)
+
+    def _new_message(self, role: str) -> _Message:
+        self._counter += 1
+        message = _Message(id=f"{role[0]}{self._counter}", role=role)
+        self._messages[message.id] = message
+        while len(self._messages) > self.max_messages:
+            evicted, _ = self._messages.popitem(last=False)
+            self._pending.pop(evicted, None)
+        return message
+
+    def _changed(self, message: _Message, offset: int | None) -> None:
+        if message.id in self._pending:
+            # Un reemplazo pendiente absorbe cualquier cambio posterior
+            if self._pending[message.id] is None or offset is None:
+                self._pending[message.id] = None
+        else:
+            self._pending[message.id] = offset
+        self._dirty.set()
+
+    def _append(self, message: _Message, text: str) -> None:
+        if text:
+            offset = len(message.text)
+            message.text += text
+            self._changed(message, offset)
+
+    def _finish(self, message: _Message) -> None:
+        if not message.final:
+            message.final = True
+            self._changed(message, len(message.text))
+
+    def _on_user_transcribed(self, ev: UserInputTranscribedEvent) -> None:
+        message = self._user_message
+        if message is None or message.id not in self._messages:
+            message = self._user_message = self._new_message("user")
+        # Cada transcripción parcial trae el texto completo del turno hasta el momento
+        if ev.transcript != message.text:
+            message.text = ev.transcript
+            self._changed(message, None)
+        if ev.is_final:
+            self._finish(message)
+            self._user_message = None
+
+    def text_output(self) -> io.TextOutput:
+        """Salida de texto para ``TextOutputOptions(next_in_chain=...)`` de la sesión.
+
+        La sesión le entrega las palabras del asistente a medida que se dicen, así que una
+        respuesta interrumpida solo publica lo que alcanzó a sonar.
+        """
+        return _AssistantTextOutput(self)
+
+    async def _run(self) -> None:
+        while True:
+            await self._dirty.wait()
+            # Lo que llegue durante la espera sale en el mismo paquete
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def _take_deltas(self) -> list[dict[str, Any]]:
+        deltas = []
+        for message_id, offset in self._pending.items():
+            message = self._messages[message_id]
+            self.seq += 1
+            message.seq = self.seq
+            delta: dict[str, Any] = {"seq": self.seq, "id": message.id, "role": message.role}
+            if offset is None:
+                delta.update(text=message.text, replace=True)
+            else:
+                delta["text"] = message.text[offset:]
+            if message.final:
+                delta["final"] = True
+            message.sent_text, message.sent_final = message.text, message.final
+            deltas.append(delta)
+        self._pending.clear()
+        self._dirty.clear()
+        return deltas
+
+    async def flush(self) -> None:
+        deltas = self._take_deltas()
+        if deltas:
+            await self._publish(deltas)
+
+    def snapshot(self, since: int) -> list[dict[str, Any]]:
+        """Texto publicado de los mensajes que cambiaron después de ``since``, como reemplazos."""
+        return [
+            {
+                "seq": m.seq,
+                "id": m.id,
+                "role": m.role,
+                "text": m.sent_text,
+                "replace": True,
+                **({"final": True} if m.sent_final else {}),
+            }
+            for m in sorted(self._messages.values(), key=lambda m: m.seq)
+            if m.seq > since
+        ]
+
+    async def _publish(self, deltas: list[dict[str, Any]], identity: str | None = None) -> None:
+        room = self._room
+        if room is None or not room.isconnected():
+            return
+        # Los clientes que no alcanzan a recibir un paquete lo recuperan al reanudar
+        for payload in _packets(deltas, resume=identity is not None):
+            try:
+                await room.local_participant.publish_data(
+                    payload,
+                    reliable=True,
+                    topic=TOPIC,
+                    destination_identities=[identity] if identity else [],
+                )
+            except Exception as e:
+                logger.debug(f"No se pudo publicar la transcripción en vivo: {e}")
+
+    def _on_data_received(self, packet: rtc.DataPacket) -> None:
+        if packet.topic != RESUME_TOPIC or packet.participant is None:
+            return
+        try:
+            since = int(json.loads(packet.data)["since"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.debug(f"Solicitud de reanudación inválida de {packet.participant.identity}: {e}")
+            return
+        deltas = self.snapshot(since)
+        if deltas:
+            task = asyncio.create_task(self._publish(deltas, packet.participant.identity))
+            self._resume_tasks.add(task)
+            task.add_done_callback(self._resume_tasks.discard)
+
+
+class _AssistantTextOutput(io.TextOutput):
+    """Último eslabón de la salida de texto de la sesión: cada respuesta es un mensaje."""
+
+    def __init__(self, stream: TranscriptStream) -> None:
+        super().__init__(label="CajicaTranscriptStream", next_in_chain=None)
+        self._stream = stream
+        self._message: _Message | None = None
+
+    async def capture_text(self, text: str) -> None:
+        message = self._message
+        if message is None or message.id not in self._stream._messages:
+            message = self._message = self._stream._new_message("assistant")
+        self._stream._append(message, text)
+
+    def flush(self) -> None:
+        # También si la respuesta se interrumpe: el texto ya no cambia
+        if self._message is not None:
+            self._stream._finish(self._message)
+            self._message = None
+
+
+def _split(delta: dict[str, Any]) -> list[dict[str, Any]]:
+    """Parte un delta cuyo texto no cabe en un paquete en trozos con el mismo ``seq``."""
+    text = delta["text"]
+    if len(text) <= _MAX_PART_CHARS:
+        return [delta]
+    chunks = [text[i : i + _MAX_PART_CHARS] for i in range(0, len(text), _MAX_PART_CHARS)]
+    parts = []
+    for i, chunk in enumerate(chunks):
+        part: dict[str, Any] = {"seq": delta["seq"], "id": delta["id"], "role": delta["role"], "text": chunk}
+        if i == 0:
+            if delta.get("replace"):
+                part["replace"] = True
+        else:
+            part["part"] = i
+        if i < len(chunks) - 1:
+            part["more"] = True
+        elif delta.get("final"):
+            part["final"] = True
+        parts.append(part)
+    return parts
+
+
+def _packets(deltas: list[dict[str, Any]], *, resume: bool = False) -> list[bytes]:
+    """Agrupa los deltas en paquetes que caben en un mensaje confiable."""
+    packets: list[bytes] = []
+    batch: list[str] = []
+    size = 0
+    for delta in (part for d in deltas for part in _split(d)):
+        encoded = json.dumps(delta, ensure_ascii=False, separators=(",", ":"))
+        if batch and size + len(encoded.encode()) > _MAX_PACKET_BYTES:
+            packets.append(_batch_payload(batch, resume))
+            batch, size = [], 0
+        batch.append(encoded)
+        size += len(encoded.encode())
+    if batch:
+        packets.append(_batch_payload(batch, resume))
+    return packets
+
+
+def _batch_payload(encoded_deltas: list[str], resume: bool) -> bytes:
+    header = '{"type":"transcript_batch",' + ('"resume":true,' if resume else "")
+    return (header + '"deltas":[' + ",".join(encoded_deltas) + "]}").encode()
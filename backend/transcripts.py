@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from livekit.agents import AgentSession, ConversationItemAddedEvent, FunctionToolsExecutedEvent, llm
+
+logger = logging.getLogger("cajica-assistant")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    room TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (session_id, created_at);
+"""
+
+_MAX_OUTPUT_CHARS = 2000
+
+# (session_id, room, kind, created_at, data)
+_Row = tuple[str, str, str, float, str]
+
+
+@dataclass
+class TranscriptSinkStats:
+    written: int = 0
+    dropped: int = 0
+    failed_batches: int = 0
+
+
+class TranscriptSink:
+    """Escribe transcripciones y eventos de las sesiones en SQLite (modo WAL) en lotes.
+
+    ``put`` nunca bloquea: los registros van a una cola acotada y, si está llena, se
+    descartan y se cuentan en ``stats.dropped``. Una tarea de fondo agrupa hasta
+    ``batch_size`` registros o los que lleguen en ``flush_interval`` segundos y los escribe
+    en un hilo, así que el disco nunca frena el bucle de eventos ni el audio.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_queue: int = 2000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = TranscriptSinkStats()
+        self._queue: asyncio.Queue[_Row | None] = asyncio.Queue(maxsize=max_queue)
+        self._conn: sqlite3.Connection | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @classmethod
+    def from_env(cls) -> TranscriptSink | None:
+        """``CAJICA_TRANSCRIPT_DIR`` activa el registro; sin ella no se guarda nada."""
+        directory = os.getenv("CAJICA_TRANSCRIPT_DIR")
+        if not directory:
+            return None
+        return cls(
+            Path(directory) / "transcripts.sqlite3",
+            max_queue=int(os.getenv("CAJICA_TRANSCRIPT_QUEUE", "2000")),
+            batch_size=int(os.getenv("CAJICA_TRANSCRIPT_BATCH", "100")),
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def put(self, session_id: str, room: str, kind: str, data: dict[str, Any], created_at: float | None = None) -> None:
+        if self._closed:
+            return
+        row = (session_id, room, kind, created_at or time.time(), json.dumps(data, ensure_ascii=False))
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+
+    async def aclose(self) -> None:
+        """Escribe lo que quede en la cola y cierra la base de datos."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+        if self._conn is not None:
+            await asyncio.to_thread(self._conn.close)
+            self._conn = None
+        logger.info(
+            f"Transcripciones: {self.stats.written} registros escritos, {self.stats.dropped} descartados,"
+            f" {self.stats.failed_batches} lotes fallidos"
+        )
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    done = True
+                    break
+                batch.append(row)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.stats.written += len(batch)
+            except Exception as e:
+                self.stats.failed_batches += 1
+                logger.warning(f"No se pudo escribir un lote de {len(batch)} registros de transcripción: {e}")
+
+    def _write_batch(self, batch: list[_Row]) -> None:
+        # Solo la tarea de escritura usa la conexión, un lote a la vez
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO events (session_id, room, kind, created_at, data) VALUES (?, ?, ?, ?, ?)", batch
+            )
+
+
+class TranscriptRecorder:
+    """Envía al ``TranscriptSink`` los mensajes y herramientas de una sesión.
+
+    Registra cada mensaje del ciudadano y del asistente (``message``), con la versión de
+    los datos municipales con que trabaja la sesión, cada herramienta ejecutada con sus
+    argumentos y resultado (``tool``) y, a través de ``record``, los turnos y el resumen
+    de ``SessionMetrics``.
+    """
+
+    def __init__(self, sink: TranscriptSink, session_id: str, room: str) -> None:
+        self.sink = sink
+        self.session_id = session_id
+        self.room = room
+        self.data_version: str | None = None
+
+    def attach(self, session: AgentSession, data_version: str | None = None) -> None:
+        self.data_version = data_version
+        session.on("conversation_item_added", self._on_item_added)
+        session.on("function_tools_executed", self._on_tools_executed)
+
+    def record(self, kind: str, data: dict[str, Any]) -> None:
+        self.sink.put(self.session_id, self.room, kind, data)
+
+    def _on_item_added(self, ev: ConversationItemAddedEvent) -> None:
+        item = ev.item
+        if not isinstance(item, llm.ChatMessage) or item.role not in ("user", "assistant"):
+            return
+        text = item.text_content
+        if not text:
+            return
+        self.sink.put(
+            self.session_id,
+            self.room,
+            "message",
+            {"role": item.role, "text": text, "interrupted": item.interrupted, "data_version": self.data_version},
+            created_at=item.created_at,
+        )
+
+    def _on_tools_executed(self, ev: FunctionToolsExecutedEvent) -> None:
+        for call, output in ev.zipped():
+            result = output.output if output is not None else None
+            self.sink.put(
+                self.session_id,
+                self.room,
+                "tool",
+                {
+                    "name": call.name,
+                    "arguments": call.arguments,
+                    "output": result[:_MAX_OUTPUT_CHARS] if result is not None else None,
+                    "is_error": output.is_error if output is not None else False,
+                },
+                created_at=call.created_at,
+            )
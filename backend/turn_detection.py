@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Literal, Mapping
+
+logger = logging.getLogger("cajica-assistant")
+
+Eagerness = Literal["low", "medium", "high"]
+
+
+@dataclass(frozen=True)
+class TurnProfile:
+    """Parámetros del VAD y del cierre de turno para un tipo de llamada.
+
+    Los valores del VAD se aplican al Silero del agente y, si el modelo realtime detecta
+    los turnos sin modelo semántico, a su VAD de servidor. ``eagerness`` es la del detector
+    semántico del modelo realtime: qué tan pronto responde ante una frase completa.
+    """
+
+    name: str
+    activation_threshold: float = 0.5
+    min_speech_duration: float = 0.05
+    min_silence_duration: float = 0.55
+    prefix_padding_duration: float = 0.5
+    min_endpointing_delay: float = 0.5
+    max_endpointing_delay: float = 3.0
+    eagerness: Eagerness = "medium"
+
+    def load_vad(self) -> Any:
+        from livekit.plugins import silero
+
+        return silero.VAD.load(
+            activation_threshold=self.activation_threshold,
+            min_speech_duration=self.min_speech_duration,
+            min_silence_duration=self.min_silence_duration,
+            prefix_padding_duration=self.prefix_padding_duration,
+        )
+
+
+TURN_PROFILES: Mapping[str, TurnProfile] = MappingProxyType(
+    {
+        # Valores por defecto de Silero y del modelo realtime
+        "default": TurnProfile(name="default"),
+        # Línea limpia y frases cortas: responde con menos silencio
+        "fast": TurnProfile(
+            name="fast",
+            min_silence_duration=0.35,
+            min_endpointing_delay=0.3,
+            max_endpointing_delay=2.0,
+            eagerness="high",
+        ),
+        # Personas mayores o que hablan despacio: tolera pausas largas dentro de la frase
+        "patient": TurnProfile(
+            name="patient",
+            min_silence_duration=0.9,
+            prefix_padding_duration=0.6,
+            min_endpointing_delay=0.8,
+            max_endpointing_delay=5.0,
+            eagerness="low",
+        ),
+        # Calle o transporte: ignora ruidos cortos y de baja energía
+        "noisy": TurnProfile(
+            name="noisy",
+            activation_threshold=0.65,
+            min_speech_duration=0.15,
+            min_silence_duration=0.6,
+            prefix_padding_duration=0.3,
+        ),
+    }
+)
+
+
+@dataclass(frozen=True)
+class TurnConfig:
+    """Cómo se decide que el ciudadano terminó de hablar.
+
+    Con ``eou_model`` un modelo semántico de fin de turno complementa al VAD: responde
+    apenas la frase está completa y espera más cuando quedó a medias. En modo realtime es
+    el ``semantic_vad`` de OpenAI; cuando el turno se cierra en el agente (STT presente)
+    es el detector de LiveKit sobre la transcripción. Es opcional (``CAJICA_EOU_MODEL=1``)
+    porque añade la descarga y la inferencia del modelo a cada sesión.
+    """
+
+    profile: TurnProfile = field(default_factory=lambda: TURN_PROFILES["default"])
+    eou_model: bool = False
+
+    @classmethod
+    def from_env(cls) -> TurnConfig:
+        raw_profile = os.getenv("CAJICA_TURN_PROFILE", "default").strip().lower()
+        profile = TURN_PROFILES.get(raw_profile)
+        if profile is None:
+            logger.warning(f"CAJICA_TURN_PROFILE inválido '{raw_profile}', usando 'default'")
+            profile = TURN_PROFILES["default"]
+        eou_model = os.getenv("CAJICA_EOU_MODEL", "0").strip().lower() in ("1", "true", "yes")
+        return cls(profile=profile, eou_model=eou_model)
+
+    def realtime_turn_detection(self) -> Any:
+        """Detección de turnos del servidor para el modelo realtime."""
+        from openai.types.realtime.realtime_audio_input_turn_detection import SemanticVad, ServerVad
+
+        if self.eou_model:
+            return SemanticVad(
+                type="semantic_vad",
+                eagerness=self.profile.eagerness,
+                create_response=True,
+                interrupt_response=True,
+            )
+        return ServerVad(
+            type="server_vad",
+            threshold=self.profile.activation_threshold,
+            prefix_padding_ms=round(self.profile.prefix_padding_duration * 1000),
+            silence_duration_ms=round(self.profile.min_silence_duration * 1000),
+            create_response=True,
+            interrupt_response=True,
+        )
+
+    def turn_handling(self, *, transcripts: bool = True) -> dict[str, Any]:
+        """``turn_handling`` de ``AgentSession`` cuando el turno se cierra en el agente.
+
+        El modelo semántico necesita la transcripción; sin STT el turno lo cierra el VAD.
+        """
+        if self.eou_model and transcripts:
+            from livekit.agents import inference
+
+            turn_detection: Any = inference.TurnDetector()
+        else:
+            turn_detection = "vad"
+        return dict(
+            turn_detection=turn_detection,
+            endpointing=dict(
+                min_delay=self.profile.min_endpointing_delay,
+                max_delay=self.profile.max_endpointing_delay,
+            ),
+        )
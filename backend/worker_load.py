@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+import psutil
+from livekit.agents import AgentServer, utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+logger = logging.getLogger("cajica-assistant")
+
+SNAPSHOT_ENV = "CAJICA_WORKER_LOAD_FILE"
+
+
+@dataclass(frozen=True)
+class LoadSnapshot:
+    active_sessions: int
+    session_load: float
+    cpu_load: float
+    loop_lag: float
+    load: float
+    updated_at: float = 0.0
+
+
+class WorkerLoad:
+    """Función de carga para ``WorkerOptions(load_fnc=...)``.
+
+    La carga reportada es la mayor de tres señales, cada una entre 0 y 1:
+
+    - sesiones activas sobre ``max_sessions``;
+    - CPU de los procesos de trabajo (dominada por la inferencia del VAD) sobre los CPUs disponibles;
+    - retraso del event loop del worker sobre ``lag_budget`` segundos.
+
+    El worker invoca esta función desde hilos de su executor, y no solo en el ciclo
+    periódico, así que el retraso del loop lo mide aparte un temporizador (``call_later``
+    cada ``lag_interval`` segundos) en el loop del worker, que ``attach`` arranca con el
+    evento ``worker_started``: la carga usa el mayor retraso observado desde la llamada
+    anterior. El estado compartido entre esas llamadas se
+    protege con un lock. Con ``max_sessions`` sesiones activas la carga es 1.0 y el
+    dispatcher envía las salas nuevas a otros workers.
+
+    Con ``snapshot_path`` cada medición se escribe en ese archivo para que los procesos
+    de trabajo decidan con la misma carga que se reporta a LiveKit (``read_snapshot``);
+    ``close`` lo borra.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int,
+        lag_budget: float = 0.25,
+        window: int = 6,
+        lag_interval: float = 0.1,
+        snapshot_path: str | None = None,
+    ) -> None:
+        self.max_sessions = max(max_sessions, 1)
+        self.lag_budget = lag_budget
+        self.lag_interval = lag_interval
+        self.snapshot_path = snapshot_path
+        self._cpu_count = get_cpu_monitor().cpu_count()
+        self._cpu_avg = utils.MovingAverage(window)
+        self._lag_avg = utils.MovingAverage(window)
+        self._procs: dict[int, psutil.Process] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._max_lag = 0.0
+        self._next_tick: float | None = None
+        self.last: LoadSnapshot | None = None
+
+    @classmethod
+    def from_env(cls) -> WorkerLoad:
+        default_max = max(1, int(get_cpu_monitor().cpu_count() * 2))
+        # Un archivo por worker; los procesos de trabajo heredan la variable de entorno
+        snapshot_path = os.environ.setdefault(
+            SNAPSHOT_ENV, os.path.join(tempfile.gettempdir(), f"cajica-worker-load-{os.getpid()}.json")
+        )
+        load = cls(
+            max_sessions=int(os.getenv("CAJICA_MAX_SESSIONS", str(default_max))),
+            lag_budget=float(os.getenv("CAJICA_LOOP_LAG_BUDGET", "0.25")),
+            snapshot_path=snapshot_path,
+        )
+        # Sin esto quedaría un archivo en el directorio temporal por cada worker que se detuvo
+        atexit.register(load.close)
+        return load
+
+    def attach(self, server: AgentServer) -> None:
+        """Mide el retraso del loop de ``server`` desde que arranca."""
+        # El evento se emite dentro del loop del worker
+        server.on("worker_started", lambda: self.start(asyncio.get_running_loop()))
+
+    def close(self) -> None:
+        """Borra el archivo con la última carga: un worker detenido no reporta carga."""
+        if self.snapshot_path is not None:
+            try:
+                os.remove(self.snapshot_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"No se pudo borrar la carga del worker en {self.snapshot_path}: {e}")
+
+    def _job_cpu_seconds_per_second(self) -> float:
+        # cpu_percent(None) compara contra la llamada anterior de cada proceso
+        children = psutil.Process().children(recursive=True)
+        alive = {p.pid for p in children}
+        for pid in list(self._procs):
+            if pid not in alive:
+                del self._procs[pid]
+        total = 0.0
+        for child in children:
+            proc = self._procs.setdefault(child.pid, child)
+            try:
+                total += proc.cpu_percent(None) / 100
+            except psutil.Error:
+                self._procs.pop(child.pid, None)
+        return total
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Empieza a medir el retraso de ``loop``; se puede llamar desde cualquier hilo."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = loop
+        loop.call_soon_threadsafe(self._schedule_tick)
+
+    def _schedule_tick(self) -> None:
+        assert self._loop is not None
+        scheduled = self._loop.time() + self.lag_interval
+        with self._lock:
+            self._next_tick = scheduled
+        self._loop.call_later(self.lag_interval, self._tick, scheduled)
+
+    def _tick(self, scheduled: float) -> None:
+        assert self._loop is not None
+        lag = max(self._loop.time() - scheduled, 0.0)
+        with self._lock:
+            self._max_lag = max(self._max_lag, lag)
+        self._schedule_tick()
+
+    def _take_loop_lag(self) -> float:
+        # Con el loop bloqueado el temporizador aún no ha corrido: cuenta lo que lleva vencido
+        lag = self._max_lag
+        if self._loop is not None and self._next_tick is not None:
+            lag = max(lag, self._loop.time() - self._next_tick)
+        self._max_lag = 0.0
+        return lag
+
+    def __call__(self, worker: AgentServer) -> float:
+        active = len(worker.active_jobs)
+        with self._lock:
+            self._cpu_avg.add_sample(min(self._job_cpu_seconds_per_second() / self._cpu_count, 1.0))
+            self._lag_avg.add_sample(self._take_loop_lag())
+
+            session_load = active / self.max_sessions
+            cpu_load = self._cpu_avg.get_avg()
+            loop_lag = self._lag_avg.get_avg()
+            load = 1.0 if active >= self.max_sessions else min(
+                max(session_load, cpu_load, loop_lag / self.lag_budget), 1.0
+            )
+
+            previous = self.last
+            self.last = LoadSnapshot(
+                active_sessions=active,
+                session_load=session_load,
+                cpu_load=cpu_load,
+                loop_lag=loop_lag,
+                load=load,
+                updated_at=time.time(),
+            )
+            if self.snapshot_path is not None:
+                self._write_snapshot(self.snapshot_path, self.last)
+        if load >= 1.0 and (previous is None or previous.load < 1.0):
+            logger.warning(
+                f"Worker a plena capacidad: {active}/{self.max_sessions} sesiones,"
+                f" CPU {cpu_load:.0%}, retraso del loop {loop_lag * 1000:.0f} ms"
+            )
+        return load
+
+    @staticmethod
+    def _write_snapshot(path: str, snapshot: LoadSnapshot) -> None:
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(asdict(snapshot), f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"No se pudo escribir la carga del worker en {path}: {e}")
+
+
+def read_snapshot(max_age: float = 5.0) -> LoadSnapshot | None:
+    """Última carga que reportó el worker de este proceso, o None si no hay una reciente."""
+    path = os.getenv(SNAPSHOT_ENV)
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            snapshot = LoadSnapshot(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    if time.time() - snapshot.updated_at > max_age:
+        return None
+    return snapshot
@@ -3,12 +3,18 @@ import {
   AccessTokenOptions,
   VideoGrant,
 } from "livekit-server-sdk";
-import { NextResponse } from "next/server";
+import { randomUUID } from "crypto";
+import { NextRequest, NextResponse } from "next/server";
 
 // NOTE: you are expected to define the following environment variables in `.env.local`:
 const API_KEY = process.env.LIVEKIT_API_KEY;
 const API_SECRET = process.env.LIVEKIT_API_SECRET;
 const LIVEKIT_URL = process.env.LIVEKIT_URL;
+// Optional: backend connection service (backend/connection_service.py) that hands out
+// pre-provisioned rooms with the agent already dispatched, and rate-limits clients
+const CONNECTION_SERVICE_URL = process.env.CONNECTION_SERVICE_URL;
+// Proxies (load balancer, ingress) in front of this app that append to X-Forwarded-For
+const TRUSTED_PROXY_HOPS = Number(process.env.TRUSTED_PROXY_HOPS ?? "1");
 
 // don't cache the results
 export const revalidate = 0;
@@ -20,8 +26,11 @@ export type ConnectionDetails = {
   participantToken: string;
 };
 
-export async function GET() {
+export async function GET(request: NextRequest) {
   try {
+    if (CONNECTION_SERVICE_URL !== undefined) {
+      return await fromConnectionService(request);
+    }
     if (LIVEKIT_URL === undefined) {
       throw new Error("LIVEKIT_URL is not defined");
     }
@@ -33,8 +42,8 @@ export async function GET() {
     }
 
     // Generate participant token
-    const participantIdentity = `voice_assistant_user_${Math.floor(Math.random() * 10_000)}`;
-    const roomName = `voice_assistant_room_${Math.floor(Math.random() * 10_000)}`;
+    const participantIdentity = `voice_assistant_user_${randomUUID()}`;
+    const roomName = `voice_assistant_room_${randomUUID()}`;
     const participantToken = await createParticipantToken(
       { identity: participantIdentity },
       roomName,
@@ -59,6 +68,45 @@ export async function GET() {
   }
 }
 
+// The citizen's IP as seen by the outermost trusted proxy. Entries further left in
+// X-Forwarded-For are written by the client itself and can be spoofed.
+function clientIp(request: NextRequest): string | undefined {
+  if (request.ip) {
+    return request.ip;
+  }
+  const hops = (request.headers.get("x-forwarded-for") ?? "")
+    .split(",")
+    .map((hop) => hop.trim())
+    .filter(Boolean);
+  if (TRUSTED_PROXY_HOPS < 1 || hops.length < TRUSTED_PROXY_HOPS) {
+    return undefined;
+  }
+  return hops[hops.length - TRUSTED_PROXY_HOPS];
+}
+
+async function fromConnectionService(request: NextRequest) {
+  // One verified address: the service rate-limits by it and ignores X-Forwarded-For.
+  // Without one the service skips its per-client limit instead of throttling everyone.
+  const ip = clientIp(request);
+  const response = await fetch(`${CONNECTION_SERVICE_URL}/connection-details`, {
+    headers: ip ? { "X-Cajica-Client-IP": ip } : {},
+    cache: "no-store",
+  });
+  const headers = new Headers({ "Cache-Control": "no-store" });
+  const retryAfter = response.headers.get("Retry-After");
+  if (retryAfter !== null) {
+    headers.set("Retry-After", retryAfter);
+  }
+  if (!response.ok) {
+    return new NextResponse(await response.text(), {
+      status: response.status,
+      headers,
+    });
+  }
+  const data: ConnectionDetails = await response.json();
+  return NextResponse.json(data, { headers });
+}
+
 function createParticipantToken(
   userInfo: AccessTokenOptions,
   roomName: string
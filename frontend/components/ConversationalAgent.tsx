@@ -9,7 +9,6 @@ import {
   VoiceAssistantControlBar,
   AgentState,
   DisconnectButton,
-  useRoomContext,
 } from "@livekit/components-react";
 import { useCallback, useEffect, useState } from "react";
 import { MediaDeviceFailure } from "livekit-client";
@@ -18,6 +17,7 @@ import { NoAgentNotification } from "@/components/NoAgentNotification";
 import { CloseIcon } from "@/components/CloseIcon";
 // import { useKrispNoiseFilter } from "@livekit/components-react/krisp"; // Comentado temporalmente para evitar bucles
 import { Card, CardContent } from "@/components/ui/card";
+import { useConversationCapture } from "@/hooks/useConversationCapture";
 
 interface ConversationalAgentProps {
   onResponse?: (response: string) => void;
@@ -87,7 +87,6 @@ const ConversationalAgent: React.FC<ConversationalAgentProps> = ({ onResponse, o
 
   // State para controlar cuándo agregar mensajes al historial
   const [lastProcessedState, setLastProcessedState] = useState<AgentState>("disconnected");
-  const [hasAddedWelcomeMessage, setHasAddedWelcomeMessage] = useState(false);
   const [lastUserTranscript, setLastUserTranscript] = useState<string>('');
 
   // Solo manejar estado inicial para respuesta genérica si no hay transcripciones
@@ -97,22 +96,11 @@ const ConversationalAgent: React.FC<ConversationalAgentProps> = ({ onResponse, o
     }
   }, [agentState, onResponse, lastUserTranscript]);
 
-  // Debug logs y mensaje de bienvenida
+  // Debug logs; el saludo del agente llega por la transcripción como cualquier otro mensaje
   useEffect(() => {
     console.log('Agent state changed:', agentState);
   }, [agentState]);
 
-  // Agregar mensaje de bienvenida cuando el agente se conecte exitosamente
-  useEffect(() => {
-    if (agentState === 'listening' && !hasAddedWelcomeMessage && onAddMessage) {
-      console.log('Adding welcome message - agent ready');
-      setTimeout(() => {
-        onAddMessage('assistant', '¡Hola! Soy tu asistente virtual de la Alcaldía de Cajicá. Puedes preguntarme sobre los objetivos estratégicos y avances del Plan de Desarrollo Municipal 2024-2027. ¿En qué puedo ayudarte hoy?');
-      }, 1000); // Delay para asegurar que la conexión esté estable
-      setHasAddedWelcomeMessage(true);
-    }
-  }, [agentState, hasAddedWelcomeMessage, onAddMessage]);
-
   // Manejar transiciones de estado simplificadas
   useEffect(() => {
     if (lastProcessedState !== agentState) {
@@ -214,7 +202,6 @@ const ConversationalAgent: React.FC<ConversationalAgentProps> = ({ onResponse, o
               onUserMessage={handleUserMessage}
               onAssistantMessage={handleAssistantMessage}
               onCaptureStateChange={setIsCapturing}
-              agentState={agentState}
             />
             <SimpleVoiceAssistant 
               onStateChange={setAgentState}
@@ -232,201 +219,23 @@ const ConversationalAgent: React.FC<ConversationalAgentProps> = ({ onResponse, o
   );
 };
 
-// Componente para capturar conversaciones dentro del contexto de LiveKit
+// Componente para capturar conversaciones dentro del contexto de LiveKit: el agente
+// publica la transcripción como deltas numerados y el hook entrega cada mensaje una vez
 function ConversationCapture(props: {
   onUserMessage?: (message: string) => void;
   onAssistantMessage?: (message: string) => void;
   onCaptureStateChange?: (isCapturing: boolean) => void;
-  agentState: AgentState;
 }) {
-  const room = useRoomContext();
-  const { onUserMessage, onAssistantMessage, onCaptureStateChange, agentState } = props;
-  const [lastProcessedMessage, setLastProcessedMessage] = useState<string>('');
-  
-  // Estados para manejar mensajes acumulativos
-  const [currentUserMessage, setCurrentUserMessage] = useState<string>('');
-  const [currentAssistantMessage, setCurrentAssistantMessage] = useState<string>('');
-  const [userMessageTimer, setUserMessageTimer] = useState<NodeJS.Timeout | null>(null);
-  const [assistantMessageTimer, setAssistantMessageTimer] = useState<NodeJS.Timeout | null>(null);
-  
-  // Función para procesar mensajes completos con debouncing
-  const processCompleteMessage = useCallback((message: string, isUser: boolean) => {
-    const trimmedMessage = message.trim();
-    
-    // Verificar que el mensaje sea válido y no sea duplicado
-    if (!trimmedMessage || trimmedMessage === lastProcessedMessage) {
-      return;
-    }
-
-    // Solo procesar mensajes que parezcan completos
-    const hasEndPunctuation = /[.!?]\s*$/.test(trimmedMessage);
-    const isReasonableLength = trimmedMessage.length >= 8; // Mínimo 8 caracteres
-    const hasMultipleWords = trimmedMessage.split(' ').length >= 2;
-    
-    // Un mensaje se considera completo si:
-    // 1. Termina con puntuación, O
-    // 2. Tiene longitud razonable Y múltiples palabras
-    const seemsComplete = hasEndPunctuation || (isReasonableLength && hasMultipleWords);
-    
-    if (!seemsComplete) {
-      console.log('Message seems incomplete, skipping:', trimmedMessage);
-      return;
-    }
-
-    console.log(`Processing complete ${isUser ? 'user' : 'assistant'} message:`, trimmedMessage);
-    setLastProcessedMessage(trimmedMessage);
+  const { onUserMessage, onAssistantMessage, onCaptureStateChange } = props;
+  const { isCapturing } = useConversationCapture({
+    onUserMessage,
+    onAssistantMessage,
+    onError: (error) => console.error('Error capturing conversation:', error),
+  });
 
-    if (isUser && onUserMessage) {
-      onUserMessage(trimmedMessage);
-      setCurrentUserMessage(''); // Limpiar mensaje actual
-    } else if (!isUser && onAssistantMessage) {
-      onAssistantMessage(trimmedMessage);
-      setCurrentAssistantMessage(''); // Limpiar mensaje actual
-    }
-  }, [lastProcessedMessage, onUserMessage, onAssistantMessage]);
-  
-  // Función para manejar mensajes incrementales
-  const handleIncrementalMessage = useCallback((message: string, isUser: boolean) => {
-    const trimmedMessage = message.trim();
-    if (!trimmedMessage) return;
-
-    if (isUser) {
-      // Actualizar mensaje del usuario actual
-      setCurrentUserMessage(prev => {
-        // Si el nuevo mensaje es más largo que el anterior, actualizar
-        if (trimmedMessage.length > prev.length && trimmedMessage.includes(prev)) {
-          return trimmedMessage;
-        }
-        // Si es un mensaje completamente nuevo, reemplazar
-        if (!trimmedMessage.includes(prev) && !prev.includes(trimmedMessage)) {
-          return trimmedMessage;
-        }
-        return prev;
-      });
-      
-      // Limpiar timer anterior
-      if (userMessageTimer) {
-        clearTimeout(userMessageTimer);
-      }
-      
-      // Establecer nuevo timer para procesar el mensaje después de 2 segundos de silencio
-      const newTimer = setTimeout(() => {
-        setCurrentUserMessage(current => {
-          if (current.trim()) {
-            processCompleteMessage(current, true);
-          }
-          return '';
-        });
-      }, 2000);
-      
-      setUserMessageTimer(newTimer);
-      
-    } else {
-      // Manejar mensajes del asistente de manera similar
-      setCurrentAssistantMessage(prev => {
-        if (trimmedMessage.length > prev.length && trimmedMessage.includes(prev)) {
-          return trimmedMessage;
-        }
-        if (!trimmedMessage.includes(prev) && !prev.includes(trimmedMessage)) {
-          return trimmedMessage;
-        }
-        return prev;
-      });
-      
-      if (assistantMessageTimer) {
-        clearTimeout(assistantMessageTimer);
-      }
-      
-      const newTimer = setTimeout(() => {
-        setCurrentAssistantMessage(current => {
-          if (current.trim()) {
-            processCompleteMessage(current, false);
-          }
-          return '';
-        });
-      }, 2000);
-      
-      setAssistantMessageTimer(newTimer);
-    }
-  }, [processCompleteMessage, userMessageTimer, assistantMessageTimer]);
-  
-  // Limpiar timers al desmontar
-  useEffect(() => {
-    return () => {
-      if (userMessageTimer) clearTimeout(userMessageTimer);
-      if (assistantMessageTimer) clearTimeout(assistantMessageTimer);
-    };
-  }, [userMessageTimer, assistantMessageTimer]);
-  
-  // Procesar mensajes pendientes cuando cambie el estado del agente
-  const [prevState, setPrevState] = useState<AgentState>('disconnected');
-  
   useEffect(() => {
-    // Si el agente pasa de 'thinking' a 'speaking', procesar mensaje del usuario pendiente
-    if (prevState === 'thinking' && agentState === 'speaking' && currentUserMessage.trim()) {
-      if (userMessageTimer) clearTimeout(userMessageTimer);
-      processCompleteMessage(currentUserMessage, true);
-      setCurrentUserMessage('');
-    }
-    
-    // Si el agente pasa de 'speaking' a 'listening', procesar mensaje del asistente pendiente
-    if (prevState === 'speaking' && agentState === 'listening' && currentAssistantMessage.trim()) {
-      if (assistantMessageTimer) clearTimeout(assistantMessageTimer);
-      processCompleteMessage(currentAssistantMessage, false);
-      setCurrentAssistantMessage('');
-    }
-    
-    setPrevState(agentState);
-  }, [agentState, prevState, currentUserMessage, currentAssistantMessage, userMessageTimer, assistantMessageTimer, processCompleteMessage]);
-
-  useEffect(() => {
-    if (!room) {
-      onCaptureStateChange?.(false);
-      return;
-    }
-
-    onCaptureStateChange?.(true);
-    console.log('Starting conversation capture...');
-
-    // Capturar transcripciones nativas de LiveKit
-    const handleTranscription = (segments: Array<{text: string}>, participant?: {identity: string}) => {
-      try {
-        console.log('Transcription event:', { 
-          segments, 
-          participantIdentity: participant?.identity,
-          localParticipantIdentity: room.localParticipant?.identity
-        });
-
-        if (!segments || segments.length === 0) return;
-
-        const text = segments
-          .map(segment => segment.text || '')
-          .join(' ')
-          .trim();
-
-        if (!text) return;
-
-        const isFromUser = participant?.identity === room.localParticipant?.identity;
-        
-        // Usar la nueva lógica incremental en lugar de procesar inmediatamente
-        handleIncrementalMessage(text, isFromUser || false);
-        
-      } catch (error) {
-        console.error('Error processing transcription:', error);
-      }
-    };
-
-    // Registrar event listeners
-    room.on('transcriptionReceived', handleTranscription);
-
-    // Cleanup
-    return () => {
-      console.log('Stopping conversation capture...');
-      room.off('transcriptionReceived', handleTranscription);
-      onCaptureStateChange?.(false);
-    };
-
-  }, [room, handleIncrementalMessage, onCaptureStateChange]);
+    onCaptureStateChange?.(isCapturing);
+  }, [isCapturing, onCaptureStateChange]);
 
   return null; // Este componente no renderiza nada
 }
@@ -1,42 +1,70 @@
 "use client";
 
-import { useEffect, useCallback, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useRoomContext } from '@livekit/components-react';
-import { RoomEvent, DataPacket_Kind } from 'livekit-client';
+import { ConnectionState, RemoteParticipant, RoomEvent } from 'livekit-client';
+
+// Temas del canal de datos en los que el agente publica la transcripción (transcript_stream.py)
+const TRANSCRIPT_TOPIC = 'cajica.transcript';
+const RESUME_TOPIC = 'cajica.transcript.resume';
+const RESUME_RETRY_MS = 1000;
+
+export interface TranscriptMessage {
+  id: string;
+  role: 'user' | 'assistant';
+  text: string;
+  final: boolean;
+  // Último delta (y trozo, si venía partido) aplicado a este mensaje
+  seq: number;
+  part: number;
+}
+
+interface TranscriptDelta {
+  seq: number;
+  id: string;
+  role: 'user' | 'assistant';
+  text: string;
+  replace?: boolean;
+  final?: boolean;
+  // Trozos de un delta que no cabía en un paquete: comparten seq
+  part?: number;
+  more?: boolean;
+}
+
+interface TranscriptBatch {
+  type: 'transcript_batch';
+  resume?: boolean;
+  deltas: TranscriptDelta[];
+}
 
 interface ConversationCaptureOptions {
   onUserMessage?: (message: string) => void;
   onAssistantMessage?: (message: string) => void;
+  // Transcripción completa, incluidos los mensajes aún en curso, tras cada paquete
+  onTranscriptUpdate?: (messages: TranscriptMessage[]) => void;
   onError?: (error: Error) => void;
 }
 
 export function useConversationCapture({
   onUserMessage,
   onAssistantMessage,
+  onTranscriptUpdate,
   onError
 }: ConversationCaptureOptions) {
   const room = useRoomContext();
   const [isCapturing, setIsCapturing] = useState(false);
-  const [lastProcessedMessage, setLastProcessedMessage] = useState<string>('');
-
-  // Función para procesar mensajes únicos
-  const processUniqueMessage = useCallback((message: string, isUser: boolean) => {
-    const trimmedMessage = message.trim();
-    
-    // Evitar duplicados
-    if (trimmedMessage === lastProcessedMessage || !trimmedMessage) {
-      return;
-    }
 
-    console.log(`Processing ${isUser ? 'user' : 'assistant'} message:`, trimmedMessage);
-    setLastProcessedMessage(trimmedMessage);
-
-    if (isUser && onUserMessage) {
-      onUserMessage(trimmedMessage);
-    } else if (!isUser && onAssistantMessage) {
-      onAssistantMessage(trimmedMessage);
-    }
-  }, [lastProcessedMessage, onUserMessage, onAssistantMessage]);
+  // El estado vive en refs: cada paquete llega cada pocas decenas de ms y no debe
+  // volver a registrar los listeners ni renderizar el componente que usa el hook
+  const messagesRef = useRef(new Map<string, TranscriptMessage>());
+  const deliveredRef = useRef(new Set<string>());
+  const lastSeqRef = useRef(0);
+  // Delta partido del que aún faltan trozos: el siguiente paquete debe continuarlo
+  const splitRef = useRef<{ id: string; seq: number; nextPart: number } | null>(null);
+  // Momento de la última solicitud de reanudación sin respuesta (0: ninguna)
+  const resumeRequestedAtRef = useRef(0);
+  const callbacksRef = useRef({ onUserMessage, onAssistantMessage, onTranscriptUpdate, onError });
+  callbacksRef.current = { onUserMessage, onAssistantMessage, onTranscriptUpdate, onError };
 
   useEffect(() => {
     if (!room) {
@@ -45,92 +73,103 @@ export function useConversationCapture({
     }
 
     setIsCapturing(true);
-    console.log('Starting conversation capture...');
-
-    // Capturar transcripciones nativas de LiveKit
-    const handleTranscription = (segments: any[], participant: any, publication: any) => {
-      try {
-        console.log('Transcription event:', { 
-          segments, 
-          participantIdentity: participant?.identity,
-          localParticipantIdentity: room.localParticipant?.identity
-        });
-
-        if (!segments || segments.length === 0) return;
-
-        const text = segments
-          .map(segment => segment.text || '')
-          .join(' ')
-          .trim();
-
-        if (!text) return;
+    const encoder = new TextEncoder();
+    const decoder = new TextDecoder();
+
+    const requestResume = () => {
+      if (room.state !== ConnectionState.Connected) return;
+      resumeRequestedAtRef.current = Date.now();
+      // Con un delta partido a medias se pide también el mensaje al que le faltan trozos
+      const since = splitRef.current ? splitRef.current.seq - 1 : lastSeqRef.current;
+      const payload = encoder.encode(JSON.stringify({ since }));
+      room.localParticipant
+        .publishData(payload, { reliable: true, topic: RESUME_TOPIC })
+        .catch((error) => callbacksRef.current.onError?.(error as Error));
+    };
 
-        const isFromUser = participant?.identity === room.localParticipant?.identity;
-        processUniqueMessage(text, isFromUser);
-        
-      } catch (error) {
-        console.error('Error processing transcription:', error);
-        onError?.(error as Error);
+    const applyDelta = (delta: TranscriptDelta) => {
+      const message = messagesRef.current.get(delta.id);
+      const part = delta.part ?? 0;
+      // Los deltas ya aplicados (por ejemplo, repetidos al reanudar) se ignoran, salvo el
+      // reemplazo que completa un mensaje al que le faltaban trozos
+      const split = splitRef.current;
+      const completesSplit =
+        Boolean(delta.replace) && split?.id === delta.id && split.seq === delta.seq;
+      const seen =
+        message && (delta.seq < message.seq || (delta.seq === message.seq && part <= message.part));
+      if (seen && !completesSplit) return;
+      splitRef.current = delta.more ? { id: delta.id, seq: delta.seq, nextPart: part + 1 } : null;
+      const text = delta.replace || !message ? delta.text : message.text + delta.text;
+      const final = Boolean(delta.final) || Boolean(message?.final);
+      messagesRef.current.set(delta.id, {
+        id: delta.id,
+        role: delta.role,
+        text,
+        final,
+        seq: delta.seq,
+        part,
+      });
+
+      const trimmed = text.trim();
+      if (final && trimmed && !deliveredRef.current.has(delta.id)) {
+        deliveredRef.current.add(delta.id);
+        if (delta.role === 'user') {
+          callbacksRef.current.onUserMessage?.(trimmed);
+        } else {
+          callbacksRef.current.onAssistantMessage?.(trimmed);
+        }
       }
     };
 
-    // Capturar datos del canal de datos
-    const handleDataPacket = (payload: Uint8Array, participant?: any, kind?: DataPacket_Kind) => {
-      // Solo procesar paquetes confiables
-      if (kind === DataPacket_Kind.LOSSY) return;
-
+    const handleData = (
+      payload: Uint8Array,
+      _participant?: RemoteParticipant,
+      _kind?: unknown,
+      topic?: string
+    ) => {
+      if (topic !== TRANSCRIPT_TOPIC) return;
       try {
-        const decoder = new TextDecoder();
-        const message = decoder.decode(payload);
-        const data = JSON.parse(message);
-
-        console.log('Data packet received:', data);
-
-        let text = '';
-        let isFromUser = false;
-
-        // Diferentes formatos de datos que puede enviar el agente
-        if (data.type === 'transcript' && data.text) {
-          text = data.text;
-          isFromUser = data.participant_identity === room.localParticipant?.identity;
-        } else if (data.type === 'user_transcript' && data.text) {
-          text = data.text;
-          isFromUser = true;
-        } else if (data.type === 'assistant_response' && data.text) {
-          text = data.text;
-          isFromUser = false;
-        } else if (data.type === 'agent_speech' && data.text) {
-          text = data.text;
-          isFromUser = false;
-        } else if (data.text && typeof data.text === 'string') {
-          // Formato genérico con texto
-          text = data.text;
-          isFromUser = participant?.identity === room.localParticipant?.identity;
+        const batch = JSON.parse(decoder.decode(payload)) as TranscriptBatch;
+        if (batch.type !== 'transcript_batch' || batch.deltas.length === 0) return;
+
+        if (batch.resume) {
+          resumeRequestedAtRef.current = 0;
+        } else if (
+          splitRef.current
+            ? batch.deltas[0].seq !== splitRef.current.seq ||
+              (batch.deltas[0].part ?? 0) !== splitRef.current.nextPart
+            : batch.deltas[0].seq > lastSeqRef.current + 1
+        ) {
+          // Faltan deltas: se descarta el paquete y se pide el texto completo desde el último
+          // aplicado; si la solicitud no tuvo respuesta (el agente aún no estaba), se repite
+          if (Date.now() - resumeRequestedAtRef.current > RESUME_RETRY_MS) requestResume();
+          return;
         }
 
-        if (text) {
-          processUniqueMessage(text, isFromUser);
+        for (const delta of batch.deltas) {
+          applyDelta(delta);
+          lastSeqRef.current = Math.max(lastSeqRef.current, delta.seq);
         }
-
+        callbacksRef.current.onTranscriptUpdate?.(Array.from(messagesRef.current.values()));
       } catch (error) {
-        console.error('Error processing data packet:', error);
-        onError?.(error as Error);
+        console.error('Error processing transcript batch:', error);
+        callbacksRef.current.onError?.(error as Error);
       }
     };
 
-    // Registrar event listeners
-    room.on(RoomEvent.TranscriptionReceived, handleTranscription);
-    room.on(RoomEvent.DataReceived, handleDataPacket);
+    room.on(RoomEvent.DataReceived, handleData);
+    // Al conectarse (o reconectarse) se recupera lo que se publicó mientras tanto
+    room.on(RoomEvent.Connected, requestResume);
+    room.on(RoomEvent.Reconnected, requestResume);
+    requestResume();
 
-    // Cleanup
     return () => {
-      console.log('Stopping conversation capture...');
-      room.off(RoomEvent.TranscriptionReceived, handleTranscription);
-      room.off(RoomEvent.DataReceived, handleDataPacket);
+      room.off(RoomEvent.DataReceived, handleData);
+      room.off(RoomEvent.Connected, requestResume);
+      room.off(RoomEvent.Reconnected, requestResume);
       setIsCapturing(false);
     };
-
-  }, [room, processUniqueMessage, onError]);
+  }, [room]);
 
   return {
     isCapturing,